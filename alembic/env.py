@@ -5,9 +5,11 @@ from sqlalchemy import MetaData
 from sqlmodel import SQLModel
 
 from alembic import context
+from alembic.runtime.environment import NameFilterParentNames, NameFilterType
 from api.env import Settings
 from api.models import BaseModel, MetadataModel
 from api.util.db import engine, meta_engine
+from api.util.fts import is_fts_table
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -45,6 +47,15 @@ def _build_filtered_metadata(table_names: set[str]) -> MetaData:
 
 
 # Distinguish which tables belong to which DB by walking model subclasses.
+def _include_name(
+    name: str | None, type_: NameFilterType, _parent_names: NameFilterParentNames
+) -> bool:
+    """FTS5 virtual tables (and their shadow tables) are managed by hand-written migrations."""
+    if type_ == "table" and name is not None:
+        return not is_fts_table(name)
+    return True
+
+
 _base_table_names = _get_table_names(BaseModel)
 _meta_table_names = _get_table_names(MetadataModel)
 
@@ -74,6 +85,7 @@ def run_migrations() -> None:
                 connection=connection,
                 target_metadata=_base_metadata,
                 render_as_batch=True,
+                include_name=_include_name,
             )
 
             with context.begin_transaction():
@@ -0,0 +1,93 @@
+"""title and lecturer fts triggers
+
+Revision ID: 0b7e4c92d5a6
+Revises: f3d8a61c2b95
+Create Date: 2026-10-17 15:31:47.205893
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0b7e4c92d5a6"
+down_revision: Union[str, Sequence[str], None] = "f3d8a61c2b95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    delete = """
+        INSERT INTO unittitlefts(unittitlefts, rowid, title, title_english, number)
+        VALUES('delete', old.id, old.title, old.title_english, old.number);
+    """
+    insert = """
+        INSERT INTO unittitlefts(rowid, title, title_english, number)
+        VALUES(new.id, new.title, new.title_english, new.number);
+    """
+    op.execute(f"""
+        CREATE TRIGGER unittitlefts_ai AFTER INSERT ON learningunit BEGIN
+            {insert}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER unittitlefts_ad AFTER DELETE ON learningunit BEGIN
+            {delete}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER unittitlefts_au
+        AFTER UPDATE OF id, title, title_english, number ON learningunit BEGIN
+            {delete}
+            {insert}
+        END
+    """)
+
+    # contentless tables don't store the names, so the old ones are derived again
+    delete = """
+        INSERT INTO lecturernamefts(lecturernamefts, rowid, name_surname, surname_name)
+        VALUES(
+            'delete',
+            old.id,
+            old.name || ' ' || old.surname,
+            old.surname || ' ' || old.name
+        );
+    """
+    insert = """
+        INSERT INTO lecturernamefts(rowid, name_surname, surname_name)
+        VALUES(new.id, new.name || ' ' || new.surname, new.surname || ' ' || new.name);
+    """
+    op.execute(f"""
+        CREATE TRIGGER lecturernamefts_ai AFTER INSERT ON lecturer BEGIN
+            {insert}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER lecturernamefts_ad AFTER DELETE ON lecturer BEGIN
+            {delete}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER lecturernamefts_au
+        AFTER UPDATE OF id, name, surname ON lecturer BEGIN
+            {delete}
+            {insert}
+        END
+    """)
+
+    # rows written since the indices were last rebuilt
+    op.execute("INSERT INTO unittitlefts(unittitlefts) VALUES('rebuild')")
+    op.execute("INSERT INTO lecturernamefts(lecturernamefts) VALUES('delete-all')")
+    op.execute("""
+        INSERT INTO lecturernamefts(rowid, name_surname, surname_name)
+        SELECT id, name || ' ' || surname, surname || ' ' || name FROM lecturer
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for fts_table in ("lecturernamefts", "unittitlefts"):
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER {fts_table}_{suffix}")
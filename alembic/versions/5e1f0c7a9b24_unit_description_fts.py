@@ -0,0 +1,49 @@
+"""unit description fts
+
+Revision ID: 5e1f0c7a9b24
+Revises: 2c332002ee3f
+Create Date: 2026-10-17 10:12:41.503117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e1f0c7a9b24"
+down_revision: Union[str, Sequence[str], None] = "2c332002ee3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # external content table, the text itself stays in learningunit
+    op.execute("""
+        CREATE VIRTUAL TABLE unitdescriptionfts USING fts5(
+            content,
+            literature,
+            objective,
+            lecture_notes,
+            additional,
+            comment,
+            abstract,
+            content_english,
+            literature_english,
+            objective_english,
+            lecture_notes_english,
+            additional_english,
+            comment_english,
+            abstract_english,
+            content='learningunit',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    """)
+    op.execute("INSERT INTO unitdescriptionfts(unitdescriptionfts) VALUES('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE unitdescriptionfts")
@@ -0,0 +1,51 @@
+"""title and lecturer trigram fts
+
+Revision ID: a3c9d2e4f871
+Revises: 5e1f0c7a9b24
+Create Date: 2026-10-17 11:40:03.118452
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3c9d2e4f871"
+down_revision: Union[str, Sequence[str], None] = "5e1f0c7a9b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE VIRTUAL TABLE unittitlefts USING fts5(
+            title,
+            title_english,
+            number,
+            content='learningunit',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+    """)
+    op.execute("INSERT INTO unittitlefts(unittitlefts) VALUES('rebuild')")
+
+    op.execute("""
+        CREATE VIRTUAL TABLE lecturernamefts USING fts5(
+            name_surname,
+            surname_name,
+            content='',
+            tokenize='trigram'
+        )
+    """)
+    op.execute("""
+        INSERT INTO lecturernamefts(rowid, name_surname, surname_name)
+        SELECT id, name || ' ' || surname, surname || ' ' || name FROM lecturer
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE lecturernamefts")
+    op.execute("DROP TABLE unittitlefts")
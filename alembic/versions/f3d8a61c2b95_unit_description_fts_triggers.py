@@ -0,0 +1,75 @@
+"""unit description fts triggers
+
+Revision ID: f3d8a61c2b95
+Revises: e240a67bd7ea
+Create Date: 2026-10-17 15:02:18.640271
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3d8a61c2b95"
+down_revision: Union[str, Sequence[str], None] = "e240a67bd7ea"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DESCRIPTION_COLUMNS = (
+    "content",
+    "literature",
+    "objective",
+    "lecture_notes",
+    "additional",
+    "comment",
+    "abstract",
+    "content_english",
+    "literature_english",
+    "objective_english",
+    "lecture_notes_english",
+    "additional_english",
+    "comment_english",
+    "abstract_english",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # external content tables only index what they are told to, and removing a row
+    # requires the values it was indexed with
+    names = ", ".join(DESCRIPTION_COLUMNS)
+    new = ", ".join(f"new.{c}" for c in DESCRIPTION_COLUMNS)
+    old = ", ".join(f"old.{c}" for c in DESCRIPTION_COLUMNS)
+    delete = f"""
+        INSERT INTO unitdescriptionfts(unitdescriptionfts, rowid, {names})
+        VALUES('delete', old.id, {old});
+    """
+    insert = f"INSERT INTO unitdescriptionfts(rowid, {names}) VALUES(new.id, {new});"
+
+    op.execute(f"""
+        CREATE TRIGGER unitdescriptionfts_ai AFTER INSERT ON learningunit BEGIN
+            {insert}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER unitdescriptionfts_ad AFTER DELETE ON learningunit BEGIN
+            {delete}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER unitdescriptionfts_au AFTER UPDATE OF id, {names} ON learningunit
+        BEGIN
+            {delete}
+            {insert}
+        END
+    """)
+
+    # rows written since the index was last rebuilt
+    op.execute("INSERT INTO unitdescriptionfts(unitdescriptionfts) VALUES('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for suffix in ("ai", "ad", "au"):
+        op.execute(f"DROP TRIGGER unitdescriptionfts_{suffix}")
@@ -1,4 +1,4 @@
-from typing import final
+from typing import Literal, final
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -28,6 +28,56 @@ class Settings(BaseSettings):
     flag_webhook: str | None = None
     """Endpoint to send webhooks to if a unit is flagged"""
 
+    db_generations: bool = False
+    """Scrape into a copy of the data DB and publish it by pointing `db_path` at it, instead of writing to the live DB. Turns a plain `db_path` file into a symlink on the first publish"""
+    db_generations_kept: int = 2
+    """Published generations kept in the `generations` directory next to `db_path`"""
+    db_pool_size: int = 50
+    """Connections kept open per async engine. The `executor` driver keeps one per executor thread instead"""
+    db_max_overflow: int = 0
+    """Connections opened on top of `db_pool_size` under load. They are closed again when returned, so every use pays for opening and configuring them. Not used by the `executor` driver"""
+    sqlite_driver: Literal["aiosqlite", "executor"] = "aiosqlite"
+    """Driver of the async data DB engine. `aiosqlite` runs a thread per pooled connection, `executor` runs the queries of all connections on `sqlite_executor_threads` threads and opens them read-only"""
+    sqlite_executor_threads: int | None = None
+    """Threads of the `executor` driver, defaults to the amount of CPUs"""
+    sqlite_query_only: bool = True
+    """Opens the data DB of the API read-only. The scraper and migrations use the sync engines, which can always write"""
+    sqlite_cache_size: int = -16000
+    """Page cache per connection. Negative values are in KiB, positive ones in pages"""
+    sqlite_mmap_size: int = 30000000000
+    """Bytes of the DB file read through memory mapping instead of read calls"""
+    sqlite_temp_store: Literal["default", "file", "memory"] = "memory"
+    """Where temporary tables and indices of sorts and groupings are kept"""
+    sqlite_journal_mode: (
+        Literal["delete", "truncate", "persist", "memory", "wal", "off"] | None
+    ) = "wal"
+    """Journal mode set on every connection, None keeps the mode of the DB file. With `wal` the scraper's writes don't block API readers"""
+    sqlite_journal_size_limit: int = 64 * 1024 * 1024
+    """Bytes the WAL file is truncated to after it was fully checkpointed"""
+    db_statement_fingerprints: int = 200
+    """Distinct statements the SQL metrics are recorded for, any further ones are recorded as `other`"""
+    slow_statement_threshold_ms: float = 100
+    """Statements taking longer than this are sampled to the log with their parameters"""
+    slow_statement_sample_rate: float = 0.1
+    """Share of the slow statements that are logged"""
+
+    search_cache_size: int = 256
+    """Amount of search result pages kept in memory. Set to 0 to disable the cache"""
+    columnar_search: bool = False
+    """Evaluate structured search filters on in-memory arrays. Requires the `columnar` extra"""
+    slow_query_threshold_ms: float = 500
+    """Searches taking longer than this are written to the slow query log"""
+    slow_query_log_size: int = 10000
+    """Amount of slow searches kept in the meta DB. Set to 0 to disable the log"""
+    suggest_max_age: int = 300
+    """Seconds clients cache suggestions for, before revalidating them against the data generation"""
+    search_batch_size: int = 50
+    """Maximum amount of searches in a single batch request"""
+    search_batch_concurrency: int = 8
+    """Searches of a batch request that run at the same time, each holding a DB connection"""
+    explain_token: str | None = None
+    """Token for `explain=true` searches, passed in the `X-Explain-Token` header. Explaining is disabled if unset"""
+
     @property
     def zip_path(self) -> str:
         return self.db_path + ".zip"
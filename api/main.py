@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import os
 import re
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Annotated, Awaitable, Callable, Literal
+from typing import Annotated, AsyncIterator, Awaitable, Callable, Literal
 from urllib.parse import quote_plus
 
 import httpx
@@ -16,6 +17,7 @@ from fastapi.responses import (
     RedirectResponse,
     StreamingResponse,
 )
+from fastapi.routing import APIRoute
 from opentelemetry import trace
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
@@ -27,6 +29,7 @@ from pydantic import BaseModel
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
+from sqlalchemy.orm import defer
 from sqlmodel import col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette.background import BackgroundTask
@@ -41,20 +44,31 @@ from api.models import (
     Section,
     UnitExaminerLink,
     UnitLecturerLink,
+    UnitVersionView,
+    unit_attributes,
 )
 from api.routers.v1.units import get_unit
 from api.routers.v1_router import router as v1_router
-from api.routers.v2.search import search_units
+from api.routers.v2.search import OrderKey, has_free_text, run_search
 from api.routers.v2_router import router as v2_router
-from api.util.db import aget_meta_session, aget_session
+from api.util.db import (
+    aengine,
+    aget_meta_session,
+    ameta_engine,
+    count_statements,
+    reload_engines,
+)
 from api.util.influxdb import hasher, send_to_influxdb
-from api.util.parse_query import QueryKey
+from api.util.parse_query import build_search_operators
 from api.util.prometheus import (
+    REQUEST_DB_STATEMENTS,
     SEARCH_QUERY_COUNTER,
     SEARCH_QUERY_DURATION,
 )
 from api.util.sections import get_parent_from_unit
+from api.util.singleflight import SingleFlight
 from api.util.sitemap import generate_sitemap
+from api.util.suggest import suggestion_engine
 from api.util.templates import catalog_response
 from api.util.version import get_api_version
 from api.util.webhook import send_flagged_webhook
@@ -70,7 +84,19 @@ if settings.jaeger_endpoint:
 
 tracer = trace.get_tracer(__name__)
 
-app = FastAPI(title="VVZ API", version=get_api_version())
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # build the suggestion index before the first keystroke instead of on it
+    try:
+        _ = await suggestion_engine.index()
+    except Exception as e:
+        # e.g. a DB that isn't migrated yet, the first suggestion retries it
+        print(f"Failed to build the suggestion index on startup: {e!r}")
+    yield
+
+
+app = FastAPI(title="VVZ API", version=get_api_version(), lifespan=lifespan)
 FastAPIInstrumentor.instrument_app(app, excluded_urls="/static/*")
 Instrumentator().instrument(app).expose(app, include_in_schema=False, should_gzip=True)
 
@@ -113,7 +139,6 @@ async def send_analytics_event(request: Request):
     if request.headers.get("referer"):
         body["referrer"] = request.headers.get("referer")
 
-    settings = Settings()
     if settings.plausible_url:
         async with httpx.AsyncClient() as client:
             await client.post(
@@ -145,6 +170,27 @@ async def send_analytics_event(request: Request):
         await send_to_influxdb("pageview", tags=tags, fields=fields)
 
 
+@app.middleware("http")
+async def generation_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[StreamingResponse]]
+):
+    # switches to a newly published DB generation before the request opens a connection
+    await reload_engines()
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def statements_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[StreamingResponse]]
+):
+    with count_statements() as statements:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    if isinstance(route, APIRoute):
+        REQUEST_DB_STATEMENTS.labels(handler=route.path).observe(statements[0])
+    return response
+
+
 @app.middleware("http")
 async def analytics_middleware(
     request: Request, call_next: Callable[[Request], Awaitable[StreamingResponse]]
@@ -154,11 +200,10 @@ async def analytics_middleware(
     if 200 <= response.status_code < 300:
         if "Cache-Control" not in response.headers:
             response.headers["Cache-Control"] = (
-                f"public, max-age={Settings().cache_expiry}"
+                f"public, max-age={settings.cache_expiry}"
             )
 
     has_extension = re.search(r"\.\w+$", request.url.path) is not None
-    settings = Settings()
     if (
         response.status_code != 404
         and response.status_code != 307
@@ -179,18 +224,20 @@ async def root(
     query: Annotated[str | None, Query(alias="q"), str] = None,
     page: Annotated[int, Query(ge=1)] = 1,
     limit: Annotated[int | None, Query(ge=1, le=100)] = None,
-    order_by: QueryKey = "title_english",
-    order: str = "asc",
+    order_by: OrderKey | None = None,
+    order: str | None = None,
     view: Literal["big", "compact"] = "big",
+    cursor: str | None = None,
 ):
     SEARCH_QUERY_COUNTER.labels(has_query=True if query else False).inc()
     with tracer.start_as_current_span("root_search") as span:
         span.set_attribute("query", query or "")
         span.set_attribute("page", page)
         span.set_attribute("limit", limit or "default")
-        span.set_attribute("order_by", order_by)
-        span.set_attribute("order", order)
+        span.set_attribute("order_by", order_by or "default")
+        span.set_attribute("order", order or "default")
         span.set_attribute("view", view)
+        span.set_attribute("cursor", cursor or "")
 
         if not query:
             return catalog_response(
@@ -201,18 +248,32 @@ async def root(
         if limit is None:
             limit = 20 if view == "big" else 50
 
+        # free text is best sorted by how well it matches, everything else by title
+        default_order_by: OrderKey = "title_english"
+        default_order = "asc"
+        search_operators = build_search_operators(query)
+        if has_free_text(search_operators):
+            default_order_by, default_order = "relevance", "desc"
+        order_by = order_by or default_order_by
+        order = order or default_order
+
         with SEARCH_QUERY_DURATION.labels(
             has_query=True if query else False,
             order_by=order_by,
             order=order,
             view=view,
         ).time():
-            results = await search_units(
+            results = await run_search(
                 query,
+                background_tasks,
+                search_operators=search_operators,
                 offset=(page - 1) * limit,
                 limit=limit,
                 order_by=order_by,
                 order=order,
+                cursor=cursor,
+                # the result lists don't show the long texts and JSON fields
+                fields="list",
             )
 
         span.set_attribute("result_count", results.total)
@@ -229,7 +290,7 @@ async def root(
             },
             fields={
                 "query": query[:500],
-                "result_count": results.total,
+                "result_count": results.total or 0,
                 "exec_time_ms": results.exec_time_ms,
                 "page": page,
                 "limit": limit,
@@ -261,6 +322,8 @@ async def root(
             limit=limit,
             order_by=order_by,
             order=order,
+            default_order_by=default_order_by,
+            default_order=default_order,
             results=results,
             view=view,
             headers={
@@ -281,20 +344,58 @@ class RecursiveSection(BaseModel):
     sub_sections: list[RecursiveSection] = []
 
 
-@app.get("/unit/{unit_id}", include_in_schema=False)
-async def unit_detail(
-    request: Request,
-    unit_id: int,
-    session: Annotated[AsyncSession, Depends(aget_session)],
-    meta_session: Annotated[AsyncSession, Depends(aget_meta_session)],
-    query: Annotated[str | None, Query(alias="q"), str] = None,
-):
-    with tracer.start_as_current_span("unit_detail") as span:
+UNIT_PAGE_DEFERRED: tuple[str, ...] = (
+    "additional",
+    "additional_english",
+    "primary_target_group",
+    "competencies",
+    "competencies_english",
+    "regulations",
+    "groups",
+)
+"""Text and JSON fields of a unit that the unit page doesn't show"""
+
+
+class UnitDetail(BaseModel):
+    unit: LearningUnit
+    sections: list[RecursiveSection]
+    courses: list[Course]
+    lecturers: list[Lecturer]
+    examiners: list[Lecturer]
+    semkezs: list[tuple[int, str]]
+    newest_unit_id: int
+    average_rating: float | str
+    flagged: bool
+
+
+async def load_unit_detail(unit_id: int) -> UnitDetail | None:
+    """
+    Coalesced requests share the detail, so it is loaded on sessions of its own instead
+    of the ones of the request that started it, which are closed if it disconnects.
+    """
+    async with (
+        AsyncSession(aengine) as session,
+        AsyncSession(ameta_engine) as meta_session,
+    ):
+        detail = await _load_unit_detail(unit_id, session, meta_session)
+        session.expunge_all()
+        meta_session.expunge_all()
+        return detail
+
+
+async def _load_unit_detail(
+    unit_id: int, session: AsyncSession, meta_session: AsyncSession
+) -> UnitDetail | None:
+    with tracer.start_as_current_span("load_unit_detail") as span:
         span.set_attribute("unit_id", unit_id)
 
-        unit = await get_unit(unit_id, session)
-        if not unit:  # TODO: redirect to 404 page once implemented
-            return HTMLResponse(status_code=404)
+        unit = await session.get(
+            LearningUnit,
+            unit_id,
+            options=[defer(attr) for attr in unit_attributes(UNIT_PAGE_DEFERRED)],
+        )
+        if not unit:
+            return None
 
         span.set_attribute("unit_number", unit.number or "")
         span.set_attribute("unit_title", unit.title_english or "")
@@ -336,13 +437,18 @@ async def unit_detail(
             span.set_attribute("section_count", len(sections))
 
         with tracer.start_as_current_span("semkezs"):
-            semkezs = (
+            versions = (
                 await session.exec(
-                    select(LearningUnit.id, LearningUnit.semkez)
-                    .where(LearningUnit.number == unit.number)
-                    .distinct()
+                    select(
+                        UnitVersionView.unit_id,
+                        UnitVersionView.semkez,
+                        UnitVersionView.latest,
+                    )
+                    .where(UnitVersionView.number == unit.number)
+                    .order_by(col(UnitVersionView.semester_ordinal).desc())
                 )
             ).all()
+            semkezs = [(id, semkez) for id, semkez, _ in versions]
             span.set_attribute("semkez_count", len(semkezs))
 
         with tracer.start_as_current_span("section_tree"):
@@ -358,7 +464,7 @@ async def unit_detail(
                 else:
                     root_sections.append(section_ids[section.id])
 
-        with tracer.start_as_current_span("flagged") as span:
+        with tracer.start_as_current_span("flagged") as flagged_span:
             flagged = (
                 await meta_session.exec(
                     select(HTTPCache).where(
@@ -368,12 +474,12 @@ async def unit_detail(
                     )
                 )
             ).first()
-            span.set_attribute("is_flagged", flagged is not None)
+            flagged_span.set_attribute("is_flagged", flagged is not None)
 
         # allows us to add canonical links to the newest unit
-        newest_unit_id, _ = max(
-            [(id, sk.replace("W", "0").replace("S", "1")) for id, sk in semkezs],
-            key=lambda x: x[1],
+        newest_unit_id = next(
+            (id for id, _, latest in versions if latest),
+            unit.id,
         )
 
         with tracer.start_as_current_span("rating"):
@@ -383,31 +489,65 @@ async def unit_detail(
                 rating = await session.get(Rating, unit.number)
                 average_rating = rating.average() if rating else "n/a"
 
+        return UnitDetail(
+            unit=unit,
+            sections=root_sections,
+            courses=list(courses),
+            lecturers=list(lecturers),
+            examiners=list(examiners),
+            semkezs=semkezs,
+            newest_unit_id=newest_unit_id,
+            average_rating=average_rating,
+            flagged=flagged is not None,
+        )
+
+
+unit_detail_flight: SingleFlight[int, UnitDetail | None] = SingleFlight("unit_detail")
+
+
+@app.get("/unit/{unit_id}", include_in_schema=False)
+async def unit_detail(
+    request: Request,
+    unit_id: int,
+    query: Annotated[str | None, Query(alias="q"), str] = None,
+):
+    with tracer.start_as_current_span("unit_detail") as span:
+        span.set_attribute("unit_id", unit_id)
+
+        # a shared unit link gets opened by many people at once, who all see the same page
+        detail = await unit_detail_flight.do(unit_id, lambda: load_unit_detail(unit_id))
+        if not detail:  # TODO: redirect to 404 page once implemented
+            return HTMLResponse(status_code=404)
+
         links = {
-            str(request.url_for("unit_detail", unit_id=newest_unit_id)): "canonical"
+            str(
+                request.url_for("unit_detail", unit_id=detail.newest_unit_id)
+            ): "canonical"
         }
 
-        span.set_attribute("newest_unit_id", newest_unit_id)
+        span.set_attribute("newest_unit_id", detail.newest_unit_id)
         span.set_attribute(
             "average_rating",
-            average_rating if isinstance(average_rating, (int, float)) else -1,
+            detail.average_rating
+            if isinstance(detail.average_rating, (int, float))
+            else -1,
         )
 
         return catalog_response(
             "Unit.Index",
             request=request,
             query=query or "",
-            unit=unit,
-            sections=root_sections,
-            courses=courses,
-            lecturers=lecturers,
-            examiners=examiners,
-            semkezs=semkezs,
-            is_outdated=newest_unit_id != unit.id,
-            newest_unit_id=newest_unit_id,
-            average_rating=average_rating,
+            unit=detail.unit,
+            sections=detail.sections,
+            courses=detail.courses,
+            lecturers=detail.lecturers,
+            examiners=detail.examiners,
+            semkezs=detail.semkezs,
+            is_outdated=detail.newest_unit_id != detail.unit.id,
+            newest_unit_id=detail.newest_unit_id,
+            average_rating=detail.average_rating,
             links=links,
-            flagged=flagged is not None,
+            flagged=detail.flagged,
         )
 
 
@@ -416,11 +556,10 @@ async def flag_unit(
     request: Request,
     unit_id: int,
     background_task: BackgroundTasks,
-    session: Annotated[AsyncSession, Depends(aget_session)],
     meta_session: Annotated[AsyncSession, Depends(aget_meta_session)],
     query: Annotated[str | None, Query(alias="q"), str] = None,
 ):
-    unit = await get_unit(unit_id, session)
+    unit = await get_unit(unit_id)
     if not unit:
         return HTMLResponse(status_code=404)
 
@@ -439,7 +578,7 @@ async def flag_unit(
 
     await meta_session.commit()
 
-    if Settings().flag_webhook:
+    if settings.flag_webhook:
         background_task.add_task(
             send_flagged_webhook,
             unit_id=unit_id,
@@ -476,7 +615,7 @@ async def root_static(root: str):
         return HTMLResponse(status_code=404)
 
     if root == "sitemap.xml":
-        generate_sitemap(Settings().sitemap_expiry)
+        generate_sitemap(settings.sitemap_expiry)
         return FileResponse(
             Path(__file__).parent / "static" / "sitemap" / "sitemap.xml",
             media_type="application/xml",
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import time
 from enum import Enum
-from typing import final, override
+from typing import Iterable, final, override
 
 from pydantic import BaseModel as PydanticBaseModel
 from rapidfuzz import fuzz, process, utils
-from sqlalchemy import Index
+from sqlalchemy import Computed, Index, String
+from sqlalchemy.orm import InstrumentedAttribute
 from sqlmodel import INTEGER, JSON, Column, Field, SQLModel
 
 from api.util.pydantic_type import EnumList, PydanticType
@@ -31,6 +32,24 @@ class Overwriteable:
             setattr(self, field, value_other)
 
 
+SEMKEZ_YEAR = "CAST(substr(semkez, 1, 4) AS INTEGER)"
+SEMKEZ_SEMESTER = "substr(semkez, 5, 1)"
+SEMKEZ_ORDINAL = f"{SEMKEZ_YEAR} * 2 + ({SEMKEZ_SEMESTER} = 'W')"
+"""Spring semesters (S) come before autumn semesters (W) of the same year"""
+
+
+def year_column() -> Column[int]:
+    return Column(INTEGER, Computed(SEMKEZ_YEAR), index=True)
+
+
+def semester_column() -> Column[str]:
+    return Column(String, Computed(SEMKEZ_SEMESTER))
+
+
+def semester_ordinal_column() -> Column[int]:
+    return Column(INTEGER, Computed(SEMKEZ_ORDINAL), index=True)
+
+
 """
 
 
@@ -276,6 +295,14 @@ class LearningUnit(BaseModel, Overwriteable, table=True):
     id: int = Field(primary_key=True)
     semkez: str = Field(index=True)
     """Semester in the format JJJJS, where JJJJ is the year and either S or W indicates the semester."""
+    year: int | None = Field(default=None, sa_column=year_column())
+    """Year of `semkez`. Generated by the database."""
+    semester: str | None = Field(default=None, sa_column=semester_column())
+    """Either S or W. Generated by the database."""
+    semester_ordinal: int | None = Field(
+        default=None, sa_column=semester_ordinal_column()
+    )
+    """Increases by one every semester, for sorting and comparing semesters. Generated by the database."""
     number: str | None = Field(default=None, index=True)
     """263-3010-00L type code. Check the `RE_CODE` to more details on the format."""
     title: str | None = Field(default=None, index=True)
@@ -372,6 +399,40 @@ class LearningUnit(BaseModel, Overwriteable, table=True):
         return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.scraped_at))
 
 
+UNIT_TEXT_FIELDS: tuple[str, ...] = (
+    "literature",
+    "literature_english",
+    "objective",
+    "objective_english",
+    "content",
+    "content_english",
+    "lecture_notes",
+    "lecture_notes_english",
+    "additional",
+    "additional_english",
+    "comment",
+    "comment_english",
+    "abstract",
+    "abstract_english",
+)
+"""Long catalogue texts of a unit, only loaded where they are shown"""
+
+UNIT_JSON_FIELDS: tuple[str, ...] = (
+    "primary_target_group",
+    "competencies",
+    "competencies_english",
+    "regulations",
+    "groups",
+    "learning_materials",
+)
+"""JSON columns of a unit, which are decoded on every load, only loaded where they are shown"""
+
+
+def unit_attributes(names: Iterable[str]) -> list[InstrumentedAttribute[object]]:
+    """Mapped attributes of the unit fields, for loader options like `load_only` or `defer`"""
+    return [getattr(LearningUnit, name) for name in names]
+
+
 """
 
 
@@ -398,7 +459,14 @@ class SectionBase(BaseModel, Overwriteable):
 
 
 class Section(SectionBase, table=True):
-    pass
+    year: int | None = Field(default=None, sa_column=year_column())
+    """Year of `semkez`. Generated by the database."""
+    semester: str | None = Field(default=None, sa_column=semester_column())
+    """Either S or W. Generated by the database."""
+    semester_ordinal: int | None = Field(
+        default=None, sa_column=semester_ordinal_column()
+    )
+    """Increases by one every semester, for sorting and comparing semesters. Generated by the database."""
 
 
 """
@@ -450,6 +518,14 @@ class Course(BaseModel, Overwriteable, table=True):
     """263-3010-00L type code. Check the `RE_CODE` to more details on the format."""
     semkez: str = Field(primary_key=True)
     """Semester in the format JJJJS, where JJJJ is the year and either S or W indicates the semester."""
+    year: int | None = Field(default=None, sa_column=year_column())
+    """Year of `semkez`. Generated by the database."""
+    semester: str | None = Field(default=None, sa_column=semester_column())
+    """Either S or W. Generated by the database."""
+    semester_ordinal: int | None = Field(
+        default=None, sa_column=semester_ordinal_column()
+    )
+    """Increases by one every semester, for sorting and comparing semesters. Generated by the database."""
     # TODO: add foreign key back to unit_id if we need it = Field(foreign_key="learningunit.id", ondelete="CASCADE")
     unit_id: int = Field(primary_key=True, index=True)
     """Parent learning unit ID."""
@@ -572,6 +648,36 @@ class UnitDepartmentView(BaseModel, table=True):
     department_id: int = Field(primary_key=True, index=True)
 
 
+class UnitPersonView(BaseModel, table=True):
+    """
+    Materialized view of all lecturers and examiners of a unit, one row per person and role.
+    Replaces joining both link tables to Lecturer, which multiplies the examiners with the lecturers of a unit.
+    """
+
+    unit_id: int = Field(primary_key=True)
+    lecturer_id: int = Field(primary_key=True, index=True)
+    role: str = Field(primary_key=True)
+    """Either "lecturer" or "examiner"."""
+    name: str
+    surname: str
+    full_name: str
+    """"name surname" with surrounding whitespace removed"""
+
+
+class UnitVersionView(BaseModel, table=True):
+    """
+    Materialized view of all versions of a unit number, usually one per semester.
+    The newest version is the canonical unit of a number.
+    """
+
+    unit_id: int = Field(primary_key=True)
+    number: str = Field(index=True)
+    semkez: str
+    semester_ordinal: int
+    latest: bool
+    """True for the newest version of the number"""
+
+
 """
 
 
@@ -608,3 +714,26 @@ class LastCleanup(MetadataModel, table=True):
         default_factory=lambda: int(time.time()),
         sa_column=Column(INTEGER, nullable=False),
     )
+
+
+class SlowQuery(MetadataModel, table=True):
+    """Search that took longer than `slow_query_threshold_ms`. Only the newest ones are kept."""
+
+    id: int | None = Field(default=None, primary_key=True)
+    query: str
+    parsed_query: str
+    order_by: str
+    descending: bool
+    offset: int
+    limit: int
+    cursor: str | None = None
+    count_mode: str
+    latest: bool
+    total: int | None
+    exec_time_ms: float
+    timings: dict[str, float] = Field(default_factory=dict, sa_column=Column(JSON))
+    """Wall time of every phase of the search in milliseconds"""
+    logged_at: int = Field(
+        default_factory=lambda: int(time.time()),
+        sa_column=Column(INTEGER, nullable=False),
+    )
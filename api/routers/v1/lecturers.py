@@ -6,21 +6,31 @@ from sqlmodel import col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from api.models import Lecturer
-from api.util.db import aget_session
+from api.util.db import aengine, aget_session
+from api.util.singleflight import SingleFlight
 
 tracer = trace.get_tracer(__name__)
 
 router = APIRouter(prefix="/lecturer", tags=["Lecturers"])
 
+lecturer_flight: SingleFlight[int, Lecturer | None] = SingleFlight("lecturer")
+
+
+async def _load_lecturer(lecturer_id: int) -> Lecturer | None:
+    # shared by coalesced requests, so it can't use the session of the one that started it
+    async with AsyncSession(aengine) as session:
+        lecturer = await session.get(Lecturer, lecturer_id)
+        session.expunge_all()
+        return lecturer
+
 
 @router.get("/get/{lecturer_id}", response_model=Lecturer | None)
-async def get_lecturer(
-    session: Annotated[AsyncSession, Depends(aget_session)],
-    lecturer_id: int,
-) -> Lecturer | None:
+async def get_lecturer(lecturer_id: int) -> Lecturer | None:
     with tracer.start_as_current_span("get_lecturer") as span:
         span.set_attribute("lecturer_id", lecturer_id)
-        return await session.get(Lecturer, lecturer_id)
+        return await lecturer_flight.do(
+            lecturer_id, lambda: _load_lecturer(lecturer_id)
+        )
 
 
 @router.get("/list", response_model=Sequence[Lecturer])
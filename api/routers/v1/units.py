@@ -13,23 +13,31 @@ from api.models import (
     UnitExaminerLink,
     UnitLecturerLink,
 )
-from api.util.db import aget_session
+from api.util.db import aengine, aget_session
 from api.util.sections import get_parent_from_unit
+from api.util.singleflight import SingleFlight
 from api.util.unit_filter import VVZFilters, build_vvz_filter
 
 tracer = trace.get_tracer(__name__)
 
 router = APIRouter(prefix="/unit", tags=["Learning Units"])
 
+unit_flight: SingleFlight[int, LearningUnit | None] = SingleFlight("unit")
+
+
+async def _load_unit(unit_id: int) -> LearningUnit | None:
+    # shared by coalesced requests, so it can't use the session of the one that started it
+    async with AsyncSession(aengine) as session:
+        unit = await session.get(LearningUnit, unit_id)
+        session.expunge_all()
+        return unit
+
 
 @router.get("/{unit_id}/get", response_model=LearningUnit | None)
-async def get_unit(
-    unit_id: int,
-    session: Annotated[AsyncSession, Depends(aget_session)],
-) -> LearningUnit | None:
+async def get_unit(unit_id: int) -> LearningUnit | None:
     with tracer.start_as_current_span("get_unit") as span:
         span.set_attribute("unit_id", unit_id)
-        return await session.get(LearningUnit, unit_id)
+        return await unit_flight.do(unit_id, lambda: _load_unit(unit_id))
 
 
 @router.get("/{unit_id}/sections", response_model=Sequence[int])
@@ -1,14 +1,27 @@
+# pyright: reportAny=false, reportExplicitAny=false
+
 import asyncio
+import json
+import secrets
 from collections import defaultdict
+from functools import partial
 from timeit import default_timer
-from typing import Annotated, cast, override
+from typing import Annotated, Any, Literal, cast, override
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, BackgroundTasks, Body, Header, HTTPException, Query
 from opentelemetry import trace
-from pydantic import BaseModel
+from pydantic import (
+    BaseModel,
+    Field,
+    FieldSerializationInfo,
+    SerializerFunctionWrapHandler,
+    field_serializer,
+)
+from pyparsing import ParseBaseException
+from sqlalchemy import Select, inspect, literal
+from sqlalchemy.orm import InstrumentedAttribute, Mapped, load_only
 from sqlalchemy.sql.elements import BinaryExpression, ColumnElement
 from sqlmodel import (
-    Integer,
     String,
     and_,
     col,
@@ -24,34 +37,128 @@ from sqlmodel import (
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from api.models import (
+    UNIT_JSON_FIELDS,
+    UNIT_TEXT_FIELDS,
     Department,
     LearningUnit,
-    Lecturer,
     Rating,
     SectionPathView,
+    SlowQuery,
     UnitDepartmentView,
-    UnitExaminerLink,
-    UnitLecturerLink,
+    UnitPersonView,
     UnitSectionLink,
+    UnitVersionView,
+    unit_attributes,
+)
+from api.env import Settings
+from api.util.cache import GenerationalLRUCache
+from api.util.cursor import (
+    CursorValue,
+    InvalidCursor,
+    SortKey,
+    decode_cursor,
+    encode_cursor,
+    seek_clause,
 )
 from api.util.db import aengine
+from api.util.explain import compile_sql, query_plan, timed
+from api.util.fts import (
+    DESCRIPTION_COLUMNS,
+    DESCRIPTION_COLUMNS_ENGLISH,
+    DESCRIPTION_COLUMNS_GERMAN,
+    TITLE_COLUMNS,
+    UNIT_DESCRIPTION_FTS,
+    UNIT_TITLE_FTS,
+    can_use_fts,
+    description_match,
+    fts_ranks,
+    lecturer_match,
+    title_match,
+)
+from api.util.fuzzy import TitleCorpus, title_corpus_engine
+from api.util.optimize_query import optimize_query
 from api.util.parse_query import (
     AND,
+    IN,
     OR,
     FilterOperator,
     Operator,
     QueryKey,
     build_search_operators,
+    canonical,
 )
+from api.util.singleflight import SingleFlight
+from api.util.slow_queries import is_slow, log_slow_query
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
 tracer = trace.get_tracer(__name__)
 
+settings = Settings()
+
+
+UNIT_FIELDS: tuple[str, ...] = tuple(
+    name for name in LearningUnit.model_fields if name in inspect(LearningUnit).columns
+)
+"""Fields of a unit that can be requested with `fields`"""
+
+SLIM_FIELDS: tuple[str, ...] = (
+    "id",
+    "semkez",
+    "number",
+    "title",
+    "title_english",
+    "credits",
+)
+"""Fields of `fields=slim`, enough to list and link to the results"""
+
+LIST_FIELDS: tuple[str, ...] = tuple(
+    name
+    for name in UNIT_FIELDS
+    if name not in UNIT_TEXT_FIELDS + UNIT_JSON_FIELDS
+    or name in ("abstract", "abstract_english")
+)
+"""Fields of `fields=list`, everything the result lists of the website show"""
+
+FIELD_PRESETS: dict[str, tuple[str, ...]] = {"slim": SLIM_FIELDS, "list": LIST_FIELDS}
+
+GROUPING_FIELDS: tuple[str, ...] = ("id", "semkez", "number")
+"""Always loaded, since the units are grouped and ordered by them"""
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    Unit fields of a comma separated `fields` parameter in the order of the model,
+    so equivalent lists share a cache entry. None if all fields are requested.
+    """
+    if not fields:
+        return None
+    if preset := FIELD_PRESETS.get(fields):
+        return preset
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if unknown := requested.difference(UNIT_FIELDS):
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in UNIT_FIELDS if name in requested)
+
 
 class GroupedLearningUnits(BaseModel):
     number: str
     units: list[LearningUnit]
+    """Units with this number, newest semester first"""
+    fields: tuple[str, ...] | None = Field(default=None, exclude=True)
+    """Fields of the units that were loaded and are serialized, all if None"""
+
+    @field_serializer("units", mode="wrap")
+    def _serialize_units(
+        self,
+        units: list[LearningUnit],
+        handler: SerializerFunctionWrapHandler,
+        info: FieldSerializationInfo,
+    ) -> Any:
+        if self.fields is None:
+            return handler(units)
+        include = set(self.fields)
+        return [unit.model_dump(mode=info.mode, include=include) for unit in units]
 
     @property
     def semkezs(self) -> list[str]:
@@ -60,9 +167,7 @@ class GroupedLearningUnits(BaseModel):
     def latest_unit(self) -> LearningUnit | None:
         if not self.units:
             return None
-        return max(
-            self.units, key=lambda unit: unit.semkez.replace("W", "0").replace("S", "1")
-        )
+        return self.units[0]
 
     def with_semkez(self, semkez: str) -> LearningUnit | None:
         for unit in self.units:
@@ -72,53 +177,182 @@ class GroupedLearningUnits(BaseModel):
 
     @override
     def __iter__(self):
-        for unit in sorted(
-            self.units,
-            key=lambda u: u.semkez.replace("W", "0").replace("S", "1"),
-            reverse=True,
-        ):
+        for unit in self.units:
             yield unit.semkez, unit
 
 
-def _build_boolean_clause(op: AND | OR):
+CountMode = Literal["exact", "estimate", "none"]
+"""
+How the total of a search is determined:
+- `exact`: counted over all matches, in the same query as the page
+- `estimate`: lower bound from the position of the page (`offset` or `cursor`) and the page, which skips the count
+- `none`: not counted at all
+"""
+
+OrderKey = QueryKey | Literal["relevance"]
+"""
+What the results are sorted by. `relevance` ranks the free text of the query
+(titles and descriptions) with the FTS5 `bm25()` function, title hits first.
+"""
+
+TITLE_RANK_WEIGHT = 10.0
+"""How much more a title hit counts than a description hit for the relevance"""
+
+type SearchKey = tuple[
+    str,
+    str,
+    OrderKey,
+    bool,
+    int,
+    int,
+    str | None,
+    CountMode,
+    bool,
+    tuple[str, ...] | None,
+]
+"""Normalized parameters of a search, for caching and coalescing"""
+
+type MatchResult = tuple[
+    int | None, dict[str, GroupedLearningUnits], AND | OR, str | None
+]
+"""Total amount of numbers, the grouped units of the page, filters used and the cursor of the next page"""
+
+
+def _membership_clause(op: IN) -> tuple[ColumnElement[bool] | None, IN]:
+    """
+    Matches all units with any of the values of the `IN`, using a single lookup.
+    Invalid values are ignored like in separate filters.
+    """
+    values = op.values
+    used = [cast(FilterOperator, f) for f in op.ops]
+    clause: ColumnElement[bool] | None = None
+    match op.key:
+        case "number":
+            clause = title_match(values, (col(LearningUnit.number),))
+        case "title":
+            clause = title_match(values, TITLE_COLUMNS)
+        case "title_english":
+            clause = title_match(values, (col(LearningUnit.title_english),))
+        case "title_german":
+            clause = title_match(values, (col(LearningUnit.title),))
+        case "lecturer":
+            clause = lecturer_match(values)
+        case "descriptions":
+            clause = description_match(values, DESCRIPTION_COLUMNS)
+        case "descriptions_english":
+            clause = description_match(values, DESCRIPTION_COLUMNS_ENGLISH)
+        case "descriptions_german":
+            clause = description_match(values, DESCRIPTION_COLUMNS_GERMAN)
+        case "department":
+            departments = {
+                dept
+                for value in values
+                if (dept := Department.closest_match(value)) is not None
+            }
+            used = [
+                FilterOperator(key=op.key, operator=Operator.eq, value=str(dept))
+                for dept in sorted(departments, key=lambda d: d.value)
+            ]
+            if departments:
+                clause = col(LearningUnit.id).in_(
+                    select(UnitDepartmentView.unit_id).where(
+                        col(UnitDepartmentView.department_id).in_(
+                            [dept.value for dept in departments]
+                        )
+                    )
+                )
+        case "year":
+            years = sorted({int(value) for value in values if value.isdigit()})
+            used = [f for f in used if f.value.isdigit()]
+            if years:
+                clause = col(LearningUnit.year).in_(years)
+        case "credits":
+            credits: set[float] = set()
+            valid: list[FilterOperator] = []
+            for filter_ in used:
+                try:
+                    credits.add(float(filter_.value))
+                    valid.append(filter_)
+                except ValueError:
+                    pass
+            used = valid
+            if credits:
+                clause = col(LearningUnit.credits).in_(sorted(credits))
+        case "semester":
+            semesters = {
+                "W" if value[0].upper() in ("W", "H") else "S"
+                for value in values
+                if value and value[0].upper() in ("S", "W", "F", "H")
+            }
+            used = [
+                FilterOperator(
+                    key=op.key,
+                    operator=Operator.eq,
+                    value="FS" if semester == "S" else "HS",
+                )
+                for semester in sorted(semesters)
+            ]
+            if semesters:
+                clause = col(LearningUnit.semester).in_(sorted(semesters))
+        case _:
+            raise ValueError(f"Can't match {op.key} filters in a single lookup")
+    return clause, IN(ops=list(used))
+
+
+def _build_boolean_clause(
+    op: AND | OR, fuzzy_numbers: dict[str, list[str]] | None = None
+):
+    """`fuzzy_numbers` has to map the value of every fuzzy title filter to its numbers"""
     with tracer.start_as_current_span("build_boolean_clause") as span:
         booleans: list[BinaryExpression[bool] | ColumnElement[bool]] = []
         filters_used = OR(ops=[]) if isinstance(op, OR) else AND(ops=[])
 
         offered_in_names: set[str] = set()
-        not_offered_in_names: set[str] = set()
         for filter_ in op.ops:
+            if isinstance(filter_, IN):
+                clause, used_in = _membership_clause(filter_)
+                if clause is not None:
+                    booleans.append(clause)
+                    filters_used.ops.append(used_in)
+                continue
             if isinstance(filter_, (AND, OR)):
-                clause, used_filters = _build_boolean_clause(filter_)
+                clause, used_filters = _build_boolean_clause(filter_, fuzzy_numbers)
                 booleans.append(clause)
                 filters_used.ops.append(used_filters)
                 continue
             match filter_.key:
                 case "title_german":
-                    clause = col(LearningUnit.title).contains(filter_.value)
+                    clause = title_match(filter_.value, (col(LearningUnit.title),))
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "title_english":
-                    clause = col(LearningUnit.title_english).contains(filter_.value)
+                    clause = title_match(
+                        filter_.value, (col(LearningUnit.title_english),)
+                    )
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "title":
-                    clause = or_(
-                        func.coalesce(LearningUnit.title, "").contains(filter_.value),
-                        func.coalesce(LearningUnit.title_english, "").contains(
-                            filter_.value
-                        ),
+                    clause = title_match(filter_.value, TITLE_COLUMNS)
+                    if filter_.operator == Operator.ne:
+                        clause = not_(clause)
+                    booleans.append(clause)
+                    filters_used.ops.append(filter_)
+                case "title_fuzzy":
+                    if fuzzy_numbers is None or filter_.value not in fuzzy_numbers:
+                        raise ValueError("Fuzzy title filters require their numbers")
+                    clause = _in_json_list(
+                        col(LearningUnit.number), fuzzy_numbers[filter_.value]
                     )
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "number":
-                    clause = col(LearningUnit.number).contains(filter_.value)
+                    clause = title_match(filter_.value, (col(LearningUnit.number),))
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "credits":
@@ -146,33 +380,17 @@ def _build_boolean_clause(op: AND | OR):
                     year_value = int(filter_.value)
                     match filter_.operator:
                         case Operator.eq:
-                            booleans.append(
-                                func.substr(LearningUnit.semkez, 1, 4)
-                                == str(year_value)
-                            )
+                            booleans.append(col(LearningUnit.year) == year_value)
                         case Operator.ne:
-                            booleans.append(
-                                func.substr(LearningUnit.semkez, 1, 4)
-                                != str(year_value)
-                            )
+                            booleans.append(col(LearningUnit.year) != year_value)
                         case Operator.gt:
-                            booleans.append(
-                                func.substr(LearningUnit.semkez, 1, 4) > str(year_value)
-                            )
+                            booleans.append(col(LearningUnit.year) > year_value)
                         case Operator.lt:
-                            booleans.append(
-                                func.substr(LearningUnit.semkez, 1, 4) < str(year_value)
-                            )
+                            booleans.append(col(LearningUnit.year) < year_value)
                         case Operator.ge:
-                            booleans.append(
-                                func.substr(LearningUnit.semkez, 1, 4)
-                                >= str(year_value)
-                            )
+                            booleans.append(col(LearningUnit.year) >= year_value)
                         case Operator.le:
-                            booleans.append(
-                                func.substr(LearningUnit.semkez, 1, 4)
-                                <= str(year_value)
-                            )
+                            booleans.append(col(LearningUnit.year) <= year_value)
                     filters_used.ops.append(filter_)
                 case "semester":
                     if len(filter_.value) == 0 or filter_.value[0].upper() not in [
@@ -188,13 +406,9 @@ def _build_boolean_clause(op: AND | OR):
                     elif sem_filter == "H":  # hs
                         sem_filter = "W"
                     if filter_.operator == Operator.ne:
-                        booleans.append(
-                            func.substr(LearningUnit.semkez, 5, 1) != sem_filter
-                        )
+                        booleans.append(col(LearningUnit.semester) != sem_filter)
                     else:
-                        booleans.append(
-                            func.substr(LearningUnit.semkez, 5, 1) == sem_filter
-                        )
+                        booleans.append(col(LearningUnit.semester) == sem_filter)
                     filters_used.ops.append(
                         FilterOperator(
                             operator=filter_.operator,
@@ -203,175 +417,29 @@ def _build_boolean_clause(op: AND | OR):
                         )
                     )
                 case "lecturer":
-                    clause = or_(
-                        func.concat(Lecturer.name, " ", Lecturer.surname).like(
-                            f"%{filter_.value}%"
-                        ),
-                        func.concat(Lecturer.surname, " ", Lecturer.name).like(
-                            f"%{filter_.value}%"
-                        ),
-                    )
+                    clause = lecturer_match(filter_.value)
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "descriptions_german":
-                    clause = or_(
-                        (
-                            func.coalesce(LearningUnit.content, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.literature, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.objective, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.lecture_notes, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.additional, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.comment, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.abstract, "").contains(
-                                filter_.value
-                            )
-                        ),
+                    clause = description_match(
+                        filter_.value, DESCRIPTION_COLUMNS_GERMAN
                     )
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "descriptions_english":
-                    clause = or_(
-                        (
-                            func.coalesce(LearningUnit.content_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.literature_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.objective_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(
-                                LearningUnit.lecture_notes_english, ""
-                            ).contains(filter_.value)
-                        ),
-                        (
-                            func.coalesce(LearningUnit.additional_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.comment_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.abstract_english, "").contains(
-                                filter_.value
-                            )
-                        ),
+                    clause = description_match(
+                        filter_.value, DESCRIPTION_COLUMNS_ENGLISH
                     )
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
                     filters_used.ops.append(filter_)
                 case "descriptions":
-                    clause = or_(
-                        (
-                            func.coalesce(LearningUnit.content, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.content_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.literature, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.literature_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.objective, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.objective_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.lecture_notes, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(
-                                LearningUnit.lecture_notes_english, ""
-                            ).contains(filter_.value)
-                        ),
-                        (
-                            func.coalesce(LearningUnit.additional, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.additional_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.comment, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.comment_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.abstract, "").contains(
-                                filter_.value
-                            )
-                        ),
-                        (
-                            func.coalesce(LearningUnit.abstract_english, "").contains(
-                                filter_.value
-                            )
-                        ),
-                    )
+                    clause = description_match(filter_.value, DESCRIPTION_COLUMNS)
                     if filter_.operator == Operator.ne:
                         clause = not_(clause)
                     booleans.append(clause)
@@ -414,7 +482,21 @@ def _build_boolean_clause(op: AND | OR):
                     filters_used.ops.append(filter_)
                 case "offered":
                     if filter_.operator == Operator.ne:
-                        not_offered_in_names.add(filter_.value)
+                        # anti-join, since a unit is offered in multiple sections
+                        # and any other section would match a negation of the joined rows
+                        sections = (
+                            select(UnitSectionLink.unit_id)
+                            .join(
+                                SectionPathView,
+                                onclause=col(UnitSectionLink.section_id)
+                                == SectionPathView.id,
+                            )
+                            .where(
+                                col(SectionPathView.path_en).contains(filter_.value)
+                                | col(SectionPathView.path_de).contains(filter_.value)
+                            )
+                        )
+                        booleans.append(not_(col(LearningUnit.id).in_(sections)))
                     else:
                         offered_in_names.add(filter_.value)
                     filters_used.ops.append(filter_)
@@ -463,17 +545,6 @@ def _build_boolean_clause(op: AND | OR):
             else:
                 clauses = and_(*clauses)
             booleans.append(clauses)
-        if not_offered_in_names:
-            clauses = (
-                col(SectionPathView.path_en).contains(name)
-                | col(SectionPathView.path_de).contains(name)
-                for name in not_offered_in_names
-            )
-            if isinstance(op, OR):
-                clauses = or_(*clauses)
-            else:
-                clauses = and_(*clauses)
-            booleans.append(not_(clauses))
 
         span.set_attribute("num_filters", len(filters_used.ops))
         span.set_attribute("num_db_filters", len(booleans))
@@ -488,49 +559,314 @@ def _build_boolean_clause(op: AND | OR):
             return or_(*booleans), filters_used
 
 
+async def _filter_clause(
+    op: AND | OR, fuzzy_numbers: dict[str, list[str]] | None
+) -> tuple[ColumnElement[bool], AND | OR]:
+    """
+    Builds the clause of all filters. With `columnar_search` enabled, the filters the
+    columnar engine can evaluate are replaced by the ids of the units they match.
+    """
+    clause, filters_used = _build_boolean_clause(op, fuzzy_numbers)
+    if not settings.columnar_search:
+        return clause, filters_used
+
+    # numpy is an optional dependency
+    from api.util.columnar import Unservable, columnar_engine
+
+    units = await columnar_engine.units()
+    with tracer.start_as_current_span("columnar_filter") as span:
+        try:
+            ids = units.matching_ids(op)
+            span.set_attribute("columnar", "full")
+            return _in_json_list(col(LearningUnit.id), ids), filters_used
+        except Unservable:
+            pass
+
+        if isinstance(op, OR):
+            span.set_attribute("columnar", "none")
+            return clause, filters_used
+
+        # a unit matches an AND if it matches every child, so the
+        # children can be split between the arrays and SQL
+        servable: list[FilterOperator | AND | OR] = []
+        rest: list[FilterOperator | AND | OR] = []
+        for child in op.ops:
+            try:
+                _ = units.evaluate(AND(ops=[child]))
+                servable.append(child)
+            except Unservable:
+                rest.append(child)
+            except ValueError:
+                pass  # invalid filters are ignored anyway
+
+        if not servable:
+            span.set_attribute("columnar", "none")
+            return clause, filters_used
+
+        span.set_attribute("columnar", "partial")
+        ids_clause = _in_json_list(
+            col(LearningUnit.id), units.matching_ids(AND(ops=servable))
+        )
+        try:
+            rest_clause, _ = _build_boolean_clause(AND(ops=rest), fuzzy_numbers)
+        except ValueError:
+            return ids_clause, filters_used
+        return and_(ids_clause, rest_clause), filters_used
+
+
+def _in_json_list(
+    column: Mapped[Any], values: list[int] | list[str]
+) -> ColumnElement[bool]:
+    # passed as a single JSON parameter, since there can be more values than SQLite allows variables
+    json_values = func.json_each(json.dumps(values)).table_valued("value")
+    return column.in_(select(json_values.c.value))
+
+
+def _ranked_filters(op: AND | OR) -> list[FilterOperator]:
+    """Free text filters of the tree that can be ranked by the FTS indices"""
+    return [
+        f
+        for f in op
+        if f.key
+        in (
+            "title",
+            "title_english",
+            "title_german",
+            "descriptions",
+            "descriptions_english",
+            "descriptions_german",
+        )
+        and f.operator == Operator.eq
+        and can_use_fts(f.value)
+    ]
+
+
+def has_free_text(op: AND | OR) -> bool:
+    return bool(_ranked_filters(op))
+
+
+def _relevance(
+    query: Select[Any], filters: AND | OR
+) -> tuple[Select[Any], ColumnElement[float]]:
+    """
+    Joins the `bm25()` ranks of every free text filter to the units and sums them
+    up to a score, where higher is more relevant. Title filters also rank the
+    descriptions, so units mentioning the text in the description come first
+    among units with equally good title hits.
+    """
+    scores: list[ColumnElement[float]] = []
+    for i, filter_ in enumerate(_ranked_filters(filters)):
+        ranks: list[tuple[str, tuple[Mapped[str | None], ...], float]] = []
+        match filter_.key:
+            case "title":
+                ranks = [
+                    (UNIT_TITLE_FTS, TITLE_COLUMNS, TITLE_RANK_WEIGHT),
+                    (UNIT_DESCRIPTION_FTS, DESCRIPTION_COLUMNS, 1.0),
+                ]
+            case "title_english":
+                ranks = [
+                    (
+                        UNIT_TITLE_FTS,
+                        (col(LearningUnit.title_english),),
+                        TITLE_RANK_WEIGHT,
+                    ),
+                    (UNIT_DESCRIPTION_FTS, DESCRIPTION_COLUMNS_ENGLISH, 1.0),
+                ]
+            case "title_german":
+                ranks = [
+                    (UNIT_TITLE_FTS, (col(LearningUnit.title),), TITLE_RANK_WEIGHT),
+                    (UNIT_DESCRIPTION_FTS, DESCRIPTION_COLUMNS_GERMAN, 1.0),
+                ]
+            case "descriptions":
+                ranks = [(UNIT_DESCRIPTION_FTS, DESCRIPTION_COLUMNS, 1.0)]
+            case "descriptions_english":
+                ranks = [(UNIT_DESCRIPTION_FTS, DESCRIPTION_COLUMNS_ENGLISH, 1.0)]
+            case "descriptions_german":
+                ranks = [(UNIT_DESCRIPTION_FTS, DESCRIPTION_COLUMNS_GERMAN, 1.0)]
+            case _:
+                pass
+        for j, (fts_table, columns, weight) in enumerate(ranks):
+            ranked = fts_ranks(fts_table, filter_.value, columns).subquery(
+                f"rank_{i}_{j}"
+            )
+            query = query.outerjoin(ranked, ranked.c.rowid == LearningUnit.id)
+            # bm25 ranks are negative, with better matches being lower
+            scores.append(-weight * func.coalesce(ranked.c.rank, 0.0))
+
+    if not scores:
+        return query, literal(0.0)
+    relevance = scores[0]
+    for score in scores[1:]:
+        relevance = relevance + score
+    return query, relevance
+
+
+def _sort_keys(
+    order_by: OrderKey,
+    descending: bool,
+    average_rating: ColumnElement[float] | None,
+    relevance: ColumnElement[float] | None = None,
+) -> list[SortKey]:
+    """
+    Sort keys of a unit number. A number can have multiple matching units (one per semester),
+    so every key is aggregated over them. Missing values are replaced by a value that sorts
+    the same way SQLite sorts NULLs, so the keys can be compared in a cursor.
+    """
+    year = col(LearningUnit.year)
+    semester = col(LearningUnit.semester)
+
+    order_by_clauses: list[ColumnElement[Any] | Mapped[Any]] = []
+    match order_by:
+        case "title" | "title_english" | "title_fuzzy":
+            order_by_clauses = [func.coalesce(LearningUnit.title_english, "")]
+        case "title_german":
+            order_by_clauses = [func.coalesce(LearningUnit.title, "")]
+        case "number":
+            order_by_clauses = [func.coalesce(LearningUnit.number, "")]
+        case "credits":
+            order_by_clauses = [func.coalesce(LearningUnit.credits, -1)]
+        case "semester":
+            order_by_clauses = [semester]
+        case "lecturer":
+            order_by_clauses = [
+                func.coalesce(UnitPersonView.surname, ""),
+                func.coalesce(UnitPersonView.name, ""),
+            ]
+        case "department":
+            order_by_clauses = [
+                func.coalesce(sql_cast(LearningUnit.departments, String), "")
+            ]
+        case "level":
+            order_by_clauses = [
+                func.coalesce(sql_cast(LearningUnit.levels, String), "")
+            ]
+        case "language":
+            order_by_clauses = [func.coalesce(LearningUnit.language, "")]
+        case "coursereview":
+            if average_rating is not None:
+                order_by_clauses = [average_rating]
+        case "relevance":
+            if relevance is not None:
+                order_by_clauses = [relevance]
+        case (
+            "year"
+            | "descriptions"
+            | "descriptions_english"
+            | "descriptions_german"
+            | "offered"
+            | "examtype"
+        ):
+            pass
+
+    keys: list[tuple[ColumnElement[Any] | Mapped[Any], bool]] = [
+        *((x, descending) for x in order_by_clauses),
+        (func.coalesce(LearningUnit.title_english, ""), False),
+        (func.coalesce(LearningUnit.title, ""), False),
+        (year, True),
+    ]
+    aggregated: list[SortKey] = [
+        (func.max(x) if desc else func.min(x), desc) for x, desc in keys
+    ]
+    # the number is unique per group and makes the order total
+    return [
+        *aggregated,
+        (
+            cast(
+                InstrumentedAttribute[str | None], col(LearningUnit.number)
+            ).expression,
+            False,
+        ),
+    ]
+
+
+def _count_query(query: Select[Any]) -> Select[Any]:
+    return query.with_only_columns(func.count(distinct(LearningUnit.number))).order_by(
+        None
+    )
+
+
+async def _count(query: Select[Any]) -> int:
+    async with AsyncSession(aengine) as session:
+        with tracer.start_as_current_span("execute_count_query"):
+            (count,) = (await session.execute(_count_query(query))).one()
+    return cast(int, count)
+
+
+class SearchExplain(BaseModel):
+    parsed_query: str
+    """Filter tree as parsed from the query"""
+    optimized_query: str | None = None
+    """Filter tree after optimizing. None if the filters contradict each other and no SQL was run"""
+    results_sql: str | None = None
+    count_sql: str | None = None
+    """Counts all matches. Only run by itself if the page doesn't carry the total"""
+    results_plan: list[str] = []
+    """`EXPLAIN QUERY PLAN` of the results query"""
+    count_plan: list[str] = []
+    timings_ms: dict[str, float] = {}
+    """Wall time of every phase: parse, clause, compile, count, results and group"""
+
+
 async def match_filters(
     filters: AND | OR,
     *,
     offset: int = 0,
     limit: int = 20,
-    order_by: QueryKey = "year",
+    order_by: OrderKey = "year",
     descending: bool = True,
-) -> tuple[int, dict[str, GroupedLearningUnits], AND | OR]:
+    cursor: str | None = None,
+    count_mode: CountMode = "exact",
+    latest_only: bool = False,
+    fields: tuple[str, ...] | None = None,
+    timings: dict[str, float] | None = None,
+    explain: SearchExplain | None = None,
+) -> MatchResult:
+    """
+    Only the given `fields` of the units are loaded, see `parse_fields`.
+    The wall time of every phase is added to `timings` and the SQL
+    and query plans are written to `explain`, if they are given.
+    """
     with tracer.start_as_current_span("match_filters") as span:
         span.set_attribute("offset", offset)
         span.set_attribute("limit", limit)
         span.set_attribute("order_by", order_by)
         span.set_attribute("descending", descending)
+        span.set_attribute("cursor", cursor or "")
+        span.set_attribute("count_mode", count_mode)
+        span.set_attribute("latest_only", latest_only)
 
-        query = select(
-            LearningUnit,
-            year := sql_cast(func.substr(LearningUnit.semkez, 1, 4), Integer),
-            semester := sql_cast(func.substr(LearningUnit.semkez, 5, 1), String),
-        )
+        with timed(timings, "clause"):
+            optimized = optimize_query(filters)
+        if explain is not None:
+            explain.optimized_query = str(optimized) if optimized else None
+        if optimized is None:
+            # contradicting filters like `y=2020 y=2021` can't match anything
+            span.set_attribute("unsatisfiable", True)
+            return (None if count_mode == "none" else 0, {}, filters, None)
+        filters = optimized
+
+        query = select(LearningUnit.number)
 
         #########
         # Joins #
         #########
-        if any(f.key == "lecturer" for f in filters) or order_by == "lecturer":
-            query = (
-                query.join(
-                    UnitExaminerLink,
-                    onclause=col(LearningUnit.id) == UnitExaminerLink.unit_id,
-                )
-                .join(
-                    UnitLecturerLink,
-                    onclause=col(LearningUnit.id) == UnitLecturerLink.unit_id,
-                )
-                .join(
-                    Lecturer,
-                    onclause=or_(
-                        col(UnitExaminerLink.lecturer_id) == Lecturer.id,
-                        col(UnitLecturerLink.lecturer_id) == Lecturer.id,
-                    ),
-                )
+        if order_by == "lecturer":
+            # lecturer filters are semi-joins, so the persons are only joined for sorting
+            query = query.outerjoin(
+                UnitPersonView,
+                onclause=col(LearningUnit.id) == UnitPersonView.unit_id,
+            )
+
+        if latest_only:
+            query = query.join(
+                UnitVersionView,
+                onclause=and_(
+                    col(LearningUnit.id) == UnitVersionView.unit_id,
+                    col(UnitVersionView.latest).is_(True),
+                ),
             )
 
-        if any(f.key == "offered" for f in filters):
+        if any(f.key == "offered" and f.operator != Operator.ne for f in filters):
             query = query.join(
                 UnitSectionLink,
                 onclause=col(LearningUnit.id) == UnitSectionLink.unit_id,
@@ -555,7 +891,12 @@ async def match_filters(
         ###################
         # Build the query #
         ###################
-        clause, filters_used = _build_boolean_clause(filters)
+        with timed(timings, "clause"):
+            fuzzy_numbers = None
+            if fuzzy_values := {f.value for f in filters if f.key == "title_fuzzy"}:
+                titles = await title_corpus_engine.corpus()
+                fuzzy_numbers = await titles.match(fuzzy_values)
+            clause, filters_used = await _filter_clause(filters, fuzzy_numbers)
 
         # we consider units with missing numbers a fluke anyway
         query = query.where(clause, col(LearningUnit.number).is_not(None))
@@ -563,123 +904,233 @@ async def match_filters(
         #########
         # Order #
         #########
-        order_by_clauses = []
-        default_order_clauses = [
-            col(LearningUnit.title_english).asc(),
-            col(LearningUnit.title).asc(),
-            year.desc(),
-        ]
-        match order_by:
-            case "title" | "title_english":
-                order_by_clauses = [col(LearningUnit.title_english)]
-            case "title_german":
-                order_by_clauses = [col(LearningUnit.title)]
-            case "number":
-                order_by_clauses = [col(LearningUnit.number)]
-            case "credits":
-                order_by_clauses = [col(LearningUnit.credits)]
-            case "semester":
-                order_by_clauses = [semester]
-            case "lecturer":
-                order_by_clauses = [col(Lecturer.surname), col(Lecturer.name)]
-            case "department":
-                order_by_clauses = [col(LearningUnit.departments)]
-            case "level":
-                order_by_clauses = [col(LearningUnit.levels)]
-            case "language":
-                order_by_clauses = [col(LearningUnit.language)]
-            case "coursereview":
-                if average_rating is not None:
-                    order_by_clauses = [average_rating]
-            case (
-                "year"
-                | "descriptions"
-                | "descriptions_english"
-                | "descriptions_german"
-                | "offered"
-                | "examtype"
-            ):
-                pass
-        if descending:
-            query = query.order_by(
-                *(x.desc() for x in order_by_clauses),
-                *(x for x in default_order_clauses),
-            )
-        else:
-            query = query.order_by(
-                *(x.asc() for x in order_by_clauses),
-                *(x for x in default_order_clauses),
-            )
+        # the count doesn't need the ranks, so they are only joined for the matches
+        ranked_query = query
+        relevance = None
+        if order_by == "relevance":
+            # ranked in the same statement as the page, the FTS indices are joined by rowid
+            ranked_query, relevance = _relevance(query, filters)
+        sort_keys = _sort_keys(order_by, descending, average_rating, relevance)
 
         # We filter for all unit numbers that can be shown as results (with sorting + page limits)
         # For example: https://vvzapi.ch/unit/199098 got renamed from "Geo.BigData(Science)" to "Geospatial data processing with AI tools – an overview".
         # Searching for "big data" would match the old one, but the new one would show if we didn't re-apply filters.
-        valid_numbers = (
-            query.with_only_columns(col(LearningUnit.number))
-            .distinct()
-            .offset(offset)
-            .limit(limit)
+        matches_query: Select[Any] = ranked_query.with_only_columns(
+            col(LearningUnit.number),
+            *(key.label(f"sort_{i}") for i, (key, _) in enumerate(sort_keys[:-1])),
         )
+        if count_mode == "exact":
+            # the window is evaluated over all matching numbers before the page is cut out,
+            # so the total comes with the page instead of filtering everything a second time
+            matches_query = matches_query.add_columns(
+                func.count().over().label("total")
+            )
+        matches = matches_query.group_by(col(LearningUnit.number)).subquery("matches")
+        match_keys: list[SortKey] = [
+            *(
+                (matches.c[f"sort_{i}"], desc)
+                for i, (_, desc) in enumerate(sort_keys[:-1])
+            ),
+            (matches.c.number, False),
+        ]
 
-        final_query = (
-            select(LearningUnit)
-            .where(col(LearningUnit.number).in_(valid_numbers))
-            .distinct()
+        # one more than requested to know if there is a next page
+        valid_numbers = (
+            matches.select()
+            .order_by(*(key.desc() if desc else key.asc() for key, desc in match_keys))
+            .limit(limit + 1)
         )
+        if cursor is not None:
+            # keyset pagination: continue right after the last number of the previous page,
+            # whose position stands in for the offset of the estimated total
+            offset, values = decode_cursor(cursor, order_by, descending, len(sort_keys))
+            valid_numbers = valid_numbers.where(seek_clause(match_keys, values))
+        else:
+            valid_numbers = valid_numbers.offset(offset)
+        page = valid_numbers.subquery("page")
+        page_sort_columns = [page.c[f"sort_{i}"] for i in range(len(sort_keys) - 1)]
+        page_columns = page_sort_columns
+        if count_mode == "exact":
+            page_columns = [page.c.total, *page_sort_columns]
 
-        if descending:
-            final_query = final_query.order_by(
-                *(x.desc() for x in order_by_clauses),
-                *(x for x in default_order_clauses),
+        # rows are ordered by the sort key of their number, so the page keeps its order
+        final_query: Select[Any] = select(LearningUnit)
+        if fields is not None:
+            # unrequested columns are neither read nor decoded from JSON
+            final_query = final_query.options(
+                load_only(
+                    *unit_attributes(
+                        name
+                        for name in UNIT_FIELDS
+                        if name in fields or name in GROUPING_FIELDS
+                    )
+                )
             )
-        else:
-            final_query = final_query.order_by(
-                *(x.asc() for x in order_by_clauses),
-                *(x for x in default_order_clauses),
+        final_query = final_query.add_columns(*page_columns)
+        final_query = final_query.join(page, col(LearningUnit.number) == page.c.number)
+        if latest_only:
+            # the older versions of a number aren't returned either, not only not matched
+            final_query = final_query.join(
+                UnitVersionView,
+                onclause=and_(
+                    col(LearningUnit.id) == UnitVersionView.unit_id,
+                    col(UnitVersionView.latest).is_(True),
+                ),
             )
+        final_query = final_query.order_by(
+            *(
+                c.desc() if desc else c.asc()
+                for c, (_, desc) in zip(page_sort_columns, sort_keys)
+            ),
+            page.c.number,
+            col(LearningUnit.semester_ordinal).desc(),
+        )
 
-        async def _count():
-            async with AsyncSession(aengine) as session:
-                with tracer.start_as_current_span("execute_count_query"):
-                    count_query = query.with_only_columns(
-                        func.count(distinct(LearningUnit.number))
-                    ).order_by(None)
-                    (count,) = (await session.execute(count_query)).one()  # pyright: ignore[reportAny]
-                    count = cast(int, count)
-            return count
-
-        async def _results():
-            async with AsyncSession(aengine) as session:
-                with tracer.start_as_current_span("execute_final_query"):
-                    results = (await session.exec(final_query)).all()
-                session.expunge_all()
-            return results
-
-        count, results = await asyncio.gather(_count(), _results())
-
-        numbered_units: dict[str, list[LearningUnit]] = defaultdict(list)
-        for unit in results:
-            if unit.number:
-                numbered_units[unit.number].append(unit)
-
-        span.set_attribute("total_count", count)
+        if explain is not None:
+            with timed(timings, "compile"):
+                explain.results_sql = compile_sql(final_query)
+                explain.count_sql = compile_sql(_count_query(query))
+
+        async with AsyncSession(aengine) as session:
+            with (
+                tracer.start_as_current_span("execute_final_query"),
+                timed(timings, "results"),
+            ):
+                results = (await session.execute(final_query)).all()
+            session.expunge_all()
+            if explain is not None and explain.results_sql and explain.count_sql:
+                explain.results_plan = await query_plan(session, explain.results_sql)
+                explain.count_plan = await query_plan(session, explain.count_sql)
+
+        with timed(timings, "group"):
+            count: int | None = None
+            numbered_units: dict[str, list[LearningUnit]] = defaultdict(list)
+            keys: dict[str, list[CursorValue]] = {}
+            for unit, *key in results:
+                unit = cast(LearningUnit, unit)
+                if count_mode == "exact":
+                    count, *key = key
+                if unit.number:
+                    numbered_units[unit.number].append(unit)
+                    keys[unit.number] = [*cast(list[CursorValue], key), unit.number]
+
+            next_cursor = None
+            if len(numbered_units) > limit:
+                del numbered_units[next(reversed(numbered_units))]
+                last_number = next(reversed(numbered_units))
+                next_cursor = encode_cursor(
+                    order_by,
+                    descending,
+                    offset + len(numbered_units),
+                    keys[last_number],
+                )
+
+            grouped = {
+                number: GroupedLearningUnits(number=number, units=units, fields=fields)
+                for number, units in numbered_units.items()
+            }
+
+        match count_mode:
+            case "exact":
+                if count is None:
+                    count = 0
+                    if offset > 0 or cursor is not None:
+                        # the page is past the end, so no row carried the total
+                        with timed(timings, "count"):
+                            count = await _count(query)
+            case "estimate":
+                count = 0
+                if numbered_units:
+                    count = offset + len(numbered_units) + (1 if next_cursor else 0)
+            case "none":
+                pass
+
+        span.set_attribute("total_count", count if count is not None else -1)
         span.set_attribute("result_count", len(numbered_units))
 
         return (
             count,
-            {
-                number: GroupedLearningUnits(number=number, units=units)
-                for number, units in numbered_units.items()
-            },
+            grouped,
             filters_used,
+            next_cursor,
+        )
+
+
+search_cache: GenerationalLRUCache[SearchKey, MatchResult] = GenerationalLRUCache(
+    "search", settings.search_cache_size
+)
+search_flight: SingleFlight[SearchKey, MatchResult] = SingleFlight("search")
+
+
+async def cached_match_filters(
+    filters: AND | OR,
+    *,
+    offset: int = 0,
+    limit: int = 20,
+    order_by: OrderKey = "year",
+    descending: bool = True,
+    cursor: str | None = None,
+    count_mode: CountMode = "exact",
+    latest_only: bool = False,
+    fields: tuple[str, ...] | None = None,
+    timings: dict[str, float] | None = None,
+) -> MatchResult:
+    """
+    `match_filters` with an in-process cache and request coalescing in front of it.
+    The tree is already normalized (key aliases, operators), so equivalent queries
+    like "t:x" and "title:x" share the same entry. Its string form isn't used as the
+    key, since quotes in values aren't escaped and different trees can print the same.
+    """
+    with tracer.start_as_current_span("cached_match_filters") as span:
+        key: SearchKey = (
+            filters.__class__.__name__,
+            canonical(filters),
+            order_by,
+            descending,
+            offset,
+            limit,
+            cursor,
+            count_mode,
+            latest_only,
+            fields,
         )
+        if (cached := search_cache.get(key)) is not None:
+            span.set_attribute("cache_hit", True)
+            return cached
+        span.set_attribute("cache_hit", False)
+
+        async def run() -> MatchResult:
+            result = await match_filters(
+                filters,
+                offset=offset,
+                limit=limit,
+                order_by=order_by,
+                descending=descending,
+                cursor=cursor,
+                count_mode=count_mode,
+                latest_only=latest_only,
+                fields=fields,
+                timings=timings,
+            )
+            search_cache.put(key, result)
+            return result
+
+        # identical searches arriving before the first one is cached share its queries
+        return await search_flight.do(key, run)
 
 
 class SearchResponse(BaseModel):
-    total: int
+    total: int | None
+    """Amount of matching unit numbers. Only a lower bound with `count=estimate` and `None` with `count=none`"""
     results: dict[str, GroupedLearningUnits]
     parsed_query: str
     exec_time_ms: float
+    next_cursor: str | None = None
+    """Pass as `cursor` to get the page after this one"""
+    explain: SearchExplain | None = None
+    """How the search was executed, only with `explain=true`"""
+    fuzzy: bool = False
+    """The query matched nothing as typed, so the results are approximate matches of its misspelled title terms"""
 
     @override
     def __iter__(self):
@@ -687,44 +1138,221 @@ class SearchResponse(BaseModel):
             yield unit_number, grouped_units
 
 
+def _error_response() -> SearchResponse:
+    return SearchResponse(
+        total=0,
+        results={},
+        parsed_query="ERROR IN QUERY",
+        exec_time_ms=0.0,
+    )
+
+
+def _is_title_term(filter_: FilterOperator) -> bool:
+    """Title filters, which free text without a key is parsed into as well"""
+    return filter_.key == "title" and filter_.operator == Operator.eq
+
+
+def _fuzzy_titles(op: AND | OR, titles: TitleCorpus) -> AND | OR | None:
+    """
+    The same tree with the title terms that don't occur in any title replaced by fuzzy
+    ones, or None if there are none. Queries that are empty because of their other
+    filters aren't retried then, since the fuzzy matches wouldn't fix them.
+    """
+    replaced = False
+    ops: list[FilterOperator | AND | OR] = []
+    for filter_ in op.ops:
+        if isinstance(filter_, (AND, OR)):
+            fuzzy = _fuzzy_titles(filter_, titles)
+            replaced = replaced or fuzzy is not None
+            ops.append(fuzzy or filter_)
+        elif _is_title_term(filter_) and not titles.contains(filter_.value):
+            replaced = True
+            ops.append(filter_.model_copy(update={"key": "title_fuzzy"}))
+        else:
+            ops.append(filter_)
+    if not replaced:
+        return None
+    return op.__class__(ops=ops)
+
+
+async def fuzzy_fallback(op: AND | OR) -> AND | OR | None:
+    """The fuzzy tree an empty first page of the search is retried with, if any"""
+    if not any(_is_title_term(f) for f in op):
+        return None
+    return _fuzzy_titles(op, await title_corpus_engine.corpus())
+
+
 @router.get("", response_model=SearchResponse)
 async def search_units(
     query: Annotated[str, Query(alias="q")],
+    background_tasks: BackgroundTasks,
     offset: int = 0,
     limit: int = 20,
-    order_by: QueryKey = "year",
+    order_by: OrderKey = "year",
     order: str = "desc",
+    cursor: Annotated[
+        str | None,
+        Query(
+            description="Cursor of the previous page (`next_cursor`). Faster than `offset` for deep pages, which is then ignored. Must be used with the same `order_by` and `order`."
+        ),
+    ] = None,
+    count: Annotated[
+        CountMode,
+        Query(
+            description="`estimate` or `none` skip counting all matches, which is faster if only the next pages are needed."
+        ),
+    ] = "exact",
+    latest: Annotated[
+        bool,
+        Query(
+            description="Only match, rank and return the newest version of every unit number, ignoring older semesters."
+        ),
+    ] = False,
+    fields: Annotated[
+        str | None,
+        Query(
+            description="Comma separated fields of the units to return, like `id,number,title`. `slim` returns only the fields needed to link to the results, `list` skips the long texts and JSON fields apart from the abstract."
+        ),
+    ] = None,
+    explain: Annotated[
+        bool,
+        Query(
+            description="Adds the SQL, query plans and timings of the search. Requires the `X-Explain-Token` header."
+        ),
+    ] = False,
+    explain_token: Annotated[str | None, Header(alias="X-Explain-Token")] = None,
 ) -> SearchResponse:
+    return await run_search(
+        query,
+        background_tasks,
+        offset=offset,
+        limit=limit,
+        order_by=order_by,
+        order=order,
+        cursor=cursor,
+        count=count,
+        latest=latest,
+        fields=fields,
+        explain=explain,
+        explain_token=explain_token,
+    )
+
+
+async def run_search(
+    query: str,
+    background_tasks: BackgroundTasks,
+    *,
+    search_operators: AND | OR | None = None,
+    offset: int = 0,
+    limit: int = 20,
+    order_by: OrderKey = "year",
+    order: str = "desc",
+    cursor: str | None = None,
+    count: CountMode = "exact",
+    latest: bool = False,
+    fields: str | None = None,
+    explain: bool = False,
+    explain_token: str | None = None,
+) -> SearchResponse:
+    """
+    Search of `search_units`. Callers that already parsed the query pass its
+    `search_operators`, so the query isn't parsed a second time.
+    """
     with tracer.start_as_current_span("search_units") as span:
         span.set_attribute("query", query)
         span.set_attribute("offset", offset)
         span.set_attribute("limit", limit)
         span.set_attribute("order_by", order_by)
         span.set_attribute("order", order)
+        span.set_attribute("cursor", cursor or "")
+        span.set_attribute("count", count)
+        span.set_attribute("latest", latest)
+        span.set_attribute("fields", fields or "")
+        span.set_attribute("explain", explain)
 
-        search_operators = build_search_operators(query)
+        try:
+            unit_fields = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        explained: SearchExplain | None = None
+        if explain:
+            token = settings.explain_token
+            if (
+                token is None
+                or explain_token is None
+                or not secrets.compare_digest(explain_token, token)
+            ):
+                raise HTTPException(status_code=403, detail="Invalid explain token")
+
+        timings: dict[str, float] = {}
+        if search_operators is None:
+            with timed(timings, "parse"):
+                search_operators = build_search_operators(query)
+        if explain:
+            explained = SearchExplain(parsed_query=str(search_operators))
 
         # default to desc
         descending = not order.startswith("asc")
 
+        fuzzy = False
         try:
             start = default_timer()
-            count, results, filters_used = await match_filters(
+            # explained searches skip the cache, since they have to run the SQL
+            run = (
+                partial(match_filters, explain=explained)
+                if explained
+                else cached_match_filters
+            )
+            total, results, filters_used, next_cursor = await run(
                 search_operators,
                 offset=offset,
                 limit=limit,
                 order_by=order_by,
                 descending=descending,
+                cursor=cursor,
+                count_mode=count,
+                latest_only=latest,
+                fields=unit_fields,
+                timings=timings,
             )
+            if (
+                not results
+                and offset == 0
+                and cursor is None
+                and (fuzzy_operators := await fuzzy_fallback(search_operators))
+            ):
+                # misspelled titles match nothing, so they are retried as fuzzy matches
+                fuzzy_explained = explained and SearchExplain(
+                    parsed_query=str(fuzzy_operators)
+                )
+                run = (
+                    partial(match_filters, explain=fuzzy_explained)
+                    if fuzzy_explained
+                    else cached_match_filters
+                )
+                fuzzy_result = await run(
+                    fuzzy_operators,
+                    limit=limit,
+                    order_by=order_by,
+                    descending=descending,
+                    count_mode=count,
+                    latest_only=latest,
+                    fields=unit_fields,
+                    timings=timings,
+                )
+                span.set_attribute("fuzzy_fallback", bool(fuzzy_result[1]))
+                if fuzzy_result[1]:
+                    total, results, filters_used, next_cursor = fuzzy_result
+                    explained = fuzzy_explained
+                    fuzzy = True
             end = default_timer()
+        except InvalidCursor as e:
+            span.set_attribute("error", "Invalid cursor")
+            raise HTTPException(status_code=400, detail=str(e))
         except ValueError:
             span.set_attribute("error", "ValueError in query")
-            return SearchResponse(
-                total=0,
-                results={},
-                parsed_query="ERROR IN QUERY",
-                exec_time_ms=0.0,
-            )
+            return _error_response()
 
         parsed_query = str(filters_used)
         if parsed_query.startswith("(") and parsed_query.endswith(")"):
@@ -732,11 +1360,86 @@ async def search_units(
 
         exec_time_ms = (end - start) * 1000
         span.set_attribute("exec_time_ms", exec_time_ms)
-        span.set_attribute("total_results", count)
+        span.set_attribute("total_results", total if total is not None else -1)
+
+        if explained:
+            explained.timings_ms = timings
+        if is_slow(exec_time_ms):
+            background_tasks.add_task(
+                log_slow_query,
+                SlowQuery(
+                    query=query,
+                    parsed_query=parsed_query,
+                    order_by=order_by,
+                    descending=descending,
+                    offset=offset,
+                    limit=limit,
+                    cursor=cursor,
+                    count_mode=count,
+                    latest=latest,
+                    total=total,
+                    exec_time_ms=exec_time_ms,
+                    timings=timings,
+                ),
+            )
 
         return SearchResponse(
-            total=count,
+            total=total,
             results=results,
             parsed_query=parsed_query,
             exec_time_ms=exec_time_ms,
+            next_cursor=next_cursor,
+            explain=explained,
+            fuzzy=fuzzy,
         )
+
+
+class BatchSearch(BaseModel):
+    q: str
+    offset: int = 0
+    limit: int = 20
+    order_by: OrderKey = "year"
+    order: str = "desc"
+    cursor: str | None = None
+    count: CountMode = "exact"
+    latest: bool = False
+    fields: str | None = None
+
+
+@router.post("/batch", response_model=list[SearchResponse])
+async def search_units_batch(
+    searches: Annotated[list[BatchSearch], Body(max_length=settings.search_batch_size)],
+    background_tasks: BackgroundTasks,
+) -> list[SearchResponse]:
+    """
+    Runs multiple searches in a single request and returns their responses in
+    the same order. Searches with invalid queries or fields are reported as
+    `ERROR IN QUERY`, without failing the other searches.
+    """
+    with tracer.start_as_current_span("search_units_batch") as span:
+        span.set_attribute("batch_size", len(searches))
+        # bounds the amount of DB connections a single batch can hold at once
+        semaphore = asyncio.Semaphore(settings.search_batch_concurrency)
+
+        async def run(search: BatchSearch) -> SearchResponse:
+            async with semaphore:
+                try:
+                    return await search_units(
+                        search.q,
+                        background_tasks,
+                        offset=search.offset,
+                        limit=search.limit,
+                        order_by=search.order_by,
+                        order=search.order,
+                        cursor=search.cursor,
+                        count=search.count,
+                        latest=search.latest,
+                        fields=search.fields,
+                    )
+                except (ParseBaseException, HTTPException) as e:
+                    span.add_event(
+                        "invalid_search", {"query": search.q, "error": str(e)}
+                    )
+                    return _error_response()
+
+        return await asyncio.gather(*(run(search) for search in searches))
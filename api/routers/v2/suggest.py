@@ -0,0 +1,69 @@
+import hashlib
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import JSONResponse, Response
+from opentelemetry import trace
+
+from api.env import Settings
+from api.util.suggest import MAX_SUGGESTIONS, Suggestion, suggestion_engine
+
+router = APIRouter(prefix="/suggest", tags=["Search"])
+
+tracer = trace.get_tracer(__name__)
+
+settings = Settings()
+
+
+@router.get("", response_model=list[Suggestion])
+async def suggest(
+    query: Annotated[str, Query(alias="q", max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=MAX_SUGGESTIONS)] = 10,
+    format: Literal["json", "opensearch"] = "json",
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    """
+    ## Search Suggestions
+    Suggests unit titles (english and german), unit numbers, lecturer names and
+    section names starting with the given prefix. Any word of a title or name can be
+    the start, so `learn` suggests "Machine Learning". Matching ignores case and accents.
+
+    Every suggestion comes with a search query that finds it.
+
+    With `format=opensearch`, the response follows the
+    [OpenSearch suggestions](https://github.com/dewitt/opensearch/blob/master/mediawiki/Specifications/OpenSearch/Extensions/Suggestions/1.1/Draft%201.wiki)
+    format used by browsers: `[query, [queries], [texts], []]`.
+    """
+    with tracer.start_as_current_span("suggest") as span:
+        span.set_attribute("query", query)
+        span.set_attribute("limit", limit)
+        index = await suggestion_engine.index()
+
+        # the index only changes with the materialized generation
+        generation = suggestion_engine.generation or ""
+        headers = {
+            "Cache-Control": f"public, max-age={settings.suggest_max_age}",
+            "ETag": f'"{hashlib.sha1(generation.encode()).hexdigest()[:16]}"',
+        }
+        if if_none_match == headers["ETag"]:
+            span.set_attribute("not_modified", True)
+            return Response(status_code=304, headers=headers)
+
+        suggestions = index.suggest(query, limit)
+        span.set_attribute("result_count", len(suggestions))
+
+        if format == "opensearch":
+            return JSONResponse(
+                [
+                    query,
+                    [s.query for s in suggestions],
+                    [s.text for s in suggestions],
+                    [],
+                ],
+                media_type="application/x-suggestions+json",
+                headers=headers,
+            )
+        return JSONResponse(
+            [s.model_dump() for s in suggestions],
+            headers=headers,
+        )
@@ -0,0 +1,47 @@
+/** search suggestions for inputs with the suggest attribute */
+const suggestTimers = new Map();
+function suggestInput(ev) {
+  const input = ev.target;
+  if (!input.hasAttribute("suggest")) return;
+
+  if (suggestTimers.has(input)) {
+    clearTimeout(suggestTimers.get(input));
+  }
+
+  const timer = setTimeout(async () => {
+    suggestTimers.delete(input);
+    const value = input.value.trim();
+    let list = document.getElementById(input.getAttribute("list"));
+    if (!list) {
+      list = document.createElement("datalist");
+      list.id = `${input.name}-suggestions`;
+      input.after(list);
+      input.setAttribute("list", list.id);
+    }
+    // operators are part of the query syntax and can't be suggested
+    if (value.length < 2 || /[:<>=()]/.test(value)) {
+      list.replaceChildren();
+      return;
+    }
+
+    const url = new URL("/api/v2/suggest", window.location.origin);
+    url.searchParams.set("q", value);
+    url.searchParams.set("limit", "8");
+    const response = await fetch(url.toString());
+    if (!response.ok || input.value.trim() !== value) return;
+
+    const suggestions = await response.json();
+    list.replaceChildren(
+      ...suggestions.map((suggestion) => {
+        const option = document.createElement("option");
+        option.value = suggestion.query;
+        option.label = suggestion.text;
+        return option;
+      }),
+    );
+  }, 150);
+
+  suggestTimers.set(input, timer);
+}
+
+document.addEventListener("input", suggestInput);
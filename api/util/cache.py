@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from api.util.generation import data_generation
+from api.util.prometheus import CACHE_EVICTIONS, CACHE_REQUESTS, CACHE_SIZE
+
+
+class GenerationalLRUCache[K: Hashable, V]:
+    """
+    Least recently used cache with a limited amount of entries.
+    All entries are dropped as soon as the data generation changes, since
+    anything computed from the database could be outdated afterwards.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name: str = name
+        self.maxsize: int = maxsize
+        self._generation: str | None = None
+        self._entries: OrderedDict[K, V] = OrderedDict()
+
+    def _check_generation(self):
+        generation = data_generation()
+        if generation != self._generation:
+            if self._entries:
+                CACHE_EVICTIONS.labels(cache=self.name, reason="generation").inc(
+                    len(self._entries)
+                )
+                self._entries.clear()
+                CACHE_SIZE.labels(cache=self.name).set(0)
+            self._generation = generation
+
+    def get(self, key: K) -> V | None:
+        if self.maxsize <= 0:
+            return None
+        self._check_generation()
+        value = self._entries.get(key)
+        if value is None:
+            CACHE_REQUESTS.labels(cache=self.name, result="miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels(cache=self.name, result="hit").inc()
+        return value
+
+    def put(self, key: K, value: V):
+        if self.maxsize <= 0:
+            return
+        self._check_generation()
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            _ = self._entries.popitem(last=False)
+            CACHE_EVICTIONS.labels(cache=self.name, reason="size").inc()
+        CACHE_SIZE.labels(cache=self.name).set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        CACHE_SIZE.labels(cache=self.name).set(0)
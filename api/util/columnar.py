@@ -0,0 +1,355 @@
+"""
+In-memory columnar copy of the structured fields of all learning units.
+
+Most searches only filter on small structured fields like the year, credits or
+department. With `columnar_search` enabled, these fields are kept in NumPy arrays
+(one row per unit) and the parsed query tree is evaluated as vectorized boolean masks.
+SQL then only has to handle the keys the arrays can't serve (titles, descriptions,
+lecturers, ...) and the final page.
+
+The masks follow SQL's three-valued logic, so a filter on a NULL column is neither
+true nor false and a negated filter doesn't match it either, exactly like in SQLite.
+
+Requires the optional `numpy` dependency.
+"""
+
+import asyncio
+import json
+import string
+from typing import Sequence, cast, final
+
+import numpy as np
+from numpy.typing import NDArray
+from opentelemetry import trace
+from sqlalchemy import String
+from sqlmodel import cast as sql_cast
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.models import Department, LearningUnit, UnitDepartmentView
+from api.util.db import aengine
+from api.util.generation import materialized_generation
+from api.util.parse_query import AND, OR, FilterOperator, Operator
+
+tracer = trace.get_tracer(__name__)
+
+type BoolArray = NDArray[np.bool_]
+
+type Mask = tuple[BoolArray, BoolArray]
+"""Rows where the filter is true and rows where it is not NULL"""
+
+MAX_BITS = 63
+"""Bitmask columns are int64, so at most this many distinct values can be stored"""
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _like_fold(value: str) -> str:
+    """SQLite's LIKE only ignores the case of ASCII characters"""
+    return value.translate(_ASCII_LOWER)
+
+
+def _categories(values: list[str | None]) -> tuple[NDArray[np.int32], list[str]]:
+    """Dictionary encodes the values. NULL is stored as -1."""
+    categories = sorted({v for v in values if v is not None})
+    index = {c: i for i, c in enumerate(categories)}
+    codes = np.array(
+        [index[v] if v is not None else -1 for v in values], dtype=np.int32
+    )
+    return codes, categories
+
+
+type _UnitRow = tuple[
+    int, int | None, float | None, str | None, str | None, str | None, str | None
+]
+"""id, semester_ordinal, credits, language, exam_type, number and the raw levels JSON"""
+
+
+class Unservable(Exception):
+    """The filter can't be evaluated on the arrays and has to go to SQL"""
+
+
+@final
+class ColumnarUnits:
+    def __init__(
+        self,
+        ids: NDArray[np.int64],
+        semester_ordinal: NDArray[np.int64],
+        credits: NDArray[np.float64],
+        departments: NDArray[np.int64] | None,
+        levels: NDArray[np.int64] | None,
+        level_bits: dict[str, int],
+        language: tuple[NDArray[np.int32], list[str]],
+        exam_type: tuple[NDArray[np.int32], list[str]],
+        number: NDArray[np.int32],
+    ):
+        self.ids = ids
+        self.semester_ordinal = semester_ordinal
+        self.credits = credits
+        self.departments = departments
+        """Bit `department_id` is set for every department of the unit"""
+        self.levels = levels
+        """Bit `level_bits[level]` is set for every level of the unit. -1 if levels is NULL"""
+        self.level_bits = level_bits
+        self.language = language
+        self.exam_type = exam_type
+        self.number = number
+        """Dictionary encoded unit number, -1 for units without a number"""
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def _from_rows(
+        cls, rows: Sequence[_UnitRow], department_links: Sequence[tuple[int, int]]
+    ) -> "ColumnarUnits":
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        semester_ordinal = np.array(
+            [r[1] if r[1] is not None else -1 for r in rows], dtype=np.int64
+        )
+        credits = np.array(
+            [r[2] if r[2] is not None else np.nan for r in rows], dtype=np.float64
+        )
+
+        # levels are stored as a JSON list of names
+        level_bits: dict[str, int] = {}
+        level_sets: list[list[str] | None] = []
+        for *_, raw_levels in rows:
+            names = (
+                [str(name) for name in cast(list[object], json.loads(raw_levels))]
+                if raw_levels is not None
+                else None
+            )
+            for name in names or []:
+                _ = level_bits.setdefault(_like_fold(name), len(level_bits))
+            level_sets.append(names)
+        levels = None
+        if len(level_bits) <= MAX_BITS:
+            levels = np.array(
+                [
+                    sum(1 << level_bits[_like_fold(n)] for n in names)
+                    if names is not None
+                    else -1
+                    for names in level_sets
+                ],
+                dtype=np.int64,
+            )
+
+        departments = None
+        if all(0 <= d <= MAX_BITS for _, d in department_links):
+            departments = np.zeros(len(ids), dtype=np.int64)
+            positions = np.searchsorted(
+                ids, np.array([u for u, _ in department_links], dtype=np.int64)
+            )
+            bits = np.left_shift(
+                1, np.array([d for _, d in department_links], dtype=np.int64)
+            )
+            np.bitwise_or.at(departments, positions, bits)
+
+        return cls(
+            ids=ids,
+            semester_ordinal=semester_ordinal,
+            credits=credits,
+            departments=departments,
+            levels=levels,
+            level_bits=level_bits,
+            language=_categories([r[3] for r in rows]),
+            exam_type=_categories([r[4] for r in rows]),
+            number=_categories([r[5] for r in rows])[0],
+        )
+
+    @classmethod
+    async def load(cls) -> "ColumnarUnits":
+        with tracer.start_as_current_span("load_columnar_units") as span:
+            async with AsyncSession(aengine) as session:
+                rows = cast(
+                    Sequence[_UnitRow],
+                    (
+                        await session.execute(
+                            select(
+                                LearningUnit.id,
+                                LearningUnit.semester_ordinal,
+                                LearningUnit.credits,
+                                LearningUnit.language,
+                            )
+                            .add_columns(
+                                col(LearningUnit.exam_type),
+                                col(LearningUnit.number),
+                                sql_cast(LearningUnit.levels, String).label("levels"),
+                            )
+                            .order_by(col(LearningUnit.id))
+                        )
+                    ).all(),
+                )
+                department_links = (
+                    await session.exec(
+                        select(
+                            UnitDepartmentView.unit_id,
+                            UnitDepartmentView.department_id,
+                        )
+                    )
+                ).all()
+
+            # building the arrays from the rows would block the event loop
+            units = await asyncio.to_thread(cls._from_rows, rows, department_links)
+            span.set_attribute("unit_count", len(units))
+            return units
+
+    def _known(self) -> BoolArray:
+        return np.ones(len(self), dtype=np.bool_)
+
+    def _compare(
+        self, values: NDArray[np.float64], operator: Operator, value: float
+    ) -> BoolArray:
+        match operator:
+            case Operator.eq:
+                return np.equal(values, value)
+            case Operator.ne:
+                return np.not_equal(values, value)
+            case Operator.gt:
+                return np.greater(values, value)
+            case Operator.lt:
+                return np.less(values, value)
+            case Operator.ge:
+                return np.greater_equal(values, value)
+            case Operator.le:
+                return np.less_equal(values, value)
+
+    def _contains(
+        self, column: tuple[NDArray[np.int32], list[str]], value: str
+    ) -> Mask:
+        """Emulates `column LIKE '%value%'`"""
+        if "%" in value or "_" in value:
+            raise Unservable()
+        codes, categories = column
+        needle = _like_fold(value)
+        matching = [i for i, c in enumerate(categories) if needle in _like_fold(c)]
+        return np.isin(codes, matching), codes >= 0
+
+    def _filter(self, filter_: FilterOperator) -> Mask | None:
+        """
+        Mask of a single filter or None if the filter is ignored,
+        mirroring the checks of the SQL clause builder in the search.
+        """
+        negate = filter_.operator == Operator.ne
+        match filter_.key:
+            case "credits":
+                try:
+                    ects_value = float(filter_.value)
+                except ValueError:
+                    return None
+                known = ~np.isnan(self.credits)
+                return (
+                    self._compare(self.credits, filter_.operator, ects_value) & known,
+                    known,
+                )
+            case "year":
+                if not filter_.value.isdigit():
+                    return None
+                year = (self.semester_ordinal // 2).astype(np.float64)
+                return (
+                    self._compare(year, filter_.operator, int(filter_.value)),
+                    self._known(),
+                )
+            case "semester":
+                if len(filter_.value) == 0 or filter_.value[0].upper() not in [
+                    "S",
+                    "W",
+                    "F",
+                    "H",
+                ]:
+                    return None
+                autumn = filter_.value[0].upper() in ("W", "H")
+                mask = np.equal(self.semester_ordinal % 2, 1 if autumn else 0)
+                return (~mask if negate else mask), self._known()
+            case "department":
+                closest_dept = Department.closest_match(filter_.value)
+                if not closest_dept:
+                    return None
+                if self.departments is None:
+                    raise Unservable()
+                mask = np.not_equal(self.departments & (1 << closest_dept.value), 0)
+                return (~mask if negate else mask), self._known()
+            case "level":
+                # the value is bound as a JSON string, so it only matches whole level names
+                if self.levels is None or not (
+                    filter_.value.isascii() and filter_.value.isalnum()
+                ):
+                    raise Unservable()
+                bit = self.level_bits.get(_like_fold(filter_.value))
+                known = self.levels >= 0
+                mask = (
+                    np.not_equal(self.levels & (1 << bit), 0)
+                    if bit is not None
+                    else np.zeros(len(self), dtype=np.bool_)
+                ) & known
+                return (known & ~mask if negate else mask), known
+            case "language":
+                mask, known = self._contains(self.language, filter_.value)
+                return (known & ~mask if negate else mask), known
+            case "examtype":
+                mask, known = self._contains(self.exam_type, filter_.value)
+                return (known & ~mask if negate else mask), known
+            case _:
+                raise Unservable()
+
+    def evaluate(self, op: AND | OR) -> Mask:
+        """
+        Evaluates the whole tree. Raises `Unservable` if any filter can't be evaluated
+        on the arrays and a ValueError if no filter is valid, like the SQL clause builder.
+        """
+        masks: list[Mask] = []
+        for filter_ in op.ops:
+            if isinstance(filter_, (AND, OR)):
+                masks.append(self.evaluate(filter_))
+            elif (mask := self._filter(filter_)) is not None:
+                masks.append(mask)
+
+        if len(masks) == 0:
+            raise ValueError("No valid filters found")
+
+        true, known = masks[0]
+        for other_true, other_known in masks[1:]:
+            # Kleene logic: false AND NULL is false, true OR NULL is true
+            if isinstance(op, AND):
+                known = (
+                    (known & other_known)
+                    | (known & ~true)
+                    | (other_known & ~other_true)
+                )
+                true = true & other_true
+            else:
+                known = (known & other_known) | true | other_true
+                true = true | other_true
+        return true, known
+
+    def matching_ids(self, op: AND | OR) -> list[int]:
+        """Ids of all numbered units the tree is true for"""
+        true, _ = self.evaluate(op)
+        return cast(list[int], self.ids[true & (self.number >= 0)].tolist())
+
+
+@final
+class ColumnarEngine:
+    """
+    Keeps the columnar units in sync with the materialized generation of the database.
+    Like the materialized views, units scraped since the last update aren't in it yet.
+    """
+
+    def __init__(self):
+        self._units: ColumnarUnits | None = None
+        self._generation: str | None = None
+        self._lock = asyncio.Lock()
+
+    async def units(self) -> ColumnarUnits:
+        generation = materialized_generation()
+        if self._units is not None and self._generation == generation:
+            return self._units
+        async with self._lock:
+            if self._units is None or self._generation != generation:
+                self._units = await ColumnarUnits.load()
+                self._generation = generation
+            return self._units
+
+
+columnar_engine = ColumnarEngine()
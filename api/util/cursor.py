@@ -0,0 +1,114 @@
+# pyright: reportExplicitAny=false
+
+"""
+Opaque cursors for keyset pagination of the search.
+
+A cursor contains the sort key of the last unit number on a page. The next page
+then continues after that key instead of having SQLite sort and skip all
+previous rows with an OFFSET. It also carries the amount of numbers before the
+next page, which an OFFSET would have been, so estimated totals stay consistent.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Sequence, cast
+
+from sqlalchemy import ColumnElement, Float, Integer, Numeric, String, literal, tuple_
+from sqlmodel import and_, or_
+
+type CursorValue = str | int | float
+
+type SortKey = tuple[ColumnElement[Any], bool]
+"""Sort expression and whether it is sorted in descending order"""
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or doesn't belong to the requested order"""
+
+
+def encode_cursor(
+    order_by: str, descending: bool, position: int, values: Sequence[CursorValue]
+) -> str:
+    payload = json.dumps(
+        [order_by, descending, position, *values], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, order_by: str, descending: bool, size: int
+) -> tuple[int, list[CursorValue]]:
+    """
+    Returns the position and the sort key values stored in the cursor.
+    Raises an InvalidCursor if the cursor is malformed or was created for another order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))  # pyright: ignore[reportAny]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+    if (
+        not isinstance(payload, list)
+        or len(cast(list[object], payload)) != size + 3
+        or payload[0] != order_by
+        # compared by identity, since `1 == True` would let through a number
+        or payload[1] is not descending
+    ):
+        raise InvalidCursor("Cursor does not match the search order")
+
+    position = cast(object, payload[2])
+    if isinstance(position, bool) or not isinstance(position, int) or position < 0:
+        raise InvalidCursor("Invalid cursor")
+
+    values = cast(list[object], payload)[3:]
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise InvalidCursor("Invalid cursor")
+    return position, cast(list[CursorValue], values)
+
+
+def _matches_type(expression: ColumnElement[Any], value: CursorValue) -> bool:
+    if isinstance(expression.type, String):
+        return isinstance(value, str)
+    if isinstance(expression.type, (Integer, Float, Numeric)):
+        return not isinstance(value, str)
+    # untyped expressions (e.g. the bm25 rank) accept any value
+    return True
+
+
+def seek_clause(
+    keys: Sequence[SortKey], values: Sequence[CursorValue]
+) -> ColumnElement[bool]:
+    """
+    Lexicographic "comes after" comparison of the sort keys with the cursor values.
+    Consecutive keys sorted in the same direction are compared as a single row value,
+    i.e. `(a, b) > (x, y)`, which SQLite can evaluate without expanding the terms.
+    Raises an InvalidCursor if a value doesn't have the type of its sort key,
+    since SQLite would otherwise silently compare a text with a number.
+    """
+    runs: list[tuple[list[ColumnElement[Any]], list[CursorValue], bool]] = []
+    for (expression, descending), value in zip(keys, values, strict=True):
+        if not _matches_type(expression, value):
+            raise InvalidCursor("Cursor does not match the search order")
+        if runs and runs[-1][2] == descending:
+            runs[-1][0].append(expression)
+            runs[-1][1].append(value)
+        else:
+            runs.append(([expression], [value], descending))
+
+    clause: ColumnElement[bool] | None = None
+    for expressions, run_values, descending in reversed(runs):
+        if len(expressions) == 1:
+            left = expressions[0]
+            right = literal(run_values[0])
+        else:
+            left = tuple_(*expressions)
+            right = tuple_(*(literal(v) for v in run_values))
+        after = left < right if descending else left > right
+        clause = after if clause is None else or_(after, and_(left == right, clause))
+
+    if clause is None:
+        raise ValueError("No sort keys given")
+    return clause
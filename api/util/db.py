@@ -1,21 +1,205 @@
-from sqlalchemy import create_engine
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Literal, cast
+
+from opentelemetry import trace
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.ext.asyncio.engine import create_async_engine
+from sqlalchemy.pool import ConnectionPoolEntry
 from sqlmodel import Session, text
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from api.env import Settings
+from api.util import sqlite_executor
+from api.util.generation import published_generation
+from api.util.prometheus import (
+    DB_CONNECTIONS,
+    DB_GENERATION_SWAPS,
+    DB_STATEMENTS,
+    DB_WAL_SIZE,
+)
 from api.util.pydantic_type import json_serializer
+from api.util.statement_metrics import instrument
 
-engine = create_engine(
-    f"sqlite+pysqlite:///{Settings().db_path}", json_serializer=json_serializer
-)
+tracer = trace.get_tracer(__name__)
 
-aengine = create_async_engine(
-    f"sqlite+aiosqlite:///{Settings().db_path}",
-    json_serializer=json_serializer,
-    pool_size=20,
-    max_overflow=30,
-)
+settings = Settings()
+
+_statements: ContextVar[list[int] | None] = ContextVar("statements", default=None)
+
+
+@contextmanager
+def count_statements() -> Iterator[list[int]]:
+    """
+    Counts the statements executed on the async engines within the block,
+    including tasks started in it. The count is the only item of the list.
+    """
+    statements = [0]
+    token = _statements.set(statements)
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
+
+
+def _journal_pragmas() -> list[str]:
+    if settings.sqlite_journal_mode is None:
+        return []
+    pragmas = [f"PRAGMA journal_mode={settings.sqlite_journal_mode}"]
+    if settings.sqlite_journal_mode == "wal":
+        pragmas += [
+            f"PRAGMA journal_size_limit={settings.sqlite_journal_size_limit}",
+            # a power loss can only lose the latest commits in WAL mode, not corrupt the DB
+            "PRAGMA synchronous=NORMAL",
+        ]
+    return pragmas
+
+
+def _set_pragmas(engine: Engine, pragmas: list[str]):
+    """Sets the PRAGMAs once per pooled connection instead of once per session"""
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection: DBAPIConnection, _record: ConnectionPoolEntry):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _configure(
+    aengine: AsyncEngine, db: str, read_only: bool = False, journal: bool = True
+):
+    sync_engine: Engine = aengine.sync_engine
+    _set_pragmas(
+        sync_engine,
+        [
+            # changing the journal mode writes to the file, so it has to come before query_only
+            *(_journal_pragmas() if journal else []),
+            "PRAGMA foreign_keys=ON",
+            f"PRAGMA cache_size={settings.sqlite_cache_size}",
+            f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+            f"PRAGMA temp_store={settings.sqlite_temp_store}",
+            *(["PRAGMA query_only=ON"] if read_only else []),
+        ],
+    )
+
+    instrument(sync_engine, db)
+
+    @event.listens_for(sync_engine, "connect")
+    def _connect(*_: Any):  # pyright: ignore[reportExplicitAny]
+        DB_CONNECTIONS.labels(db=db).inc()
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(*_: Any):  # pyright: ignore[reportExplicitAny]
+        DB_STATEMENTS.labels(db=db).inc()
+        if (statements := _statements.get()) is not None:
+            statements[0] += 1
+
+
+def _create_engine(db_path: str) -> Engine:
+    engine = create_engine(
+        f"sqlite+pysqlite:///{db_path}", json_serializer=json_serializer
+    )
+    # the scraper writes while the API reads, which only doesn't block readers in WAL mode
+    _set_pragmas(engine, _journal_pragmas())
+    instrument(engine, "data")
+    return engine
+
+
+engine = _create_engine(settings.db_path)
+
+
+def _create_async_engine(db_path: str, executor_driver: bool) -> AsyncEngine:
+    if executor_driver:
+        # Statements of the executor driver queue for a thread without a timeout, so
+        # there are only as many connections as threads. Requests beyond that wait for
+        # a connection of the pool instead, which gives up after `pool_timeout`.
+        aengine = create_async_engine(
+            f"sqlite+aiosqlite:///{db_path}",
+            json_serializer=json_serializer,
+            pool_size=sqlite_executor.threads(),
+            max_overflow=0,
+            async_creator=sqlite_executor.connect(db_path),
+        )
+    else:
+        aengine = create_async_engine(
+            f"sqlite+aiosqlite:///{db_path}",
+            json_serializer=json_serializer,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+    # connections of the executor driver are opened read-only, which can't change the journal mode
+    _configure(
+        aengine,
+        "data",
+        read_only=settings.sqlite_query_only,
+        journal=not executor_driver,
+    )
+    return aengine
+
+
+aengine = _create_async_engine(settings.db_path, settings.sqlite_driver == "executor")
+
+
+def use_database(db_path: str):
+    """
+    Points `engine` and with it `get_session` at another data DB file,
+    like the next generation the scraper writes to
+    """
+    global engine
+    engine.dispose()
+    engine = _create_engine(db_path)
+
+
+_engine_generation = published_generation()
+
+
+async def reload_engines():
+    """
+    Opens new connections once a new generation of the data DB is published, since pooled
+    connections keep reading the file they were opened on. Connections of in-flight requests
+    are not closed, they keep reading the previous generation until they are returned.
+    """
+    global _engine_generation
+    generation = published_generation()
+    if generation == _engine_generation:
+        return
+    _engine_generation = generation
+    with tracer.start_as_current_span("reload_engines") as span:
+        span.set_attribute("generation", generation or "")
+        engine.dispose()
+        await aengine.dispose()
+        DB_GENERATION_SWAPS.inc()
+
+
+def _wal_size() -> float:
+    try:
+        return os.stat(f"{os.path.realpath(settings.db_path)}-wal").st_size
+    except FileNotFoundError:
+        return 0
+
+
+DB_WAL_SIZE.set_function(_wal_size)
+
+
+def checkpoint(
+    session: Session,
+    mode: Literal["PASSIVE", "FULL", "RESTART", "TRUNCATE"] = "PASSIVE",
+) -> tuple[int, int, int]:
+    """
+    Copies the pages of the WAL back into the DB file, so readers don't have to look them
+    up in the WAL anymore. `PASSIVE` copies what it can without waiting for readers or
+    writers, `TRUNCATE` waits for them and empties the WAL file.
+
+    Returns if the checkpoint was blocked (1 or 0), the amount of frames in the WAL and how
+    many of them are checkpointed. The frames are -1 if the DB isn't in WAL mode.
+    """
+    row = session.execute(text(f"PRAGMA wal_checkpoint({mode})")).one()
+    return cast(tuple[int, int, int], tuple(row))
 
 
 def get_session():
@@ -26,21 +210,22 @@ def get_session():
 
 async def aget_session():
     async with AsyncSession(aengine) as session:
-        await session.execute(text("pragma mmap_size=30000000000"))
-        await session.execute(text("PRAGMA foreign_keys=ON"))
         yield session
 
 
 meta_engine = create_engine(
-    f"sqlite+pysqlite:///{Settings().meta_db_path}", json_serializer=json_serializer
+    f"sqlite+pysqlite:///{settings.meta_db_path}", json_serializer=json_serializer
 )
+_set_pragmas(meta_engine, _journal_pragmas())
+instrument(meta_engine, "meta")
 
 ameta_engine = create_async_engine(
-    f"sqlite+aiosqlite:///{Settings().meta_db_path}",
+    f"sqlite+aiosqlite:///{settings.meta_db_path}",
     json_serializer=json_serializer,
-    pool_size=20,
-    max_overflow=30,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
 )
+_configure(ameta_engine, "meta")
 
 
 def get_meta_session():
@@ -51,6 +236,4 @@ def get_meta_session():
 
 async def aget_meta_session():
     async with AsyncSession(ameta_engine) as session:
-        await session.execute(text("pragma mmap_size=30000000000"))
-        await session.execute(text("PRAGMA foreign_keys=ON"))
         yield session
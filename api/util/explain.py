@@ -0,0 +1,56 @@
+# pyright: reportExplicitAny=false
+
+"""
+Helpers for explaining how a search was executed: the SQL it ran,
+the plan SQLite chose for it and how long each phase took.
+"""
+
+from contextlib import contextmanager
+from timeit import default_timer
+from typing import Any, Iterator, cast
+
+from sqlalchemy import Select
+from sqlalchemy.exc import CompileError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.util.db import aengine
+
+
+@contextmanager
+def timed(timings: dict[str, float] | None, phase: str) -> Iterator[None]:
+    """Adds the wall time of the block to the phase in milliseconds, if timings are collected"""
+    start = default_timer()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            elapsed = (default_timer() - start) * 1000
+            timings[phase] = timings.get(phase, 0.0) + elapsed
+
+
+def compile_sql(statement: Select[Any]) -> str:
+    """
+    SQL of the statement with all parameters inlined, so it can be run as is in
+    the sqlite3 shell. Falls back to placeholders for values that can't be inlined.
+    """
+    try:
+        compiled = statement.compile(
+            dialect=aengine.dialect, compile_kwargs={"literal_binds": True}
+        )
+    except CompileError:
+        compiled = statement.compile(
+            dialect=aengine.dialect, compile_kwargs={"render_postcompile": True}
+        )
+    return str(compiled)
+
+
+async def query_plan(session: AsyncSession, sql: str) -> list[str]:
+    """`EXPLAIN QUERY PLAN` of the statement, indented like in the sqlite3 shell"""
+    connection = await session.connection()
+    rows = (await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")).all()
+    depths: dict[int, int] = {0: -1}
+    plan: list[str] = []
+    for id_, parent, _, detail in cast(list[tuple[int, int, int, str]], rows):
+        depths[id_] = depths.get(parent, -1) + 1
+        plan.append("  " * depths[id_] + detail)
+    return plan
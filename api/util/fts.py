@@ -0,0 +1,223 @@
+"""
+SQLite FTS5 indices used by the search.
+
+The FTS tables are virtual tables, so they are not part of the SQLModel metadata.
+They are created by alembic migrations, whose triggers keep them in sync with the
+scraped rows. `api.util.materialize` rebuilds them from scratch.
+
+All tables use the `trigram` tokenizer. A phrase query of at least three characters
+is then a case-insensitive substring match, which keeps the results identical to
+the `LIKE '%value%'` clauses the search used before, while being served by the index.
+Shorter values still use `LIKE`, with `%` and `_` escaped so they are literal characters
+on both paths.
+"""
+
+from typing import cast
+
+from sqlalchemy import ColumnElement, column, literal_column, table
+from sqlalchemy.orm import InstrumentedAttribute, Mapped
+from sqlmodel import Float, Integer, Session, col, func, or_, select, text
+
+from api.models import LearningUnit, UnitPersonView
+
+UNIT_DESCRIPTION_FTS = "unitdescriptionfts"
+"""External content FTS5 table over the catalogue text of `learningunit`"""
+UNIT_TITLE_FTS = "unittitlefts"
+"""External content FTS5 table over the titles and numbers of `learningunit`"""
+LECTURER_NAME_FTS = "lecturernamefts"
+"""Contentless FTS5 table over the full names of lecturers in both name orders"""
+
+FTS_TABLES = (UNIT_DESCRIPTION_FTS, UNIT_TITLE_FTS, LECTURER_NAME_FTS)
+
+MIN_FTS_QUERY_LENGTH = 3
+"""Trigram indices can only match substrings with at least three characters"""
+
+DESCRIPTION_COLUMNS_GERMAN = (
+    col(LearningUnit.content),
+    col(LearningUnit.literature),
+    col(LearningUnit.objective),
+    col(LearningUnit.lecture_notes),
+    col(LearningUnit.additional),
+    col(LearningUnit.comment),
+    col(LearningUnit.abstract),
+)
+DESCRIPTION_COLUMNS_ENGLISH = (
+    col(LearningUnit.content_english),
+    col(LearningUnit.literature_english),
+    col(LearningUnit.objective_english),
+    col(LearningUnit.lecture_notes_english),
+    col(LearningUnit.additional_english),
+    col(LearningUnit.comment_english),
+    col(LearningUnit.abstract_english),
+)
+DESCRIPTION_COLUMNS = DESCRIPTION_COLUMNS_GERMAN + DESCRIPTION_COLUMNS_ENGLISH
+
+TITLE_COLUMNS = (col(LearningUnit.title), col(LearningUnit.title_english))
+
+
+def is_fts_table(name: str) -> bool:
+    """True for FTS tables and their shadow tables (`<name>_data`, `<name>_idx`, ...)"""
+    return any(name == t or name.startswith(f"{t}_") for t in FTS_TABLES)
+
+
+def can_use_fts(value: str) -> bool:
+    return len(value) >= MIN_FTS_QUERY_LENGTH
+
+
+def fts_phrase(value: str | list[str], columns: tuple[str, ...] | None = None) -> str:
+    """
+    Quotes the value as a single FTS5 phrase, optionally restricted to the given columns.
+    With the trigram tokenizer the phrase matches wherever the value is a substring.
+    Multiple values are ORed together and match if any of them matches.
+    """
+    values = [value] if isinstance(value, str) else value
+    phrase = " OR ".join('"' + v.replace('"', '""') + '"' for v in values)
+    if len(values) > 1:
+        phrase = f"({phrase})"
+    if columns:
+        return "{" + " ".join(columns) + "} : " + phrase
+    return phrase
+
+
+def _column_names(columns: tuple[Mapped[str | None], ...]) -> tuple[str, ...]:
+    return tuple(cast(InstrumentedAttribute[str | None], c).key for c in columns)
+
+
+def fts_rowids(
+    fts_table: str, value: str | list[str], columns: tuple[str, ...] | None = None
+):
+    """Selects the rowids of all rows of the FTS table containing the value"""
+    return (
+        select(column("rowid", Integer))
+        .select_from(table(fts_table))
+        .where(literal_column(fts_table).op("MATCH")(fts_phrase(value, columns)))
+    )
+
+
+def fts_ranks(
+    fts_table: str,
+    value: str,
+    columns: tuple[Mapped[str | None], ...] | None = None,
+):
+    """
+    Selects the rowid and the `bm25()` rank of all rows containing the value.
+    Ranks are negative and better matches have lower ranks.
+
+    Meant to be joined as a subquery. The unlimited LIMIT keeps SQLite from flattening
+    it into the join, which would run the MATCH again for every joined row instead
+    of materializing the ranks once.
+    """
+    return (
+        select(column("rowid", Integer), column("rank", Float[float]()))
+        .select_from(table(fts_table))
+        .where(
+            literal_column(fts_table).op("MATCH")(
+                fts_phrase(value, _column_names(columns) if columns else None)
+            )
+        )
+        .limit(-1)
+    )
+
+
+def _contains_any(
+    values: list[str], columns: tuple[Mapped[str | None], ...]
+) -> ColumnElement[bool]:
+    return or_(
+        *(
+            func.coalesce(c, "").contains(v, autoescape=True)
+            for v in values
+            for c in columns
+        )
+    )
+
+
+def description_match(
+    value: str | list[str],
+    columns: tuple[Mapped[str | None], ...] = DESCRIPTION_COLUMNS,
+) -> ColumnElement[bool]:
+    """
+    Matches all units that contain the value in any of the given description columns.
+    With multiple values, any of them has to be contained.
+    """
+    values = [value] if isinstance(value, str) else value
+    if not all(can_use_fts(v) for v in values):
+        return _contains_any(values, columns)
+    return col(LearningUnit.id).in_(
+        fts_rowids(UNIT_DESCRIPTION_FTS, value, _column_names(columns))
+    )
+
+
+def title_match(
+    value: str | list[str],
+    columns: tuple[Mapped[str | None], ...] = TITLE_COLUMNS,
+) -> ColumnElement[bool]:
+    """
+    Matches all units that contain the value in any of the given columns.
+    Supports the title columns and the unit number.
+    With multiple values, any of them has to be contained.
+    """
+    values = [value] if isinstance(value, str) else value
+    if not all(can_use_fts(v) for v in values):
+        return _contains_any(values, columns)
+    return col(LearningUnit.id).in_(
+        fts_rowids(UNIT_TITLE_FTS, value, _column_names(columns))
+    )
+
+
+def lecturer_match(value: str | list[str]) -> ColumnElement[bool]:
+    """
+    Matches all units with a lecturer or examiner that has the value
+    in either "name surname" or "surname name".
+    With multiple values, any of them has to be contained.
+    """
+    values = [value] if isinstance(value, str) else value
+    if not all(can_use_fts(v) for v in values):
+        person_clause = or_(
+            *(
+                clause
+                for v in values
+                for clause in (
+                    col(UnitPersonView.full_name).contains(v, autoescape=True),
+                    func.concat(
+                        UnitPersonView.surname, " ", UnitPersonView.name
+                    ).contains(v, autoescape=True),
+                )
+            )
+        )
+    else:
+        person_clause = col(UnitPersonView.lecturer_id).in_(
+            fts_rowids(LECTURER_NAME_FTS, value)
+        )
+    return col(LearningUnit.id).in_(select(UnitPersonView.unit_id).where(person_clause))
+
+
+def rebuild_unit_description_fts(session: Session):
+    # external content tables read the text directly from `learningunit`
+    session.execute(
+        text(
+            f"INSERT INTO {UNIT_DESCRIPTION_FTS}({UNIT_DESCRIPTION_FTS}) VALUES('rebuild')"
+        )
+    )
+
+
+def rebuild_unit_title_fts(session: Session):
+    session.execute(
+        text(f"INSERT INTO {UNIT_TITLE_FTS}({UNIT_TITLE_FTS}) VALUES('rebuild')")
+    )
+
+
+def rebuild_lecturer_name_fts(session: Session):
+    # contentless tables can't be rebuilt from a content table and are refilled instead
+    session.execute(
+        text(
+            f"INSERT INTO {LECTURER_NAME_FTS}({LECTURER_NAME_FTS}) VALUES('delete-all')"
+        )
+    )
+    session.execute(
+        text(
+            f"""
+            INSERT INTO {LECTURER_NAME_FTS}(rowid, name_surname, surname_name)
+            SELECT id, name || ' ' || surname, surname || ' ' || name FROM lecturer
+            """
+        )
+    )
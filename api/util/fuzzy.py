@@ -0,0 +1,122 @@
+"""
+Fuzzy title matching for misspelled searches like "algoritms".
+
+The distinct titles of all units are kept in memory, already normalized by
+`rapidfuzz.utils.default_process`, and every fuzzy value is scored against all of them
+with `rapidfuzz.process.extract` in a worker thread. The unit numbers of the best titles
+are then used as a regular filter by the search.
+"""
+
+import asyncio
+import re
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import final
+
+from opentelemetry import trace
+from rapidfuzz import fuzz, process, utils
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.models import LearningUnit
+from api.util.db import aengine
+from api.util.generation import materialized_generation
+
+tracer = trace.get_tracer(__name__)
+
+FUZZY_TITLE_LIMIT = 50
+"""Amount of best matching titles a fuzzy value matches"""
+FUZZY_SCORE_CUTOFF = 75
+"""Minimum `WRatio` score (0-100) of a matching title"""
+
+_WORD_START = re.compile(r"\b\w")
+
+
+@final
+class TitleCorpus:
+    def __init__(self, titles: dict[str, set[str]]):
+        """Maps every processed title to the numbers of the units with that title"""
+        self._titles = list(titles)
+        self._numbers = [sorted(numbers) for numbers in titles.values()]
+        # every title starting at each of its words, so contained words are a prefix
+        self._word_starts = sorted(
+            {
+                title[m.start() :]
+                for title in self._titles
+                for m in _WORD_START.finditer(title)
+            }
+        )
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def contains(self, value: str) -> bool:
+        """If a word of any title starts with the value, so it isn't misspelled"""
+        processed = utils.default_process(value)
+        i = bisect_left(self._word_starts, processed)
+        return i < len(self._word_starts) and self._word_starts[i].startswith(processed)
+
+    def numbers(self, value: str) -> list[str]:
+        """Numbers of the units whose title is closest to the value"""
+        with tracer.start_as_current_span("fuzzy_title_numbers") as span:
+            span.set_attribute("value", value)
+            matches = process.extract(
+                utils.default_process(value),
+                self._titles,
+                scorer=fuzz.WRatio,
+                processor=None,
+                limit=FUZZY_TITLE_LIMIT,
+                score_cutoff=FUZZY_SCORE_CUTOFF,
+            )
+            span.set_attribute("title_count", len(matches))
+            return sorted({n for _, _, i in matches for n in self._numbers[i]})
+
+    async def match(self, values: Iterable[str]) -> dict[str, list[str]]:
+        """`numbers` of every value, scored in a worker thread to not block the event loop"""
+        return await asyncio.to_thread(lambda: {v: self.numbers(v) for v in values})
+
+    @classmethod
+    async def load(cls) -> "TitleCorpus":
+        with tracer.start_as_current_span("load_title_corpus") as span:
+            async with AsyncSession(aengine) as session:
+                rows = await session.exec(
+                    select(
+                        LearningUnit.number,
+                        LearningUnit.title,
+                        LearningUnit.title_english,
+                    )
+                    .where(col(LearningUnit.number).is_not(None))
+                    .distinct()
+                )
+                titles: dict[str, set[str]] = {}
+                for number, *unit_titles in rows:
+                    for title in unit_titles:
+                        if number and title:
+                            processed = utils.default_process(title)
+                            titles.setdefault(processed, set()).add(number)
+            corpus = await asyncio.to_thread(cls, titles)
+            span.set_attribute("title_count", len(corpus))
+            return corpus
+
+
+@final
+class TitleCorpusEngine:
+    """Keeps the title corpus in sync with the materialized generation of the database"""
+
+    def __init__(self):
+        self._corpus: TitleCorpus | None = None
+        self._generation: str | None = None
+        self._lock = asyncio.Lock()
+
+    async def corpus(self) -> TitleCorpus:
+        generation = materialized_generation()
+        if self._corpus is not None and self._generation == generation:
+            return self._corpus
+        async with self._lock:
+            if self._corpus is None or self._generation != generation:
+                self._corpus = await TitleCorpus.load()
+                self._generation = generation
+            return self._corpus
+
+
+title_corpus_engine = TitleCorpusEngine()
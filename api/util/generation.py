@@ -0,0 +1,93 @@
+import os
+import time
+from pathlib import Path
+
+from api.env import Settings
+
+settings = Settings()
+
+
+def published_generation() -> str | None:
+    """
+    Name of the generation file `db_path` points to, or None if `db_path` is a plain
+    file that is written to in place.
+    """
+    try:
+        return os.path.basename(os.readlink(settings.db_path))
+    except OSError:  # missing or not a symlink
+        return None
+
+
+def data_generation() -> str:
+    """
+    Token that changes whenever a new generation is published or the data database
+    is written to. In-process caches compare it to drop entries computed from older data.
+    """
+    db_path = os.path.realpath(settings.db_path)
+    token = f"{published_generation() or ''}:"
+    # writes in WAL mode only touch the -wal file until the next checkpoint
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            token += f"{os.stat(path).st_mtime_ns}:"
+        except FileNotFoundError:
+            token += "-:"
+    return token
+
+
+def materialized_marker(db_path: str) -> Path:
+    """File touched whenever the materialized views of the database are updated"""
+    return Path(f"{os.path.realpath(db_path)}.materialized")
+
+
+def materialized_generation() -> str:
+    """
+    Token that only changes when a new generation is published or the materialized
+    views are updated. In-process copies of whole tables compare it instead of
+    `data_generation`, so they aren't reloaded on every write of a running scrape.
+    """
+    try:
+        mtime = str(materialized_marker(settings.db_path).stat().st_mtime_ns)
+    except FileNotFoundError:
+        mtime = "-"
+    return f"{published_generation() or ''}:{mtime}"
+
+
+def generations_path() -> Path:
+    return Path(settings.db_path).parent / "generations"
+
+
+def new_generation_path() -> Path:
+    """Path for the next generation, named after the time it was started at"""
+    path = generations_path()
+    path.mkdir(parents=True, exist_ok=True)
+    return path / f"{time.strftime('%Y%m%dT%H%M%S')}.sqlite"
+
+
+def publish_generation(path: Path):
+    """
+    Atomically points `db_path` at the generation. Connections that are already open
+    keep reading the previous generation, new ones open this one. Only the newest
+    `db_generations_kept` generations are kept.
+    """
+    db_path = Path(settings.db_path)
+    if db_path.is_symlink():
+        # The journal of a generation is next to its file, not next to the link, so
+        # these belong to the plain file an earlier publish replaced. The API still had
+        # it open back then, but has reloaded its engines since.
+        for suffix in ("-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    link = db_path.with_name(f"{db_path.name}.publish")
+    link.unlink(missing_ok=True)
+    link.symlink_to(os.path.relpath(path, db_path.parent))
+    # renaming over the previous link (or plain file) is atomic for readers
+    link.replace(db_path)
+
+    generations = sorted(generations_path().glob("*.sqlite"), reverse=True)
+    for old in generations[settings.db_generations_kept :]:
+        for file in (
+            old,
+            Path(f"{old}-wal"),
+            Path(f"{old}-shm"),
+            materialized_marker(str(old)),
+        ):
+            file.unlink(missing_ok=True)
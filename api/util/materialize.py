@@ -1,8 +1,24 @@
-from sqlalchemy import tuple_
+from sqlalchemy import literal, tuple_
 from sqlmodel import Integer, Session, cast, col, delete, func, insert, select, text
 
-from api.models import LearningUnit, Section, SectionPathView, UnitDepartmentView
+from api.models import (
+    LearningUnit,
+    Lecturer,
+    Section,
+    SectionPathView,
+    UnitDepartmentView,
+    UnitExaminerLink,
+    UnitLecturerLink,
+    UnitPersonView,
+    UnitVersionView,
+)
 from api.util.db import get_session
+from api.util.fts import (
+    rebuild_lecturer_name_fts,
+    rebuild_unit_description_fts,
+    rebuild_unit_title_fts,
+)
+from api.util.generation import materialized_marker
 from api.util.sections import concatenate_section_names
 
 
@@ -71,11 +87,95 @@ def _update_unit_department_view(session: Session):
     print("Unit-department view updated.")
 
 
+def _update_unit_person_view(session: Session):
+    print("Updating unit-person view...")
+    print("Deleting unit-person links...")
+    # names can change, so the view is refilled instead of diffed
+    session.exec(delete(UnitPersonView))
+
+    full_name = func.trim(
+        func.concat(func.trim(Lecturer.name), " ", func.trim(Lecturer.surname))
+    )
+    links: list[tuple[str, type[UnitLecturerLink | UnitExaminerLink]]] = [
+        ("lecturer", UnitLecturerLink),
+        ("examiner", UnitExaminerLink),
+    ]
+    for role, link in links:
+        print(f"Inserting unit-person links for {role}s...")
+        insert_stmt = insert(UnitPersonView).from_select(
+            ["unit_id", "lecturer_id", "name", "surname", "role", "full_name"],
+            select(link.unit_id, link.lecturer_id, Lecturer.name, Lecturer.surname)
+            .add_columns(literal(role), full_name)
+            .join(Lecturer, onclause=col(link.lecturer_id) == Lecturer.id),
+        )
+        session.exec(insert_stmt)
+
+    print("Unit-person view updated.")
+
+
+def _update_unit_version_view(session: Session):
+    print("Updating unit-version view...")
+    print("Deleting unit versions...")
+    session.exec(delete(UnitVersionView))
+
+    print("Inserting unit versions...")
+    version = (
+        func.row_number()
+        .over(
+            partition_by=LearningUnit.number,
+            order_by=(
+                col(LearningUnit.semester_ordinal).desc(),
+                col(LearningUnit.id).desc(),
+            ),
+        )
+        .label("version")
+    )
+    versions = (
+        select(
+            LearningUnit.id,
+            LearningUnit.number,
+            LearningUnit.semkez,
+            LearningUnit.semester_ordinal,
+        )
+        .add_columns(version)
+        .where(col(LearningUnit.number).is_not(None))
+        .subquery()
+    )
+    insert_stmt = insert(UnitVersionView).from_select(
+        ["unit_id", "number", "semkez", "semester_ordinal", "latest"],
+        select(
+            versions.c.id,
+            versions.c.number,
+            versions.c.semkez,
+            versions.c.semester_ordinal,
+        ).add_columns(versions.c.version == 1),
+    )
+    session.exec(insert_stmt)
+
+    print("Unit-version view updated.")
+
+
+def _update_full_text_indices(session: Session):
+    print("Rebuilding unit description full-text index...")
+    rebuild_unit_description_fts(session)
+    print("Rebuilding unit title full-text index...")
+    rebuild_unit_title_fts(session)
+    print("Rebuilding lecturer name full-text index...")
+    rebuild_lecturer_name_fts(session)
+    print("Full-text indices rebuilt.")
+
+
 def update_materialized_views(session: Session):
     print("Updating materialized views...")
     _update_section_path_view(session)
     _update_unit_department_view(session)
+    _update_unit_person_view(session)
+    _update_unit_version_view(session)
+    _update_full_text_indices(session)
     session.commit()
+    database = session.get_bind().engine.url.database
+    if database:
+        materialized_marker(database).touch()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+"""
+Rewrites the filter tree of a search before it is turned into SQL.
+
+The tree built from a query mirrors how it was typed, so `a (b c)` nests an AND in
+an AND and `n:x or n:y or n:z` becomes a chain of separate lookups. The passes here
+keep the meaning of the tree while making it cheaper to evaluate:
+
+- nested operators of the same kind are flattened and duplicate filters removed
+- ANDs that can't match anything (`y=2020 y=2021`, `t:x -t:x`) are folded away,
+  so that a query without any possible match doesn't reach the database
+- ORed equality filters on the same key are grouped into an `IN`
+- the operands of an AND are ordered by how selective they are expected to be
+"""
+
+from math import inf
+
+from opentelemetry import trace
+
+from api.util.parse_query import (
+    AND,
+    IN,
+    OR,
+    FilterOperator,
+    Operator,
+    QueryKey,
+    canonical,
+)
+
+tracer = trace.get_tracer(__name__)
+
+type Node = FilterOperator | AND | OR
+
+MEMBERSHIP_KEYS: set[QueryKey] = {
+    "number",
+    "title",
+    "title_english",
+    "title_german",
+    "lecturer",
+    "descriptions",
+    "descriptions_english",
+    "descriptions_german",
+    "department",
+    "year",
+    "credits",
+    "semester",
+}
+"""Keys whose ORed equality filters can be matched with a single lookup"""
+
+COMPLEMENTARY_KEYS: set[QueryKey] = {
+    "title",
+    "title_english",
+    "title_german",
+    "title_fuzzy",
+    "lecturer",
+    "descriptions",
+    "descriptions_english",
+    "descriptions_german",
+    "level",
+    "language",
+    "examtype",
+}
+"""
+Keys where `key!=value` matches exactly the units `key=value` doesn't and where no
+value is ignored as invalid, so that both in the same AND can't match anything
+"""
+
+SELECTIVITY: dict[QueryKey, int] = {
+    "number": 0,
+    "title_fuzzy": 1,
+    "title": 2,
+    "title_english": 2,
+    "title_german": 2,
+    "lecturer": 3,
+    "department": 4,
+    "offered": 5,
+    "coursereview": 6,
+    "year": 7,
+    "semester": 8,
+    "credits": 9,
+    "level": 10,
+    "language": 10,
+    "examtype": 10,
+    "descriptions": 11,
+    "descriptions_english": 11,
+    "descriptions_german": 11,
+}
+"""Estimated selectivity of an equality filter, lower matches fewer units"""
+
+NEGATED_SELECTIVITY = 20
+"""Added for negated filters, since they match most units"""
+
+
+def _cost(node: Node) -> int:
+    if isinstance(node, FilterOperator):
+        cost = SELECTIVITY[node.key]
+        if node.operator == Operator.ne:
+            cost += NEGATED_SELECTIVITY
+        return cost
+    costs = [_cost(op) for op in node.ops]
+    # an OR matches the units of all its operands, an AND only those of the most selective
+    return max(costs) if isinstance(node, OR) else min(costs)
+
+
+def _numeric(value: str, key: QueryKey) -> float | None:
+    if key == "year":
+        return float(value) if value.isdigit() else None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _is_empty_range(filters: list[FilterOperator]) -> bool:
+    """True if the comparisons on a single numeric column can't all hold"""
+    low, low_inclusive = -inf, True
+    high, high_inclusive = inf, True
+    equal: set[float] = set()
+    not_equal: set[float] = set()
+    for filter_ in filters:
+        value = _numeric(filter_.value, filter_.key)
+        if value is None:
+            continue
+        match filter_.operator:
+            case Operator.eq:
+                equal.add(value)
+            case Operator.ne:
+                not_equal.add(value)
+            case Operator.gt:
+                if value >= low:
+                    low, low_inclusive = value, False
+            case Operator.ge:
+                if value > low:
+                    low, low_inclusive = value, True
+            case Operator.lt:
+                if value <= high:
+                    high, high_inclusive = value, False
+            case Operator.le:
+                if value < high:
+                    high, high_inclusive = value, True
+
+    if low > high or (low == high and not (low_inclusive and high_inclusive)):
+        return True
+    if low == high:
+        equal.add(low)
+    if len(equal) > 1:
+        return True
+    for value in equal:
+        if value in not_equal:
+            return True
+        if value < low or (value == low and not low_inclusive):
+            return True
+        if value > high or (value == high and not high_inclusive):
+            return True
+    return False
+
+
+def _is_contradiction(ops: list[Node]) -> bool:
+    """True if the filters of an AND can't all match the same unit"""
+    filters = [op for op in ops if isinstance(op, FilterOperator)]
+    for key in ("year", "credits"):
+        if _is_empty_range([f for f in filters if f.key == key]):
+            return True
+    equal = {
+        (f.key, f.value)
+        for f in filters
+        if f.key in COMPLEMENTARY_KEYS and f.operator == Operator.eq
+    }
+    return any(
+        (f.key, f.value) in equal
+        for f in filters
+        if f.key in COMPLEMENTARY_KEYS and f.operator == Operator.ne
+    )
+
+
+def _group_memberships(ops: list[Node]) -> list[Node]:
+    """Groups the equality filters of an OR on the same key into `IN` lists"""
+    groups: dict[QueryKey, list[FilterOperator]] = {}
+    for op in ops:
+        if (
+            isinstance(op, FilterOperator)
+            and op.key in MEMBERSHIP_KEYS
+            and op.operator == Operator.eq
+        ):
+            groups.setdefault(op.key, []).append(op)
+
+    grouped: list[Node] = []
+    for op in ops:
+        if isinstance(op, FilterOperator) and len(group := groups.get(op.key, [])) > 1:
+            if op is group[0]:
+                grouped.append(IN(ops=list(group)))
+            if any(op is f for f in group):
+                continue
+        grouped.append(op)
+    return grouped
+
+
+def _optimize(node: AND | OR) -> Node | None:
+    """The optimized node or None if it can't match anything"""
+    ops: list[Node] = []
+    seen: set[str] = set()
+
+    def add(op: Node):
+        key = canonical(op)
+        if key not in seen:
+            seen.add(key)
+            ops.append(op)
+
+    for op in node.ops:
+        if isinstance(op, FilterOperator):
+            add(op)
+            continue
+        optimized = _optimize(op)
+        if optimized is None:
+            if isinstance(node, AND):
+                return None
+            continue  # never matches, so it doesn't add anything to an OR
+        if isinstance(optimized, FilterOperator) or isinstance(optimized, IN):
+            add(optimized)
+        elif isinstance(optimized, AND) == isinstance(node, AND):
+            for child in optimized.ops:
+                add(child)
+        else:
+            add(optimized)
+
+    if not ops:
+        return None
+    if isinstance(node, AND):
+        if _is_contradiction(ops):
+            return None
+        ops.sort(key=_cost)
+    else:
+        ops = _group_memberships(ops)
+    if len(ops) == 1:
+        return ops[0]
+    return AND(ops=ops) if isinstance(node, AND) else OR(ops=ops)
+
+
+def optimize_query(op: AND | OR) -> AND | OR | None:
+    """
+    Equivalent tree that is cheaper to evaluate or None if the tree can't match
+    any unit. Filters with invalid values are kept as they are, since they are
+    ignored when building the SQL clauses.
+    """
+    with tracer.start_as_current_span("optimize_query") as span:
+        span.set_attribute("query", str(op))
+        optimized = _optimize(op)
+        if optimized is None:
+            span.set_attribute("optimized", "")
+            return None
+        if isinstance(optimized, FilterOperator):
+            optimized = op.__class__(ops=[optimized])
+        elif isinstance(optimized, IN):
+            optimized = OR(ops=[optimized])
+        span.set_attribute("optimized", str(optimized))
+        return optimized
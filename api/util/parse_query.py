@@ -1,3 +1,4 @@
+import json
 from enum import Enum
 from typing import Generator, Sequence, cast, get_args, override
 from typing import Literal as TLiteral
@@ -27,6 +28,7 @@ QueryKey = TLiteral[
     "title",
     "title_german",
     "title_english",
+    "title_fuzzy",
     "number",
     "credits",
     "year",
@@ -51,6 +53,8 @@ mapping: dict[str, QueryKey] = {
     "ects": "credits",
     "tg": "title_german",
     "te": "title_english",
+    "tf": "title_fuzzy",
+    "fuzzy": "title_fuzzy",
     "y": "year",
     "s": "semester",
     "l": "lecturer",
@@ -115,7 +119,7 @@ class LogicalOperator(BaseModel):
         result = ""
         for i, op in enumerate(self.ops):
             if i > 0:
-                result += f" {self.__class__.__name__.lower()} "  # AND / OR
+                result += " or " if isinstance(self, OR) else " and "
             if isinstance(op, (AND, OR)):
                 result += f"({str(op)})"
             else:
@@ -145,6 +149,35 @@ class AND(LogicalOperator):
     pass
 
 
+class IN(OR):
+    """
+    Equality filters on a single key that are ORed together.
+    Created by the query optimizer, so that they can be matched with a single lookup.
+    """
+
+    @property
+    def key(self) -> QueryKey:
+        return cast(FilterOperator, self.ops[0]).key
+
+    @property
+    def values(self) -> list[str]:
+        return [cast(FilterOperator, op).value for op in self.ops]
+
+
+def _tree(op: FilterOperator | AND | OR) -> list[object]:
+    if isinstance(op, FilterOperator):
+        return [op.key, op.operator.value, op.value]
+    return [op.__class__.__name__, [_tree(child) for child in op.ops]]
+
+
+def canonical(op: FilterOperator | AND | OR) -> str:
+    """
+    Encoding of the tree that is only equal for equal trees. `str()` doesn't escape the
+    values, so `t:'a" and title="b'` prints the same as the two filters it contains.
+    """
+    return json.dumps(_tree(op), ensure_ascii=False)
+
+
 def _find_closest_operators(key: str) -> QueryKey | None:
     """Best effort to try to figure out what key a user meant"""
     with tracer.start_as_current_span("find_closest_operators") as span:
@@ -251,6 +284,18 @@ def _parse_operator(item: ParsedType) -> FilterOperator | None:
                 operator=Operator.ne,
                 value=value,
             )
+        case ["-", "~", str(value)]:  # -~val
+            return FilterOperator(
+                key="title_fuzzy",
+                operator=Operator.ne,
+                value=value,
+            )
+        case ["~", str(value)]:  # ~val
+            return FilterOperator(
+                key="title_fuzzy",
+                operator=Operator.eq,
+                value=value,
+            )
         case [str(value)]:  # val
             return FilterOperator(
                 key="title",
@@ -296,7 +341,7 @@ def _parse_query(query: str) -> ParsedType:
             | Literal("<")
         )
         operator_term = Group(Optional(Literal("-")) + key + operator + operand)
-        plain_term = Group(Optional(Literal("-")) + operand)
+        plain_term = Group(Optional(Literal("-")) + Optional(Literal("~")) + operand)
 
         or_literal = Literal("OR") | Literal("or")
         and_literal = Literal("AND") | Literal("and")
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram, Info
 
 SEARCH_QUERY_COUNTER = Counter(
     "vvzapi_search_query_total",
@@ -33,3 +33,107 @@ SEARCH_QUERY_DURATION = Histogram(
         10.0,
     ),
 )
+
+
+CACHE_REQUESTS = Counter(
+    "vvzapi_cache_requests_total",
+    "Lookups in in-process caches. The hit ratio is hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+CACHE_EVICTIONS = Counter(
+    "vvzapi_cache_evictions_total",
+    "Entries removed from in-process caches, either because the cache was full or the data generation changed",
+    ["cache", "reason"],
+)
+
+CACHE_SIZE = Gauge(
+    "vvzapi_cache_entries",
+    "Current amount of entries in in-process caches",
+    ["cache"],
+)
+
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "vvzapi_single_flight_requests_total",
+    "Calls going through request coalescing. Coalesced calls awaited an identical call that was already in flight",
+    ["flight", "result"],
+)
+
+SINGLE_FLIGHT_IN_FLIGHT = Gauge(
+    "vvzapi_single_flight_in_flight",
+    "Distinct calls currently in flight that identical calls can join",
+    ["flight"],
+)
+
+DB_CONNECTIONS = Counter(
+    "vvzapi_db_connections_opened_total",
+    "Connections opened by the async engines. Stays flat while the pool reuses its connections",
+    ["db"],
+)
+
+DB_STATEMENTS = Counter(
+    "vvzapi_db_statements_total",
+    "Statements executed on the async engines",
+    ["db"],
+)
+
+REQUEST_DB_STATEMENTS = Histogram(
+    "vvzapi_request_db_statements",
+    "Statements executed on the databases per request",
+    ["handler"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+
+DB_WAL_SIZE = Gauge(
+    "vvzapi_db_wal_bytes",
+    "Size of the WAL file of the data DB. Readers look up pages in the WAL until they are checkpointed into the DB file, so it grows while checkpoints lag behind the scraper's writes",
+)
+
+DB_GENERATION_SWAPS = Counter(
+    "vvzapi_db_generation_swaps_total",
+    "New generations of the data DB the API switched its connections to",
+)
+
+SQLITE_EXECUTOR_QUEUE_DEPTH = Gauge(
+    "vvzapi_sqlite_executor_queue_depth",
+    "Jobs of the executor SQLite driver waiting for a free thread",
+)
+
+SQLITE_EXECUTOR_WAIT = Histogram(
+    "vvzapi_sqlite_executor_wait_seconds",
+    "Time jobs of the executor SQLite driver waited for a free thread",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+DB_STATEMENT_DURATION = Histogram(
+    "vvzapi_db_statement_duration_seconds",
+    "Execution time of statements by their fingerprint, see `vvzapi_db_statement_info` for the SQL",
+    ["db", "statement"],
+    buckets=(
+        0.0001,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+    ),
+)
+
+DB_STATEMENT_ROWS = Histogram(
+    "vvzapi_db_statement_rows",
+    "Rows returned or changed by statements by their fingerprint",
+    ["db", "statement"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000),
+)
+
+DB_STATEMENT_INFO = Info(
+    "vvzapi_db_statement",
+    "Normalized SQL of the statement fingerprints",
+    ["statement"],
+)
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+
+from api.util.generation import data_generation
+from api.util.prometheus import SINGLE_FLIGHT_IN_FLIGHT, SINGLE_FLIGHT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight[K: Hashable, V]:
+    """
+    Deduplicates concurrent calls with the same key. The first caller runs the
+    call and everyone arriving while it is still in flight awaits the same result
+    instead of running their own. Calls are keyed on the data generation as well,
+    so nobody joins a call that started before the database was updated.
+    """
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self._calls: dict[tuple[str, K], asyncio.Future[V]] = {}
+
+    def _done(self, key: tuple[str, K], future: asyncio.Future[V]):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+            SINGLE_FLIGHT_IN_FLIGHT.labels(flight=self.name).set(len(self._calls))
+        # the callers await a shield of the call, so if they were all cancelled
+        # nobody else retrieves its exception
+        if not future.cancelled() and (error := future.exception()) is not None:
+            logger.warning("Call of the %s flight failed", self.name, exc_info=error)
+
+    async def do(self, key: K, call: Callable[[], Awaitable[V]]) -> V:
+        flight_key = (data_generation(), key)
+        if (future := self._calls.get(flight_key)) is not None:
+            SINGLE_FLIGHT_REQUESTS.labels(flight=self.name, result="coalesced").inc()
+        else:
+            SINGLE_FLIGHT_REQUESTS.labels(flight=self.name, result="leader").inc()
+            future = asyncio.ensure_future(call())
+            self._calls[flight_key] = future
+            future.add_done_callback(lambda f: self._done(flight_key, f))
+            SINGLE_FLIGHT_IN_FLIGHT.labels(flight=self.name).set(len(self._calls))
+        # a caller that disconnects must not cancel the call for everyone else
+        return await asyncio.shield(future)
@@ -9,6 +9,7 @@ from sqlmodel import col, select
 from api.env import Settings
 from api.models import LearningUnit
 from api.util.db import get_session
+from api.util.generation import published_generation
 
 tracer = trace.get_tracer(__name__)
 
@@ -48,8 +49,15 @@ def generate_sitemap(expiry_seconds: int | None = None) -> None:
         path = Path("api/static/sitemap")
         path.mkdir(parents=True, exist_ok=True)
 
+        # a newly published generation of the DB is added right away, not after the expiry
+        generation_path = path / "generation"
+        generation = published_generation() or ""
+        same_generation = (
+            generation_path.exists() and generation_path.read_text() == generation
+        )
+
         if (path / "sitemap.xml").exists():
-            if expiry_seconds is not None:
+            if expiry_seconds is not None and same_generation:
                 if (
                     path / "sitemap.xml"
                 ).lstat().st_mtime + expiry_seconds > datetime.now().timestamp():
@@ -132,6 +140,7 @@ def generate_sitemap(expiry_seconds: int | None = None) -> None:
             index_f.write("</sitemapindex>")
 
         print("Sitemap index generated.")
+        _ = generation_path.write_text(generation)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+"""
+Rolling log of slow searches in the meta DB.
+
+Every search slower than `slow_query_threshold_ms` is stored with its parameters and
+phase timings, so it can be replayed later with `benchmark.replay`. Only the newest
+`slow_query_log_size` entries are kept, which keeps the log within a fixed size.
+"""
+
+from opentelemetry import trace
+from sqlmodel import col, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.env import Settings
+from api.models import SlowQuery
+from api.util.db import ameta_engine
+
+tracer = trace.get_tracer(__name__)
+
+settings = Settings()
+
+
+def is_slow(exec_time_ms: float) -> bool:
+    return (
+        settings.slow_query_log_size > 0
+        and exec_time_ms >= settings.slow_query_threshold_ms
+    )
+
+
+async def log_slow_query(entry: SlowQuery):
+    with tracer.start_as_current_span("log_slow_query") as span:
+        span.set_attribute("query", entry.query)
+        span.set_attribute("exec_time_ms", entry.exec_time_ms)
+        async with AsyncSession(ameta_engine) as session:
+            session.add(entry)
+            await session.flush()
+            assert entry.id is not None
+            # ids are increasing, so everything before the newest entries can go
+            _ = await session.exec(
+                delete(SlowQuery).where(
+                    col(SlowQuery.id) <= entry.id - settings.slow_query_log_size
+                )
+            )
+            await session.commit()
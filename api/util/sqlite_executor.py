@@ -0,0 +1,190 @@
+"""
+Async SQLite driver that runs the queries of all connections on one bounded thread
+pool, instead of the thread per connection aiosqlite starts. The connections mimic
+the parts of aiosqlite SQLAlchemy's aiosqlite dialect uses, so they can be passed
+to it as `async_creator`.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from api.env import Settings
+from api.util.prometheus import SQLITE_EXECUTOR_QUEUE_DEPTH, SQLITE_EXECUTOR_WAIT
+
+settings = Settings()
+
+type Parameters = Sequence[object] | Mapping[str, object]
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def threads() -> int:
+    return settings.sqlite_executor_threads or os.cpu_count() or 1
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=threads(),
+            thread_name_prefix="sqlite",
+        )
+    return _executor
+
+
+def _cancelled[T](future: Future[T]):
+    # jobs cancelled before they started never left the queue on their own
+    if future.cancelled():
+        SQLITE_EXECUTOR_QUEUE_DEPTH.dec()
+
+
+async def run[T](call: Callable[[], T]) -> T:
+    """Runs the call on the executor, waiting in its queue if all threads are busy"""
+    submitted = time.perf_counter()
+
+    def job() -> T:
+        SQLITE_EXECUTOR_QUEUE_DEPTH.dec()
+        SQLITE_EXECUTOR_WAIT.observe(time.perf_counter() - submitted)
+        return call()
+
+    SQLITE_EXECUTOR_QUEUE_DEPTH.inc()
+    future = executor().submit(job)
+    future.add_done_callback(_cancelled)
+    return await asyncio.wrap_future(future)
+
+
+class ExecutorCursor:
+    """Cursor that fetches all rows of a query in the same job that executes it"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor: sqlite3.Cursor = cursor
+        self._rows: deque[Any] = deque()  # pyright: ignore[reportExplicitAny]
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        _type: type[BaseException] | None,
+        _value: BaseException | None,
+        _traceback: TracebackType | None,
+    ):
+        await self.close()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> int | None:
+        return self._cursor.lastrowid
+
+    @property
+    def arraysize(self) -> int:
+        return self._cursor.arraysize
+
+    @arraysize.setter
+    def arraysize(self, value: int):
+        self._cursor.arraysize = value
+
+    def _execute(self, sql: str, parameters: Parameters) -> deque[Any]:  # pyright: ignore[reportExplicitAny]
+        _ = self._cursor.execute(sql, parameters)
+        return deque(self._cursor.fetchall() if self._cursor.description else ())
+
+    async def execute(self, sql: str, parameters: Parameters | None = None) -> Self:
+        self._rows = await run(lambda: self._execute(sql, parameters or ()))
+        return self
+
+    async def executemany(self, sql: str, parameters: Iterable[Parameters]) -> Self:
+        _ = await run(lambda: self._cursor.executemany(sql, parameters))
+        self._rows = deque()
+        return self
+
+    async def fetchone(self) -> Any:  # pyright: ignore[reportExplicitAny, reportAny]
+        return self._rows.popleft() if self._rows else None
+
+    async def fetchmany(self, size: int | None = None) -> list[Any]:  # pyright: ignore[reportExplicitAny]
+        size = self.arraysize if size is None else size
+        return [self._rows.popleft() for _ in range(min(size, len(self._rows)))]
+
+    async def fetchall(self) -> list[Any]:  # pyright: ignore[reportExplicitAny]
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    async def close(self):
+        self._cursor.close()
+
+
+class ExecutorConnection:
+    """Read-only stdlib connection whose blocking calls run on the shared executor"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection: sqlite3.Connection | None = connection
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise ValueError("no active connection")
+        return self._connection
+
+    @property
+    def isolation_level(self) -> str | None:
+        return self._conn.isolation_level
+
+    def cursor(self) -> ExecutorCursor:
+        return ExecutorCursor(self._conn.cursor())
+
+    async def create_function(
+        self,
+        name: str,
+        narg: int,
+        func: Callable[..., str | bytes | int | float | None],
+        *,
+        deterministic: bool = False,
+    ):
+        self._conn.create_function(name, narg, func, deterministic=deterministic)
+
+    async def commit(self):
+        if self._conn.in_transaction:
+            await run(self._conn.commit)
+
+    async def rollback(self):
+        # the pool rolls back every returned connection, mostly outside of a transaction
+        if self._conn.in_transaction:
+            await run(self._conn.rollback)
+
+    async def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await run(connection.close)
+
+    def stop(self):
+        """Closes the connection without waiting for the executor"""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            connection.close()
+
+
+def connect(db_path: str) -> Callable[[], Awaitable[ExecutorConnection]]:
+    """`async_creator` opening `db_path` read-only on the executor"""
+    uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+
+    async def creator() -> ExecutorConnection:
+        return ExecutorConnection(
+            await run(lambda: sqlite3.connect(uri, uri=True, check_same_thread=False))
+        )
+
+    return creator
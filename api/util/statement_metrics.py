@@ -0,0 +1,102 @@
+# pyright: reportAny=false, reportExplicitAny=false
+
+"""
+Per-statement metrics of the engines. Statements are keyed by their fingerprint, the
+SQL with literals replaced by `?` and parameter lists collapsed, so the same query
+with different values is recorded once. The fingerprints are hashed into short labels,
+`vvzapi_db_statement_info` maps them back to the SQL.
+"""
+
+import hashlib
+import logging
+import random
+import re
+import reprlib
+import time
+from functools import lru_cache
+from typing import Any, cast
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.engine.interfaces import DBAPICursor
+
+from api.env import Settings
+from api.util.prometheus import (
+    DB_STATEMENT_DURATION,
+    DB_STATEMENT_INFO,
+    DB_STATEMENT_ROWS,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_statement_ids: dict[str, str] = {}
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    statement = _LITERALS.sub("?", statement)
+    # IN lists are expanded to one parameter per value
+    statement = _PARAMETER_LISTS.sub("(?, ...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def statement_id(statement: str, limit: int) -> str:
+    """Label of the statement, `other` once `limit` fingerprints are in use"""
+    normalized = fingerprint(statement)
+    if (id := _statement_ids.get(normalized)) is not None:
+        return id
+    if len(_statement_ids) >= limit:
+        return "other"
+    id = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    _statement_ids[normalized] = id
+    DB_STATEMENT_INFO.labels(statement=id).info({"sql": normalized})
+    return id
+
+
+def _row_count(cursor: DBAPICursor) -> int | None:
+    if cursor.rowcount >= 0:
+        return cursor.rowcount
+    # the async adapters fetch all rows of a query when executing it
+    rows = getattr(cursor, "_rows", None)
+    return len(rows) if rows is not None else None
+
+
+def instrument(engine: Engine, db: str):
+    """Records the duration and rows of every statement of the engine"""
+    threshold = settings.slow_statement_threshold_ms / 1000
+    sample_rate = settings.slow_statement_sample_rate
+    limit = settings.db_statement_fingerprints
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn: Connection, *_: Any):
+        # a connection executes one statement at a time, and a failed one that never
+        # reaches after_cursor_execute is simply overwritten by the next
+        conn.info["statement_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn: Connection,
+        cursor: DBAPICursor,
+        statement: str,
+        parameters: Any,
+        *_: Any,
+    ):
+        elapsed = time.perf_counter() - cast(float, conn.info["statement_start"])
+        id = statement_id(statement, limit)
+        DB_STATEMENT_DURATION.labels(db=db, statement=id).observe(elapsed)
+        if (rows := _row_count(cursor)) is not None:
+            DB_STATEMENT_ROWS.labels(db=db, statement=id).observe(rows)
+        if elapsed >= threshold and random.random() < sample_rate:
+            logger.warning(
+                "Slow statement %s on %s took %.1fms: %s parameters=%s",
+                id,
+                db,
+                elapsed * 1000,
+                statement,
+                reprlib.repr(parameters),
+            )
@@ -0,0 +1,260 @@
+"""
+In-memory prefix index for search suggestions.
+
+All suggestable strings (unit titles, unit numbers, lecturer names and section names)
+are normalized and stored in a single sorted list of keys, so a prefix lookup is a
+binary search to the first key starting with the prefix. Every word of a title or name
+gets its own key, so "learn" also suggests "Machine Learning".
+
+The most popular entries of very short prefixes are precomputed, since their ranges
+contain a large part of the index and would have to be ranked on every keystroke.
+"""
+
+import asyncio
+import heapq
+import logging
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Literal, final
+
+from opentelemetry import trace
+from pydantic import BaseModel
+from sqlmodel import col, distinct, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.models import LearningUnit, Section, UnitPersonView
+from api.util.db import aengine
+from api.util.generation import materialized_generation
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+type SuggestionKind = Literal["title", "number", "lecturer", "section"]
+
+MAX_SUGGESTIONS = 20
+PRECOMPUTED_PREFIX_LENGTH = 2
+"""Prefixes up to this length are answered from precomputed results"""
+
+_WORD_START = re.compile(r"(?:^|(?<=[\s\-/(]))\w", re.UNICODE)
+
+
+class Suggestion(BaseModel):
+    text: str
+    """Shown to the user"""
+    query: str
+    """Search query that finds the suggested entry"""
+    kind: SuggestionKind
+
+
+def normalize(text: str) -> str:
+    """Case and accent insensitive form, so that "muller" finds "Müller" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _quote(value: str) -> str | None:
+    """None if the value contains both quotes, since the query syntax can't escape them"""
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return None
+
+
+def _word_suffixes(text: str) -> list[str]:
+    """The text starting at every word, i.e. "a b c" -> ["a b c", "b c", "c"]"""
+    return [text[m.start() :] for m in _WORD_START.finditer(text)]
+
+
+@final
+class SuggestionIndex:
+    def __init__(self, entries: list[tuple[Suggestion, int, list[str]]]):
+        """Entries are the suggestion, its weight and the keys it can be found by"""
+        self._suggestions = [suggestion for suggestion, _, _ in entries]
+        self._weights = [weight for _, weight, _ in entries]
+
+        keyed: list[tuple[str, int]] = []
+        for i, (_, _, texts) in enumerate(entries):
+            keys = {normalize(text) for text in texts}
+            keyed.extend((key, i) for key in keys if key)
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._ids = [i for _, i in keyed]
+
+        prefixes: dict[str, set[int]] = {}
+        for key, i in keyed:
+            for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+                prefixes.setdefault(key[:length], set()).add(i)
+        self._precomputed = {
+            prefix: self._rank(ids, MAX_SUGGESTIONS) for prefix, ids in prefixes.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._suggestions)
+
+    def _rank(self, ids: set[int], limit: int) -> list[int]:
+        """Most used entries first, shorter texts first if equally used"""
+        return heapq.nsmallest(
+            limit,
+            ids,
+            key=lambda i: (-self._weights[i], len(self._suggestions[i].text), i),
+        )
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[Suggestion]:
+        prefix = normalize(prefix).lstrip()
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            ids = self._precomputed.get(prefix, [])[:limit]
+            return [self._suggestions[i] for i in ids]
+
+        matches: set[int] = set()
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            matches.add(self._ids[i])
+            i += 1
+        return [self._suggestions[i] for i in self._rank(matches, limit)]
+
+    @classmethod
+    async def load(cls) -> "SuggestionIndex":
+        with tracer.start_as_current_span("load_suggestion_index") as span:
+            entries: list[tuple[Suggestion, int, list[str]]] = []
+            async with AsyncSession(aengine) as session:
+                titles = await session.exec(
+                    select(
+                        LearningUnit.title_english,
+                        LearningUnit.title,
+                        func.count(distinct(LearningUnit.number)),
+                    )
+                    .where(col(LearningUnit.number).is_not(None))
+                    .group_by(col(LearningUnit.title_english), col(LearningUnit.title))
+                )
+                title_weights: dict[str, int] = {}
+                for title_english, title, count in titles:
+                    for text in (title_english, title):
+                        if text:
+                            title_weights[text] = title_weights.get(text, 0) + count
+                entries.extend(
+                    (
+                        Suggestion(text=title, query=f"t:{quoted}", kind="title"),
+                        weight,
+                        _word_suffixes(title),
+                    )
+                    for title, weight in title_weights.items()
+                    if (quoted := _quote(title))
+                )
+
+                numbers = await session.exec(
+                    select(
+                        LearningUnit.number,
+                        func.max(LearningUnit.title_english),
+                        func.count(),
+                    )
+                    .where(col(LearningUnit.number).is_not(None))
+                    .group_by(col(LearningUnit.number))
+                )
+                entries.extend(
+                    (
+                        Suggestion(
+                            text=f"{number} {title or ''}".strip(),
+                            query=f"n:{quoted}",
+                            kind="number",
+                        ),
+                        count,
+                        [number],
+                    )
+                    for number, title, count in numbers
+                    if number and (quoted := _quote(number))
+                )
+
+                lecturers = await session.exec(
+                    select(
+                        UnitPersonView.full_name,
+                        func.count(distinct(UnitPersonView.unit_id)),
+                    ).group_by(col(UnitPersonView.full_name))
+                )
+                entries.extend(
+                    (
+                        Suggestion(
+                            text=full_name, query=f"l:{quoted}", kind="lecturer"
+                        ),
+                        count,
+                        _word_suffixes(full_name),
+                    )
+                    for full_name, count in lecturers
+                    if (quoted := _quote(full_name))
+                )
+
+                sections = await session.exec(
+                    select(Section.name_english, Section.name, func.count()).group_by(
+                        col(Section.name_english), col(Section.name)
+                    )
+                )
+                section_weights: dict[str, int] = {}
+                for name_english, name, count in sections:
+                    for text in (name_english, name):
+                        if text:
+                            section_weights[text] = section_weights.get(text, 0) + count
+                entries.extend(
+                    (
+                        Suggestion(text=name, query=f"o:{quoted}", kind="section"),
+                        weight,
+                        _word_suffixes(name),
+                    )
+                    for name, weight in section_weights.items()
+                    if (quoted := _quote(name))
+                )
+
+            # sorting the keys and ranking the prefixes would block the event loop
+            index = await asyncio.to_thread(cls, entries)
+            span.set_attribute("entry_count", len(index))
+            span.set_attribute("key_count", len(index._keys))
+            return index
+
+
+@final
+class SuggestionEngine:
+    """
+    Keeps the suggestion index in sync with the materialized generation of the
+    database. While a new index is being built, the previous one keeps answering.
+    """
+
+    def __init__(self):
+        self._index: SuggestionIndex | None = None
+        self._generation: str | None = None
+        self._rebuild: asyncio.Task[SuggestionIndex] | None = None
+
+    async def _load(self, generation: str) -> SuggestionIndex:
+        index = await SuggestionIndex.load()
+        self._index = index
+        self._generation = generation
+        return index
+
+    @staticmethod
+    def _rebuilt(task: asyncio.Task[SuggestionIndex]):
+        # only the first load is awaited, later rebuilds would fail silently
+        if not task.cancelled() and (e := task.exception()) is not None:
+            logger.error("Rebuilding the suggestion index failed", exc_info=e)
+
+    @property
+    def generation(self) -> str | None:
+        """Materialized generation the index that is currently served was built from"""
+        return self._generation
+
+    async def index(self) -> SuggestionIndex:
+        generation = materialized_generation()
+        if self._generation != generation and (
+            self._rebuild is None or self._rebuild.done()
+        ):
+            self._rebuild = asyncio.create_task(self._load(generation))
+            self._rebuild.add_done_callback(self._rebuilt)
+        if self._index is not None:
+            return self._index
+        assert self._rebuild is not None
+        return await self._rebuild
+
+
+suggestion_engine = SuggestionEngine()
@@ -3,18 +3,16 @@ from typing import Any, cast
 from opentelemetry import trace
 from pydantic import BaseModel
 from sqlalchemy import ColumnExpressionArgument
-from sqlmodel import and_, col, or_
+from sqlmodel import and_, col, or_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql._expression_select_cls import Select, SelectOfScalar
 
 from api.models import (
     Department,
     LearningUnit,
-    Lecturer,
     Level,
     Periodicity,
-    UnitExaminerLink,
-    UnitLecturerLink,
+    UnitPersonView,
     UnitSectionLink,
 )
 from api.util.sections import get_child_sections
@@ -67,28 +65,6 @@ async def build_vvz_filter[T: Select[Any] | SelectOfScalar[Any]](
 
         if filters.section is not None or filters.type is not None:
             query = query.join(UnitSectionLink)
-        if (
-            filters.lecturer_id is not None
-            or filters.lecturer_name is not None
-            or filters.lecturer_surname is not None
-        ):
-            query = query.join(
-                UnitExaminerLink,
-                onclause=col(LearningUnit.id) == UnitExaminerLink.unit_id,
-            ).join(
-                UnitLecturerLink,
-                onclause=col(LearningUnit.id) == UnitLecturerLink.unit_id,
-            )
-        if filters.lecturer_name is not None or filters.lecturer_surname is not None:
-            # No need to join lecturers to filter by id only
-            query = query.join(
-                Lecturer,
-                onclause=or_(
-                    col(UnitExaminerLink.lecturer_id) == Lecturer.id,
-                    col(UnitLecturerLink.lecturer_id) == Lecturer.id,
-                ),
-            )
-
         query_filters: list[ColumnExpressionArgument[bool] | bool] = []
 
         if filters.section is not None:
@@ -105,21 +81,25 @@ async def build_vvz_filter[T: Select[Any] | SelectOfScalar[Any]](
             query_filters.append(LearningUnit.number == filters.number)
         if filters.title is not None:
             query_filters.append(col(LearningUnit.title).like(f"%{filters.title}%"))
+        person_filters: list[ColumnExpressionArgument[bool]] = []
         if filters.lecturer_id is not None:
-            query_filters.append(
-                or_(
-                    UnitExaminerLink.lecturer_id == filters.lecturer_id,
-                    UnitLecturerLink.lecturer_id == filters.lecturer_id,
-                )
+            person_filters.append(
+                col(UnitPersonView.lecturer_id) == filters.lecturer_id
             )
         if filters.lecturer_name is not None:
-            query_filters.append(
-                col(Lecturer.name).like(f"%{filters.lecturer_surname}%")
+            person_filters.append(
+                col(UnitPersonView.name).like(f"%{filters.lecturer_name}%")
             )
-            query = query.where()
         if filters.lecturer_surname is not None:
+            person_filters.append(
+                col(UnitPersonView.surname).like(f"%{filters.lecturer_surname}%")
+            )
+        if person_filters:
+            # all person filters have to match the same lecturer or examiner
             query_filters.append(
-                col(Lecturer.surname).like(f"%{filters.lecturer_surname}%")
+                col(LearningUnit.id).in_(
+                    select(UnitPersonView.unit_id).where(*person_filters)
+                )
             )
         if filters.type is not None:
             query_filters.append(UnitSectionLink.type == filters.type)
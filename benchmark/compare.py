@@ -0,0 +1,57 @@
+"""
+Compares two results of `benchmark.run`, e.g. of the commits before and after a change:
+
+    uv run -m benchmark.compare before.json after.json
+"""
+
+import sys
+from pathlib import Path
+
+from benchmark.run import BenchmarkResult, Latency
+
+
+def _change(before: float, after: float) -> str:
+    if before == 0:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def _row(name: str, before: Latency, after: Latency) -> str:
+    return (
+        f"{name:<80} p50 {before.p50_ms:8.2f} -> {after.p50_ms:8.2f}ms ({_change(before.p50_ms, after.p50_ms):>7})"
+        + f"  p95 {before.p95_ms:8.2f} -> {after.p95_ms:8.2f}ms ({_change(before.p95_ms, after.p95_ms):>7})"
+    )
+
+
+def compare(before: BenchmarkResult, after: BenchmarkResult):
+    print(
+        f"{before.commit} ({before.unit_count} units) -> {after.commit} ({after.unit_count} units)"
+    )
+    after_queries = {q.query: q for q in after.queries}
+    for query in before.queries:
+        if (other := after_queries.get(query.query)) is None:
+            continue
+        print(_row(query.query, query.latency, other.latency))
+        if query.total != other.total:
+            print(f"  total changed: {query.total} -> {other.total}")
+    print(_row("all queries", before.latency, after.latency))
+    print(
+        f"peak RSS {before.peak_rss_mb:.1f} -> {after.peak_rss_mb:.1f}MB ({_change(before.peak_rss_mb, after.peak_rss_mb)})"
+    )
+    print(
+        f"connections opened {before.connections_opened} -> {after.connections_opened}, statements per search {before.statements_per_search} -> {after.statements_per_search}"
+    )
+
+
+def main():
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python -m benchmark.compare BEFORE.json AFTER.json")
+    before, after = (
+        BenchmarkResult.model_validate_json(Path(path).read_text())
+        for path in sys.argv[1:]
+    )
+    compare(before, after)
+
+
+if __name__ == "__main__":
+    main()
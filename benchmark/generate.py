@@ -0,0 +1,293 @@
+"""
+Generates a synthetic catalogue database to benchmark the search against.
+
+The database is written to `DB_PATH` through the regular migrations and models,
+so the schema, materialized views and full-text indices match production:
+
+    DB_PATH=data/bench.sqlite uv run -m benchmark.generate --semesters 10 --units 2000
+"""
+
+import random
+from pathlib import Path
+from typing import final
+
+from alembic import command
+from alembic.config import Config
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlmodel import Session
+
+from api.env import Settings
+from api.models import (
+    Course,
+    CourseHourEnum,
+    Department,
+    LearningUnit,
+    Lecturer,
+    Level,
+    Rating,
+    Section,
+    UnitExaminerLink,
+    UnitLecturerLink,
+    UnitSectionLink,
+)
+from api.util.db import engine
+from api.util.materialize import update_materialized_views
+from api.util.vvz_types import CourseTypeEnum
+
+
+@final
+class GenerateSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="BENCH_",
+        cli_parse_args=True,
+        cli_implicit_flags=True,
+        cli_prog_name="benchmark.generate",
+    )
+
+    semesters: int = 10
+    """Amount of semesters, counting back from the newest one"""
+    units: int = 2000
+    """Units per semester"""
+    newest_year: int = 2026
+    seed: int = 0
+    force: bool = False
+    """Overwrite the database at `DB_PATH` if it already exists"""
+
+
+TOPICS = [
+    ("Algorithms", "Algorithmen"),
+    ("Data Structures", "Datenstrukturen"),
+    ("Machine Learning", "Maschinelles Lernen"),
+    ("Linear Algebra", "Lineare Algebra"),
+    ("Analysis", "Analysis"),
+    ("Physics", "Physik"),
+    ("Chemistry", "Chemie"),
+    ("Water Resources", "Wasserressourcen"),
+    ("Renewable Energies", "Erneuerbare Energien"),
+    ("Computer Vision", "Computer Vision"),
+    ("Data Management Systems", "Datenbanksysteme"),
+    ("Architecture", "Architektur"),
+    ("Structural Engineering", "Baustatik"),
+    ("Probability and Statistics", "Wahrscheinlichkeit und Statistik"),
+    ("Neural Networks", "Neuronale Netze"),
+    ("Control Systems", "Regelungstechnik"),
+    ("Thermodynamics", "Thermodynamik"),
+    ("Optimization", "Optimierung"),
+    ("Economics", "Volkswirtschaftslehre"),
+    ("Geology", "Geologie"),
+]
+PREFIXES = [
+    ("Introduction to", "Einführung in"),
+    ("Advanced Topics in", "Ausgewählte Kapitel aus"),
+    ("Seminar in", "Seminar in"),
+    ("Research Project in", "Forschungsprojekt in"),
+    ("", ""),
+    ("", ""),
+]
+SURNAMES = [
+    "Müller",
+    "Schmidt",
+    "Weber",
+    "Meier",
+    "Keller",
+    "Huber",
+    "Fischer",
+    "Baumann",
+    "Frei",
+    "Brunner",
+    "Gerber",
+    "Zimmermann",
+]
+NAMES = ["Anna", "Hans", "Laura", "Peter", "Sarah", "Thomas", "Julia", "Martin"]
+PROGRAMMES = [
+    ("Computer Science Bachelor", "Informatik Bachelor"),
+    ("Computer Science Master", "Informatik Master"),
+    ("Data Science Master", "Data Science Master"),
+    ("Physics Bachelor", "Physik Bachelor"),
+    ("Architecture Bachelor", "Architektur Bachelor"),
+    ("Mechanical Engineering Master", "Maschineningenieurwissenschaften Master"),
+]
+CATEGORIES = [
+    ("Core Courses", "Kernfächer"),
+    ("Elective Courses", "Wahlfächer"),
+    ("Minor in Computer Vision", "Minor in Computer Vision"),
+    ("Minor in Data Management Systems", "Minor in Datenbanksysteme"),
+    ("Seminar", "Seminar"),
+]
+NUMBER_PREFIXES = ["101", "151", "227", "252", "263", "401", "402", "529", "636", "851"]
+EXAM_TYPES = [
+    "session examination",
+    "end-of-semester examination",
+    "graded semester performance",
+    "ungraded semester performance",
+    None,
+]
+
+
+def _semkezs(newest_year: int, amount: int) -> list[str]:
+    """Newest semester first"""
+    semkezs: list[str] = []
+    year, semester = newest_year, "S"
+    while len(semkezs) < amount:
+        semkezs.append(f"{year}{semester}")
+        if semester == "S":
+            year, semester = year - 1, "W"
+        else:
+            semester = "S"
+    return semkezs
+
+
+def _description(rng: random.Random, topic: str) -> str:
+    words = [name for name, _ in TOPICS]
+    sample = ", ".join(rng.sample(words, 3)).lower()
+    return f"The course covers {topic.lower()} with applications in {sample}."
+
+
+def generate(session: Session, settings: GenerateSettings):
+    rng = random.Random(settings.seed)
+    departments = list(Department)
+
+    # numbers recur across semesters like in the real catalogue
+    catalogue: list[tuple[str, int, int, Department]] = []
+    for i in range(int(settings.units * 1.2)):
+        department = rng.choice(departments)
+        number = f"{rng.choice(NUMBER_PREFIXES)}-{i:04d}-00L"
+        catalogue.append(
+            (
+                number,
+                rng.randrange(len(TOPICS)),
+                rng.randrange(len(PREFIXES)),
+                department,
+            )
+        )
+
+    lecturer_count = max(settings.units // 4, len(SURNAMES))
+    session.add_all(
+        Lecturer(
+            id=lecturer_id,
+            name=rng.choice(NAMES),
+            surname=SURNAMES[lecturer_id % len(SURNAMES)],
+            title="Prof. Dr." if rng.random() < 0.3 else None,
+            department=rng.choice(departments).name,
+        )
+        for lecturer_id in range(lecturer_count)
+    )
+    session.add_all(
+        Rating(
+            course_number=number,
+            recommended=rng.uniform(1, 5),
+            engaging=rng.uniform(1, 5),
+            difficulty=rng.uniform(1, 5),
+            effort=rng.uniform(1, 5),
+            resources=rng.uniform(1, 5),
+        )
+        for number, *_ in catalogue
+        if rng.random() < 0.3
+    )
+
+    unit_id = 0
+    section_id = 0
+    for semkez in _semkezs(settings.newest_year, settings.semesters):
+        print(f"Generating {settings.units} units for {semkez}...")
+        section_ids: list[int] = []
+        for programme, programme_de in PROGRAMMES:
+            section_id += 1
+            parent_id = section_id
+            session.add(
+                Section(
+                    id=parent_id,
+                    semkez=semkez,
+                    name=programme_de,
+                    name_english=programme,
+                    level=1,
+                )
+            )
+            for category, category_de in CATEGORIES:
+                section_id += 1
+                section_ids.append(section_id)
+                session.add(
+                    Section(
+                        id=section_id,
+                        parent_id=parent_id,
+                        semkez=semkez,
+                        name=category_de,
+                        name_english=category,
+                        level=2,
+                    )
+                )
+
+        for number, topic, prefix, department in rng.sample(catalogue, settings.units):
+            unit_id += 1
+            topic_en, topic_de = TOPICS[topic]
+            prefix_en, prefix_de = PREFIXES[prefix]
+            title_english = f"{prefix_en} {topic_en}".strip()
+            levels = [rng.choice([Level.BSC, Level.MSC, Level.DR])]
+            if rng.random() < 0.2:
+                levels.append(Level.GS)
+            session.add(
+                LearningUnit(
+                    id=unit_id,
+                    semkez=semkez,
+                    number=number,
+                    title=f"{prefix_de} {topic_de}".strip(),
+                    title_english=title_english,
+                    levels=levels,
+                    departments=[department],
+                    credits=float(rng.choice([1, 2, 3, 4, 4, 5, 6, 6, 7, 8, 10, 12])),
+                    language=rng.choice(["English", "English", "German", None]),
+                    content=_description(rng, topic_en),
+                    content_english=_description(rng, topic_en),
+                    objective_english=_description(rng, topic_en),
+                    exam_type=rng.choice(EXAM_TYPES),
+                )
+            )
+            lecturers = rng.sample(range(lecturer_count), rng.randint(1, 3))
+            session.add_all(
+                UnitLecturerLink(unit_id=unit_id, lecturer_id=lecturer_id)
+                for lecturer_id in lecturers
+            )
+            session.add(UnitExaminerLink(unit_id=unit_id, lecturer_id=lecturers[0]))
+            session.add_all(
+                UnitSectionLink(unit_id=unit_id, section_id=linked_section_id)
+                for linked_section_id in rng.sample(section_ids, rng.randint(1, 3))
+            )
+            session.add_all(
+                Course(
+                    number=f"{number[:-1]}{course_type.name}",
+                    semkez=semkez,
+                    unit_id=unit_id,
+                    title=title_english,
+                    type=course_type,
+                    hours=float(rng.randint(1, 4)),
+                    hour_type=CourseHourEnum.WEEKLY_HOURS,
+                )
+                for course_type in rng.sample(
+                    [CourseTypeEnum.V, CourseTypeEnum.U, CourseTypeEnum.S],
+                    rng.randint(1, 2),
+                )
+            )
+        session.commit()
+
+    update_materialized_views(session)
+
+
+def main():
+    settings = GenerateSettings()
+    db_path = Path(Settings().db_path)
+    if db_path.exists():
+        if not settings.force:
+            raise SystemExit(
+                f"{db_path} already exists. Pass --force to overwrite it or set another DB_PATH."
+            )
+        db_path.unlink()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"Creating database at {db_path}...")
+    command.upgrade(Config("alembic.ini", ini_section="data_db"), "heads")
+    with Session(engine) as session:
+        generate(session, settings)
+    print("Finished generating the benchmark database.")
+
+
+if __name__ == "__main__":
+    main()
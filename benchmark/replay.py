@@ -0,0 +1,172 @@
+"""
+Replays the slow query log of the meta DB against a data DB and reports the searches
+that got slower than when they were logged, or whose total changed. Searches whose
+results come from the fuzzy title fallback are flagged instead, since the replay only
+runs the exact query:
+
+    META_DB_PATH=data/meta_db.sqlite DB_PATH=data/bench.sqlite uv run -m benchmark.replay
+
+Exits with status 1 if there are regressions, so it can be used in CI.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from timeit import default_timer
+from typing import Literal, cast, final
+
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from pyparsing import ParseBaseException
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.env import Settings
+from api.models import SlowQuery
+from api.routers.v2.search import CountMode, OrderKey, fuzzy_fallback, match_filters
+from api.util.db import ameta_engine
+from api.util.parse_query import build_search_operators
+from benchmark.run import git_commit
+
+
+@final
+class ReplaySettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="BENCH_", cli_parse_args=True, cli_prog_name="benchmark.replay"
+    )
+
+    iterations: int = 3
+    """Runs per query, of which the fastest is compared"""
+    entries: int = 1000
+    """Amount of the newest log entries to replay"""
+    factor: float = 1.5
+    """A search is a regression if it is this many times slower than when it was logged"""
+    output: Path | None = None
+    """Writes the results to this file instead of stdout"""
+
+
+class ReplayedQuery(BaseModel):
+    id: int
+    query: str
+    order_by: str
+    logged_ms: float
+    replayed_ms: float | None
+    """None if the query is invalid"""
+    logged_total: int | None
+    total: int | None
+    fuzzy: bool
+    """The logged or the current results come from the fuzzy fallback, so the totals aren't compared"""
+    regression: Literal["slower", "total", "error"] | None
+
+
+class ReplayResult(BaseModel):
+    commit: str | None
+    db_path: str
+    queries: list[ReplayedQuery]
+
+    @property
+    def regressions(self) -> list[ReplayedQuery]:
+        return [q for q in self.queries if q.regression is not None]
+
+
+async def _replay(entry: SlowQuery, settings: ReplaySettings) -> ReplayedQuery:
+    assert entry.id is not None
+    replayed_ms: float | None = None
+    total = None
+    results = None
+    fuzzy = False
+    regression = None
+    try:
+        operators = build_search_operators(entry.query)
+        # explicit fuzzy filters are replayed as they are
+        fuzzy = "title_fuzzy" in entry.parsed_query and not any(
+            f.key == "title_fuzzy" for f in operators
+        )
+        for _ in range(settings.iterations):
+            start = default_timer()
+            total, results, *_ = await match_filters(
+                operators,
+                offset=entry.offset,
+                limit=entry.limit,
+                order_by=cast(OrderKey, entry.order_by),
+                descending=entry.descending,
+                cursor=entry.cursor,
+                count_mode=cast(CountMode, entry.count_mode),
+                latest_only=entry.latest,
+            )
+            elapsed = (default_timer() - start) * 1000
+            replayed_ms = elapsed if replayed_ms is None else min(replayed_ms, elapsed)
+        if (
+            not results
+            and entry.offset == 0
+            and entry.cursor is None
+            and await fuzzy_fallback(operators)
+        ):
+            fuzzy = True
+    except (ValueError, ParseBaseException) as e:
+        print(f"{entry.query}: {e}", file=sys.stderr)
+        regression = "error"
+
+    if replayed_ms is not None:
+        if replayed_ms > entry.exec_time_ms * settings.factor:
+            regression = "slower"
+        elif not fuzzy and total != entry.total:
+            regression = "total"
+
+    return ReplayedQuery(
+        id=entry.id,
+        query=entry.query,
+        order_by=entry.order_by,
+        logged_ms=entry.exec_time_ms,
+        replayed_ms=replayed_ms,
+        logged_total=entry.total,
+        total=total,
+        fuzzy=fuzzy,
+        regression=regression,
+    )
+
+
+async def replay(settings: ReplaySettings) -> ReplayResult:
+    async with AsyncSession(ameta_engine) as session:
+        entries = (
+            await session.exec(
+                select(SlowQuery)
+                .order_by(col(SlowQuery.id).desc())
+                .limit(settings.entries)
+            )
+        ).all()
+
+    queries: list[ReplayedQuery] = []
+    for entry in reversed(entries):
+        replayed = await _replay(entry, settings)
+        replayed_ms = (
+            f"{replayed.replayed_ms:8.2f}ms"
+            if replayed.replayed_ms is not None
+            else "   error"
+        )
+        print(
+            f"{replayed.query:<80} logged {replayed.logged_ms:8.2f}ms replayed {replayed_ms} {replayed.regression or ''}{' fuzzy' if replayed.fuzzy else ''}",
+            file=sys.stderr,
+        )
+        queries.append(replayed)
+
+    return ReplayResult(
+        commit=git_commit(), db_path=Settings().db_path, queries=queries
+    )
+
+
+def main():
+    settings = ReplaySettings()
+    result = asyncio.run(replay(settings))
+    output = result.model_dump_json(indent=2)
+    if settings.output:
+        settings.output.write_text(output)
+    else:
+        print(output)
+    if regressions := result.regressions:
+        print(f"{len(regressions)} regressions", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
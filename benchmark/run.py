@@ -0,0 +1,210 @@
+"""
+Runs every search query of the k6 load test directly through the search and
+reports latency percentiles and the peak memory usage as JSON:
+
+    DB_PATH=data/bench.sqlite uv run -m benchmark.run --output bench.json
+
+Results of two runs (e.g. before and after a change) can be compared with:
+
+    uv run -m benchmark.compare before.json after.json
+"""
+
+import asyncio
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from timeit import default_timer
+from typing import cast, final
+
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import event
+from sqlmodel import col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.env import Settings
+from api.models import LearningUnit
+from api.routers.v2.search import CountMode, OrderKey, match_filters
+from api.util.db import aengine, count_statements
+from api.util.parse_query import build_search_operators
+
+
+@final
+class RunSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="BENCH_", cli_parse_args=True, cli_prog_name="benchmark.run"
+    )
+
+    iterations: int = 20
+    """Timed runs per query"""
+    warmup: int = 2
+    """Untimed runs per query before the timed ones"""
+    order_by: OrderKey = "year"
+    count: CountMode = "exact"
+    limit: int = 20
+    concurrency: int = 1
+    """Runs of a query started at the same time, to check the pool under load"""
+    queries: Path = Path("k6.js")
+    """File containing the `searchQueries` of the k6 load test"""
+    output: Path | None = None
+    """Writes the results to this file instead of stdout"""
+
+
+class Latency(BaseModel):
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+
+    @classmethod
+    def of(cls, timings: list[float]) -> "Latency":
+        ms = [t * 1000 for t in timings]
+        percentiles = statistics.quantiles(ms, n=100, method="inclusive")
+        return cls(
+            p50_ms=percentiles[49],
+            p95_ms=percentiles[94],
+            p99_ms=percentiles[98],
+            mean_ms=statistics.fmean(ms),
+        )
+
+
+class QueryResult(BaseModel):
+    query: str
+    total: int | None
+    latency: Latency
+
+
+class BenchmarkResult(BaseModel):
+    commit: str | None
+    db_path: str
+    unit_count: int
+    settings: dict[str, str | int]
+    latency: Latency
+    """Over all timed runs of all queries"""
+    peak_rss_mb: float
+    connections_opened: int | None = None
+    """Connections opened by the pool. Stays at the concurrency if connections are reused"""
+    statements_per_search: float | None = None
+    queries: list[QueryResult]
+
+
+def load_queries(path: Path) -> list[str]:
+    """Extracts the string literals of the `searchQueries` array in the k6 script"""
+    source = path.read_text()
+    array = re.search(r"const searchQueries = \[(.*?)\];", source, re.DOTALL)
+    if array is None:
+        raise ValueError(f"No searchQueries found in {path}")
+    literals = cast(
+        list[tuple[str, str]],
+        re.findall(r'"([^"]*)"|\'([^\']*)\'', array.group(1)),
+    )
+    return [double or single for double, single in literals]
+
+
+def git_commit() -> str | None:
+    try:
+        git = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        )
+    except OSError:  # git isn't installed
+        return None
+    return git.stdout.strip() if git.returncode == 0 else None
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _search(query: str, settings: RunSettings) -> tuple[int | None, float]:
+    start = default_timer()
+    total, *_ = await match_filters(
+        build_search_operators(query),
+        limit=settings.limit,
+        order_by=settings.order_by,
+        count_mode=settings.count,
+    )
+    return total, default_timer() - start
+
+
+async def run(settings: RunSettings) -> BenchmarkResult:
+    connections = 0
+
+    @event.listens_for(aengine.sync_engine, "connect")
+    def _count_connection(*_: object):
+        nonlocal connections
+        connections += 1
+
+    async with AsyncSession(aengine) as session:
+        unit_count = (
+            await session.exec(select(func.count(col(LearningUnit.id))))
+        ).one()
+
+    results: list[QueryResult] = []
+    all_timings: list[float] = []
+    searches = 0
+    with count_statements() as statements:
+        for query in load_queries(settings.queries):
+            timings: list[float] = []
+            total = None
+            for i in range(settings.warmup + settings.iterations):
+                runs = await asyncio.gather(
+                    *(_search(query, settings) for _ in range(settings.concurrency))
+                )
+                searches += len(runs)
+                total = runs[0][0]
+                if i >= settings.warmup:
+                    timings.extend(elapsed for _, elapsed in runs)
+            latency = Latency.of(timings)
+            print(
+                f"{query:<80} p50 {latency.p50_ms:8.2f}ms p95 {latency.p95_ms:8.2f}ms p99 {latency.p99_ms:8.2f}ms",
+                file=sys.stderr,
+            )
+            results.append(QueryResult(query=query, total=total, latency=latency))
+            all_timings.extend(timings)
+
+    return BenchmarkResult(
+        commit=git_commit(),
+        db_path=Settings().db_path,
+        unit_count=unit_count,
+        settings={
+            "iterations": settings.iterations,
+            "warmup": settings.warmup,
+            "order_by": settings.order_by,
+            "count": settings.count,
+            "limit": settings.limit,
+            "concurrency": settings.concurrency,
+            "pool_size": Settings().db_pool_size,
+            "max_overflow": Settings().db_max_overflow,
+            "sqlite_driver": Settings().sqlite_driver,
+            "sqlite_executor_threads": Settings().sqlite_executor_threads
+            or os.cpu_count()
+            or 1,
+        },
+        latency=Latency.of(all_timings),
+        peak_rss_mb=_peak_rss_mb(),
+        connections_opened=connections,
+        statements_per_search=statements[0] / searches if searches else 0.0,
+        queries=results,
+    )
+
+
+def main():
+    settings = RunSettings()
+    if settings.iterations < 2:
+        raise SystemExit("At least two iterations are required for percentiles")
+    result = asyncio.run(run(settings))
+    output = result.model_dump_json(indent=2)
+    if settings.output:
+        settings.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,9 @@ from scrapy.utils.project import get_project_settings
 from sqlmodel import text
 
 from api.env import Settings as APISettings
-from api.util.db import get_session
+from api.util import db
+from api.util.db import checkpoint, get_session, use_database
+from api.util.generation import new_generation_path, publish_generation
 from api.util.materialize import update_materialized_views
 from scraper.spiders.lecturers import LecturersSpider
 from scraper.spiders.ratings import RatingsSpider
@@ -50,35 +52,75 @@ def update_materialized_view():
     logger.info("Finished scraping data, updating materialized tables")
     with next(get_session()) as session:
         update_materialized_views(session)
+        # the rebuilt tables are in the WAL, which API readers would have to look them up in
+        busy, log, checkpointed = checkpoint(session, "PASSIVE")
+        logger.info(
+            f"Checkpointed {checkpointed}/{log} WAL frames{' (blocked by readers)' if busy else ''}"
+        )
 
 
-def vacuum():
+def vacuum(vacuum_path: Path):
     # vacuum/zip db
-    logger.info(f"Vacuuming database into {APISettings().vacuum_path}")
-    if Path(APISettings().vacuum_path).exists():  # required for VACUUM INTO to work
-        Path(APISettings().vacuum_path).unlink()
+    logger.info(f"Vacuuming database into {vacuum_path}")
+    if vacuum_path.exists():  # required for VACUUM INTO to work
+        vacuum_path.unlink()
     with next(get_session()) as session:
+        # the dump only has to be copied from the DB file, which also keeps the WAL small
+        busy, log, checkpointed = checkpoint(session, "TRUNCATE")
+        logger.info(
+            f"Checkpointed {checkpointed}/{log} WAL frames{' (blocked by readers)' if busy else ''}"
+        )
         session.execute(
             text("VACUUM INTO :vacuum_path"),
-            {"vacuum_path": f"{APISettings().vacuum_path}"},
+            {"vacuum_path": f"{vacuum_path}"},
         )
     logger.info("Finished vacuuming database")
     logger.info(f"Creating database zip file at {APISettings().zip_path}")
     with zipfile.ZipFile(APISettings().zip_path, "w", zipfile.ZIP_DEFLATED) as z:
-        z.write(APISettings().vacuum_path, arcname="database.db")
+        z.write(vacuum_path, arcname="database.db")
     logger.info("Finished creating database zip file")
-    db_size = Path(APISettings().db_path).stat().st_size / (1024 * 1024)
-    vacuum_size = Path(APISettings().vacuum_path).stat().st_size / (1024 * 1024)
+    db_size = Path(str(db.engine.url.database)).stat().st_size / (1024 * 1024)
+    vacuum_size = vacuum_path.stat().st_size / (1024 * 1024)
     zip_size = Path(APISettings().zip_path).stat().st_size / (1024 * 1024)
     logger.info(
         f"Database size: {db_size:.2f} MB, vacuum size: {vacuum_size:.2f} MB, zipped size: {zip_size:.2f} MB"
     )
-    logger.info(f"Deleting vacuum file at {APISettings().vacuum_path}")
-    Path(APISettings().vacuum_path).unlink(missing_ok=True)
-    logger.info("Finished deleting vacuum file.")
+
+
+def prepare_generation() -> Path:
+    """
+    Copies the published DB into a new file the scrape writes to, so the API
+    keeps reading a consistent DB until the new generation is published
+    """
+    build = new_generation_path().with_suffix(".sqlite.build")
+    logger.info(f"Copying database into {build} for the next generation")
+    with next(get_session()) as session:
+        session.execute(text("VACUUM INTO :build_path"), {"build_path": f"{build}"})
+    use_database(str(build))
+    return build
+
+
+def publish(build: Path):
+    # the vacuumed copy is both the published generation and the dump
+    generation = build.with_suffix("")
+    vacuum(generation)
+    publish_generation(generation)
+    logger.info(f"Published {generation}")
+    db.engine.dispose()
+    for file in (build, Path(f"{build}-wal"), Path(f"{build}-shm")):
+        file.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
-    crawl()
-    update_materialized_view()
-    vacuum()
+    if APISettings().db_generations:
+        build = prepare_generation()
+        crawl()
+        update_materialized_view()
+        publish(build)
+    else:
+        crawl()
+        update_materialized_view()
+        vacuum(Path(APISettings().vacuum_path))
+        logger.info(f"Deleting vacuum file at {APISettings().vacuum_path}")
+        Path(APISettings().vacuum_path).unlink(missing_ok=True)
+        logger.info("Finished deleting vacuum file.")
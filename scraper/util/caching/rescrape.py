@@ -26,7 +26,7 @@ def get_last_semesters(n: int) -> list[str]:
     with next(get_session()) as session:
         semkezs = session.exec(
             select(distinct(LearningUnit.semkez))
-            .order_by(col(LearningUnit.semkez).desc())
+            .order_by(col(LearningUnit.semester_ordinal).desc())
             .limit(n)
         ).all()
     return list(semkezs)
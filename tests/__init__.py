@@ -0,0 +1,31 @@
+"""
+The tests run against a small generated catalogue in a temporary directory. It has to be
+configured before anything of `api` is imported, which is why it's set up here:
+
+    uv run -m unittest
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+_data = Path(tempfile.mkdtemp(prefix="vvzapi-tests-"))
+os.environ["DB_PATH"] = str(_data / "db.sqlite")
+os.environ["META_DB_PATH"] = str(_data / "meta_db.sqlite")
+
+from alembic.config import Config  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from alembic import command  # noqa: E402
+from api.util.db import engine  # noqa: E402
+from benchmark.generate import GenerateSettings, generate  # noqa: E402
+
+for _section in ("data_db", "meta_db"):
+    command.upgrade(
+        Config(Path(__file__).parent.parent / "alembic.ini", ini_section=_section),
+        "heads",
+    )
+with Session(engine) as _session, contextlib.redirect_stdout(io.StringIO()):
+    generate(_session, GenerateSettings(_cli_parse_args=False, semesters=4, units=100))
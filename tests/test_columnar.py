@@ -0,0 +1,36 @@
+import importlib.util
+import unittest
+from unittest import mock
+
+from api.routers.v2.search import match_filters, settings
+from api.util.parse_query import build_search_operators
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "requires the columnar extra")
+class ColumnarSearchTest(unittest.IsolatedAsyncioTestCase):
+    async def test_matches_the_sql_search(self):
+        for query in [
+            "y:2024",
+            "y>=2024 c>=5",
+            "c<4 or dep:MATH",
+            "s:W lvl:BSC",
+            "lvl:GS or lvl:DR",
+            "lang:English",
+            "lang!=English",
+            "e:session y<2025",
+            "e!=examination or c:6",
+            "t:Introduction c>=5",
+            "t:Introduction or dep:INFK",
+            "dep:INFK d:geology",
+            "c:abc y:2024",
+        ]:
+            with self.subTest(query=query):
+                filters = build_search_operators(query)
+                total, results, *_ = await match_filters(filters, limit=100)
+                with mock.patch.object(settings, "columnar_search", True):
+                    columnar_total, columnar_results, *_ = await match_filters(
+                        filters, limit=100
+                    )
+                self.assertGreater(total or 0, 0)
+                self.assertEqual(columnar_total, total)
+                self.assertEqual(list(columnar_results), list(results))
@@ -0,0 +1,128 @@
+import unittest
+from typing import get_args
+
+from fastapi import BackgroundTasks, HTTPException
+
+from api.routers.v2.search import OrderKey, match_filters, search_units
+from api.util.cursor import InvalidCursor, encode_cursor
+from api.util.parse_query import QueryKey, build_search_operators
+
+ORDER_KEYS: list[OrderKey] = [*get_args(QueryKey), "relevance"]
+# matches most units, with repeated titles and units without a language
+QUERY = "t:tion"
+LIMIT = 3
+
+
+async def _offset_pages(order_by: OrderKey, descending: bool) -> list[list[str]]:
+    pages: list[list[str]] = []
+    while True:
+        _, results, *_ = await match_filters(
+            build_search_operators(QUERY),
+            offset=len(pages) * LIMIT,
+            limit=LIMIT,
+            order_by=order_by,
+            descending=descending,
+        )
+        if not results:
+            return pages
+        pages.append(list(results))
+
+
+async def _cursor_pages(order_by: OrderKey, descending: bool) -> list[list[str]]:
+    pages: list[list[str]] = []
+    cursor: str | None = None
+    while True:
+        _, results, _, cursor = await match_filters(
+            build_search_operators(QUERY),
+            limit=LIMIT,
+            order_by=order_by,
+            descending=descending,
+            cursor=cursor,
+        )
+        pages.append(list(results))
+        if cursor is None:
+            return pages
+
+
+class CursorPaginationTest(unittest.IsolatedAsyncioTestCase):
+    async def test_pages_equal_offset_pages(self):
+        for order_by in ORDER_KEYS:
+            for descending in (False, True):
+                with self.subTest(order_by=order_by, descending=descending):
+                    expected = await _offset_pages(order_by, descending)
+                    self.assertGreater(len(expected), 3)
+                    self.assertEqual(
+                        await _cursor_pages(order_by, descending), expected
+                    )
+
+    async def test_estimates_count_the_pages_before_the_cursor(self):
+        filters = build_search_operators(QUERY)
+        total, *_ = await match_filters(filters, count_mode="none")
+        exact, *_ = await match_filters(filters)
+        self.assertIsNone(total)
+
+        cursor: str | None = None
+        page = 0
+        while True:
+            estimate, _, _, cursor = await match_filters(
+                filters, limit=LIMIT, cursor=cursor, count_mode="estimate"
+            )
+            by_offset, *_ = await match_filters(
+                filters, offset=page * LIMIT, limit=LIMIT, count_mode="estimate"
+            )
+            self.assertEqual(estimate, by_offset)
+            page += 1
+            if cursor is None:
+                break
+        # the last page knows about every match
+        self.assertEqual(estimate, exact)
+
+    async def test_cursors_of_another_order_are_rejected(self):
+        _, _, _, cursor = await match_filters(
+            build_search_operators(QUERY), limit=LIMIT, order_by="credits"
+        )
+        assert cursor is not None
+        mismatches: list[tuple[OrderKey, bool]] = [
+            ("language", True),
+            ("credits", False),
+        ]
+        for order_by, descending in mismatches:
+            with (
+                self.subTest(order_by=order_by, descending=descending),
+                self.assertRaises(InvalidCursor),
+            ):
+                await match_filters(
+                    build_search_operators(QUERY),
+                    limit=LIMIT,
+                    order_by=order_by,
+                    descending=descending,
+                    cursor=cursor,
+                )
+
+    async def test_values_of_the_wrong_type_are_rejected(self):
+        # same order and length as a real cursor, but a text where credits are compared
+        _, _, _, cursor = await match_filters(
+            build_search_operators(QUERY), limit=LIMIT, order_by="credits"
+        )
+        assert cursor is not None
+        for values in (
+            ["4", "", "", 2024, "101-0000-00L"],
+            [True, "", "", 2024, "101-0000-00L"],
+        ):
+            with self.subTest(values=values), self.assertRaises(InvalidCursor):
+                await match_filters(
+                    build_search_operators(QUERY),
+                    limit=LIMIT,
+                    order_by="credits",
+                    cursor=encode_cursor("credits", True, LIMIT, values),
+                )
+
+    async def test_search_responds_with_bad_request(self):
+        with self.assertRaises(HTTPException) as context:
+            await search_units(
+                QUERY,
+                BackgroundTasks(),
+                order_by="title",
+                cursor=encode_cursor("credits", True, LIMIT, [4.0, "", "", 2024, "x"]),
+            )
+        self.assertEqual(context.exception.status_code, 400)
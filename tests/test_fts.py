@@ -0,0 +1,154 @@
+import unittest
+
+from sqlalchemy import ColumnElement
+from sqlmodel import Session, col, func, or_, select
+
+from api.models import LearningUnit, Lecturer, UnitPersonView
+from api.util.db import engine
+from api.util.fts import (
+    LECTURER_NAME_FTS,
+    TITLE_COLUMNS,
+    description_match,
+    fts_rowids,
+    lecturer_match,
+    title_match,
+)
+
+
+def _unit_ids(session: Session, clause: ColumnElement[bool]) -> set[int]:
+    return set(session.exec(select(LearningUnit.id).where(clause)).all())
+
+
+class DescriptionMatchTest(unittest.TestCase):
+    def test_scraped_units_are_searchable_before_materializing(self):
+        with Session(engine) as session:
+            unit = LearningUnit(
+                id=10_000_000,
+                semkez="2025W",
+                number="999-0001-00L",
+                title="Zymurgy",
+                content="Brewing as applied zymurgy",
+            )
+            session.add(unit)
+            session.flush()
+            self.assertEqual(
+                _unit_ids(session, description_match("zymurgy")), {unit.id}
+            )
+
+            unit.content = "Brewing as applied oenology"
+            session.add(unit)
+            session.flush()
+            self.assertEqual(_unit_ids(session, description_match("zymurgy")), set())
+            self.assertEqual(
+                _unit_ids(session, description_match("oenology")), {unit.id}
+            )
+
+            session.delete(unit)
+            session.flush()
+            self.assertEqual(_unit_ids(session, description_match("oenology")), set())
+            session.rollback()
+
+
+class TitleMatchTest(unittest.TestCase):
+    def test_matches_the_like_search(self):
+        number = (col(LearningUnit.number),)
+        with Session(engine) as session:
+            for value, columns in [
+                ("Introduction", TITLE_COLUMNS),
+                ("ntro", TITLE_COLUMNS),
+                ("geologie", TITLE_COLUMNS),
+                ("in", TITLE_COLUMNS),
+                ("%", TITLE_COLUMNS),
+                ("a_b", TITLE_COLUMNS),
+                ("-00", number),
+                ("2", number),
+            ]:
+                with self.subTest(value=value):
+                    like = or_(
+                        *(
+                            func.coalesce(c, "").contains(value, autoescape=True)
+                            for c in columns
+                        )
+                    )
+                    self.assertEqual(
+                        _unit_ids(session, title_match(value, columns)),
+                        _unit_ids(session, like),
+                    )
+
+    def test_scraped_units_are_searchable_before_materializing(self):
+        with Session(engine) as session:
+            unit = LearningUnit(
+                id=10_000_000, semkez="2025W", number="999-0001-00L", title="Zymurgy"
+            )
+            session.add(unit)
+            session.flush()
+            self.assertEqual(_unit_ids(session, title_match("zymurgy")), {unit.id})
+
+            unit.title = "Oenology 100%"
+            session.add(unit)
+            session.flush()
+            self.assertEqual(_unit_ids(session, title_match("zymurgy")), set())
+            # wildcards are literal on both the FTS and the LIKE path
+            for value in ["oenology", "0%", "%"]:
+                with self.subTest(value=value):
+                    self.assertEqual(_unit_ids(session, title_match(value)), {unit.id})
+            for value in ["y_1", "_"]:
+                with self.subTest(value=value):
+                    self.assertNotIn(unit.id, _unit_ids(session, title_match(value)))
+
+            session.delete(unit)
+            session.flush()
+            self.assertEqual(_unit_ids(session, title_match("oenology")), set())
+            session.rollback()
+
+
+class LecturerMatchTest(unittest.TestCase):
+    def test_matches_the_like_search(self):
+        with Session(engine) as session:
+            for value in ["Anna", "müller", "Weber Anna", "nna Sch", "An", "n%"]:
+                with self.subTest(value=value):
+                    like = col(LearningUnit.id).in_(
+                        select(UnitPersonView.unit_id).where(
+                            or_(
+                                col(UnitPersonView.full_name).contains(
+                                    value, autoescape=True
+                                ),
+                                func.concat(
+                                    UnitPersonView.surname, " ", UnitPersonView.name
+                                ).contains(value, autoescape=True),
+                            )
+                        )
+                    )
+                    self.assertEqual(
+                        _unit_ids(session, lecturer_match(value)),
+                        _unit_ids(session, like),
+                    )
+
+    def test_renamed_lecturers_are_searchable_before_materializing(self):
+        with Session(engine) as session:
+            person = session.exec(select(UnitPersonView).limit(1)).one()
+            lecturer = session.get_one(Lecturer, person.lecturer_id)
+            units = _unit_ids(
+                session,
+                col(LearningUnit.id).in_(
+                    select(UnitPersonView.unit_id).where(
+                        UnitPersonView.lecturer_id == lecturer.id
+                    )
+                ),
+            )
+
+            lecturer.surname = "Zymurgist"
+            session.add(lecturer)
+            session.flush()
+            self.assertEqual(_unit_ids(session, lecturer_match("zymurgist")), units)
+            self.assertNotIn(
+                lecturer.id,
+                session.exec(
+                    fts_rowids(LECTURER_NAME_FTS, f"{person.surname} {person.name}")
+                ).all(),
+            )
+
+            session.delete(lecturer)
+            session.flush()
+            self.assertEqual(_unit_ids(session, lecturer_match("zymurgist")), set())
+            session.rollback()
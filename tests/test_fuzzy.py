@@ -0,0 +1,44 @@
+import os
+import unittest
+
+from api.env import Settings
+from api.util.fuzzy import TitleCorpus, title_corpus_engine
+from api.util.generation import materialized_marker
+
+
+def _touch(path: str):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+
+class TitleCorpusTest(unittest.IsolatedAsyncioTestCase):
+    corpus: TitleCorpus = TitleCorpus(
+        {
+            "introduction to geology": {"651-0001-00L"},
+            "machine learning": {"252-0220-00L", "252-0220-01L"},
+        }
+    )
+
+    def test_words_of_titles_are_contained(self):
+        for value in ["Introduction", "to Geo", "Machine-Learning", "learn", "geology"]:
+            with self.subTest(value=value):
+                self.assertTrue(self.corpus.contains(value))
+        for value in ["Introdcution", "geology introduction", "zymurgy"]:
+            with self.subTest(value=value):
+                self.assertFalse(self.corpus.contains(value))
+
+    async def test_matches_the_numbers_of_the_closest_titles(self):
+        self.assertEqual(
+            await self.corpus.match(["Machine Lerning", "zymurgy"]),
+            {
+                "Machine Lerning": ["252-0220-00L", "252-0220-01L"],
+                "zymurgy": [],
+            },
+        )
+
+    async def test_reloads_only_for_new_materialized_generations(self):
+        corpus = await title_corpus_engine.corpus()
+        _touch(Settings().db_path)
+        self.assertIs(await title_corpus_engine.corpus(), corpus)
+        _touch(str(materialized_marker(Settings().db_path)))
+        self.assertIsNot(await title_corpus_engine.corpus(), corpus)
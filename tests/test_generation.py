@@ -0,0 +1,40 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from api.util.generation import (
+    new_generation_path,
+    publish_generation,
+    published_generation,
+    settings,
+)
+
+
+class PublishGenerationTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.db_path = self.dir / "db.sqlite"
+        patch = mock.patch.object(settings, "db_path", str(self.db_path))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _generation(self, name: str) -> Path:
+        path = new_generation_path().with_name(f"{name}.sqlite")
+        path.write_bytes(b"")
+        return path
+
+    def test_replaced_file_keeps_its_journal_until_the_next_publish(self):
+        self.db_path.write_bytes(b"")
+        journal = [Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm")]
+        for path in journal:
+            path.write_bytes(b"")
+
+        publish_generation(self._generation("1"))
+        self.assertEqual(published_generation(), "1.sqlite")
+        # API connections can still have the replaced file open
+        self.assertTrue(all(path.exists() for path in journal))
+
+        publish_generation(self._generation("2"))
+        self.assertEqual(published_generation(), "2.sqlite")
+        self.assertFalse(any(path.exists() for path in journal))
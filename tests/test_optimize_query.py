@@ -0,0 +1,97 @@
+import unittest
+
+from api.util.optimize_query import optimize_query
+from api.util.parse_query import (
+    AND,
+    IN,
+    OR,
+    FilterOperator,
+    Operator,
+    QueryKey,
+)
+
+
+def _filter(key: QueryKey, value: str, operator: Operator = Operator.eq):
+    return FilterOperator(key=key, operator=operator, value=value)
+
+
+class OptimizeQueryTest(unittest.TestCase):
+    def test_flattens_nested_operators_of_the_same_kind(self):
+        a, b, c = _filter("title", "a"), _filter("title", "b"), _filter("title", "c")
+        self.assertEqual(
+            optimize_query(AND(ops=[a, AND(ops=[b, c])])), AND(ops=[a, b, c])
+        )
+        # equal titles in an OR would be grouped into an IN, levels aren't
+        x, y, z = _filter("level", "x"), _filter("level", "y"), _filter("level", "z")
+        self.assertEqual(optimize_query(OR(ops=[OR(ops=[x, y]), z])), OR(ops=[x, y, z]))
+        self.assertEqual(
+            optimize_query(AND(ops=[a, OR(ops=[x, y])])), AND(ops=[a, OR(ops=[x, y])])
+        )
+
+    def test_removes_duplicate_filters(self):
+        a = _filter("title", "a")
+        self.assertEqual(optimize_query(AND(ops=[a, a.model_copy()])), AND(ops=[a]))
+
+    def test_keeps_different_filters_that_print_the_same(self):
+        split = AND(
+            ops=[
+                _filter("title", "Introduction"),
+                _filter("title", "x y"),
+                _filter("title", "z w"),
+            ]
+        )
+        quoted = AND(
+            ops=[
+                _filter("title", "Introduction"),
+                _filter("title", 'x y" and title="z w'),
+            ]
+        )
+        self.assertEqual(str(split), str(quoted))
+        self.assertEqual(
+            optimize_query(OR(ops=[split, quoted])), OR(ops=[split, quoted])
+        )
+
+    def test_folds_contradictions(self):
+        for contradiction in [
+            AND(ops=[_filter("year", "2020"), _filter("year", "2021")]),
+            AND(
+                ops=[
+                    _filter("credits", "5", Operator.gt),
+                    _filter("credits", "4", Operator.le),
+                ]
+            ),
+            AND(ops=[_filter("title", "x"), _filter("title", "x", Operator.ne)]),
+        ]:
+            with self.subTest(query=str(contradiction)):
+                self.assertIsNone(optimize_query(contradiction))
+                a = _filter("title", "a")
+                self.assertEqual(
+                    optimize_query(OR(ops=[contradiction, a])), OR(ops=[a])
+                )
+        # invalid values are ignored by the search, so they don't contradict anything
+        possible = AND(ops=[_filter("year", "2020"), _filter("year", "abc")])
+        self.assertEqual(optimize_query(possible), possible)
+
+    def test_groups_equality_filters_into_in_lists(self):
+        a, b = _filter("number", "252-0027-00L"), _filter("number", "252-0028-00L")
+        credits = _filter("credits", "5")
+        self.assertEqual(
+            optimize_query(OR(ops=[a, credits, b])),
+            OR(ops=[IN(ops=[a, b]), credits]),
+        )
+        # negations and keys without a single lookup stay separate
+        not_a = _filter("number", "252-0029-00L", Operator.ne)
+        levels = [_filter("level", "BSC"), _filter("level", "MSC")]
+        self.assertEqual(
+            optimize_query(OR(ops=[a, not_a, *levels])), OR(ops=[a, not_a, *levels])
+        )
+
+    def test_orders_ands_by_selectivity(self):
+        descriptions = _filter("descriptions", "geology")
+        year = _filter("year", "2024")
+        number = _filter("number", "252")
+        not_title = _filter("title", "Seminar", Operator.ne)
+        self.assertEqual(
+            optimize_query(AND(ops=[not_title, descriptions, year, number])),
+            AND(ops=[number, year, descriptions, not_title]),
+        )
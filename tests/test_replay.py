@@ -0,0 +1,49 @@
+import contextlib
+import io
+import unittest
+
+from api.models import SlowQuery
+from benchmark.replay import ReplaySettings, _replay  # pyright: ignore[reportPrivateUsage]
+
+
+def _entry(query: str, parsed_query: str, total: int) -> SlowQuery:
+    return SlowQuery(
+        id=1,
+        query=query,
+        parsed_query=parsed_query,
+        order_by="year",
+        descending=True,
+        offset=0,
+        limit=20,
+        count_mode="exact",
+        latest=False,
+        total=total,
+        # never slower, so only the totals are compared
+        exec_time_ms=float("inf"),
+    )
+
+
+class ReplayTest(unittest.IsolatedAsyncioTestCase):
+    settings: ReplaySettings = ReplaySettings(_cli_parse_args=False, iterations=1)
+
+    async def test_unparsable_queries_are_errors(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            replayed = await _replay(_entry("(((", "", 0), self.settings)
+        self.assertIsNone(replayed.replayed_ms)
+        self.assertEqual(replayed.regression, "error")
+
+    async def test_fuzzy_fallback_totals_arent_compared(self):
+        for parsed_query in ["title_fuzzy='Introdcution'", "title='Introdcution'"]:
+            with self.subTest(parsed_query=parsed_query):
+                replayed = await _replay(
+                    _entry("t:Introdcution", parsed_query, 5), self.settings
+                )
+                self.assertTrue(replayed.fuzzy)
+                self.assertIsNone(replayed.regression)
+
+    async def test_changed_totals_are_regressions(self):
+        replayed = await _replay(
+            _entry("t:Introduction", "title='Introduction'", -1), self.settings
+        )
+        self.assertFalse(replayed.fuzzy)
+        self.assertEqual(replayed.regression, "total")
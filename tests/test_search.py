@@ -0,0 +1,198 @@
+import unittest
+from typing import cast
+from unittest import mock
+
+from fastapi import BackgroundTasks, HTTPException
+from sqlmodel import Session, col, select, text
+
+from api.models import UnitVersionView
+from api.routers.v2.search import (
+    BatchSearch,
+    SearchExplain,
+    cached_match_filters,
+    match_filters,
+    run_search,
+    search_units,
+    search_units_batch,
+    settings,
+)
+from api.util.db import engine
+from api.util.parse_query import build_search_operators
+
+
+class CachedMatchFiltersTest(unittest.IsolatedAsyncioTestCase):
+    async def test_quotes_in_values_dont_collide(self):
+        # both print as `title='Introduction' and title="Introduction to" and title="to Geology"`
+        split = build_search_operators(
+            't:Introduction t:"Introduction to" t:"to Geology"'
+        )
+        quoted = build_search_operators(
+            """t:Introduction t:'Introduction to" and title="to Geology'"""
+        )
+        self.assertEqual(str(split), str(quoted))
+
+        split_total, *_ = await cached_match_filters(split)
+        quoted_total, *_ = await cached_match_filters(quoted)
+        self.assertGreater(split_total or 0, 0)
+        self.assertEqual(quoted_total, (await match_filters(quoted))[0])
+        self.assertEqual(quoted_total, 0)
+
+
+class MatchFiltersTest(unittest.IsolatedAsyncioTestCase):
+    async def test_latest_only_returns_the_newest_version(self):
+        with Session(engine) as session:
+            latest = set(
+                session.exec(
+                    select(UnitVersionView.unit_id).where(
+                        col(UnitVersionView.latest).is_(True)
+                    )
+                ).all()
+            )
+
+        filters = build_search_operators("t:Introduction")
+        _, all_versions, *_ = await match_filters(filters, limit=50)
+        self.assertTrue(any(len(group.units) > 1 for group in all_versions.values()))
+
+        _, results, *_ = await match_filters(filters, limit=50, latest_only=True)
+        self.assertGreater(len(results), 0)
+        for group in results.values():
+            self.assertEqual([unit.id in latest for unit in group.units], [True])
+
+    async def test_total_equals_the_separate_count(self):
+        for query in ["t:Introduction", "c>=4 or y:2024", "la:German", "y:1990"]:
+            with self.subTest(query=query):
+                filters = build_search_operators(query)
+                explain = SearchExplain(parsed_query=query)
+                total, *_ = await match_filters(filters, limit=5, explain=explain)
+                assert explain.count_sql is not None
+                with Session(engine) as session:
+                    result = session.connection().execute(text(explain.count_sql))
+                    count = cast(int, result.scalar_one())
+                self.assertEqual(total, count)
+
+                # past the end no row carries the total, so it's counted by itself
+                past_end, results, *_ = await match_filters(filters, offset=10_000)
+                self.assertEqual(results, {})
+                self.assertEqual(past_end, count)
+
+
+class RelevanceTest(unittest.IsolatedAsyncioTestCase):
+    async def test_title_hits_rank_before_description_hits(self):
+        filters = build_search_operators("t:physics or d:physics")
+        for descending in (True, False):
+            with self.subTest(descending=descending):
+                _, results, *_ = await match_filters(
+                    filters, limit=100, order_by="relevance", descending=descending
+                )
+                title_hits = [
+                    "physics" in (group.units[0].title_english or "").lower()
+                    for group in results.values()
+                ]
+                self.assertIn(True, title_hits)
+                self.assertIn(False, title_hits)
+                self.assertEqual(title_hits, sorted(title_hits, reverse=descending))
+
+    async def test_parsed_queries_are_searched_as_is(self):
+        filters = build_search_operators("physics")
+        parsed = await run_search(
+            "physics", BackgroundTasks(), search_operators=filters, order_by="relevance"
+        )
+        unparsed = await search_units(
+            "physics", BackgroundTasks(), order_by="relevance"
+        )
+        self.assertGreater(len(parsed.results), 0)
+        self.assertEqual(list(parsed.results), list(unparsed.results))
+        self.assertEqual(parsed.parsed_query, unparsed.parsed_query)
+
+
+class ExplainTest(unittest.IsolatedAsyncioTestCase):
+    async def test_explaining_requires_the_token(self):
+        for configured, sent in [
+            (None, None),
+            (None, "secret"),
+            ("secret", None),
+            ("secret", "wrong"),
+        ]:
+            with (
+                self.subTest(configured=configured, sent=sent),
+                mock.patch.object(settings, "explain_token", configured),
+                self.assertRaises(HTTPException) as context,
+            ):
+                await search_units(
+                    "t:Introduction",
+                    BackgroundTasks(),
+                    explain=True,
+                    explain_token=sent,
+                )
+            self.assertEqual(context.exception.status_code, 403)
+
+    async def test_explained_searches_contain_the_sql_and_plans(self):
+        with mock.patch.object(settings, "explain_token", "secret"):
+            response = await search_units(
+                "t:Introduction c>=4",
+                BackgroundTasks(),
+                limit=5,
+                explain=True,
+                explain_token="secret",
+            )
+        explain = response.explain
+        assert explain is not None
+        self.assertEqual(
+            explain.parsed_query, "(title='Introduction' and credits>='4')"
+        )
+        assert explain.results_sql is not None and explain.count_sql is not None
+        self.assertTrue(explain.results_plan)
+        self.assertTrue(explain.count_plan)
+        self.assertTrue(
+            any("SCAN" in line or "SEARCH" in line for line in explain.results_plan)
+        )
+        self.assertLessEqual({"parse", "results", "group"}, set(explain.timings_ms))
+
+        # the SQL has its parameters inlined, so it runs as is
+        with Session(engine) as session:
+            rows = session.connection().exec_driver_sql(explain.results_sql).all()
+            result = session.connection().exec_driver_sql(explain.count_sql)
+            count = cast(int, result.scalar_one())
+        # one number more than the page to know if there is a next one
+        numbers = list(dict.fromkeys(cast(str, row.number) for row in rows))
+        self.assertEqual(numbers[:5], list(response.results))
+        self.assertEqual(len(numbers), 6)
+        self.assertEqual(count, response.total)
+
+
+class SearchBatchTest(unittest.IsolatedAsyncioTestCase):
+    async def test_invalid_searches_only_fail_themselves(self):
+        responses = await search_units_batch(
+            [
+                BatchSearch(q="t:Introduction"),
+                BatchSearch(q="((("),
+                BatchSearch(q="t:Introduction", fields="nonexistent"),
+                BatchSearch(q="c>=4", limit=5),
+            ],
+            BackgroundTasks(),
+        )
+        self.assertEqual(
+            [response.parsed_query for response in responses],
+            [
+                "title='Introduction'",
+                "ERROR IN QUERY",
+                "ERROR IN QUERY",
+                "credits>='4'",
+            ],
+        )
+        self.assertGreater(len(responses[0].results), 0)
+        self.assertEqual(len(responses[3].results), 5)
+
+
+class FuzzyFallbackTest(unittest.IsolatedAsyncioTestCase):
+    async def test_misspelled_titles_are_retried_as_fuzzy_matches(self):
+        response = await search_units("t:Introdcution", BackgroundTasks())
+        self.assertTrue(response.fuzzy)
+        self.assertGreater(len(response.results), 0)
+
+    async def test_empty_queries_without_misspellings_stay_empty(self):
+        for query in ["y:1990", "Introduction y:1990", "t:Introduction c>=100"]:
+            with self.subTest(query=query):
+                response = await search_units(query, BackgroundTasks())
+                self.assertFalse(response.fuzzy)
+                self.assertEqual(response.results, {})
@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from api.util.singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_are_coalesced(self):
+        flight: SingleFlight[int, int] = SingleFlight("test")
+        calls = 0
+        release = asyncio.Event()
+
+        async def call() -> int:
+            nonlocal calls
+            calls += 1
+            _ = await release.wait()
+            return calls
+
+        first = asyncio.create_task(flight.do(1, call))
+        second = asyncio.create_task(flight.do(1, call))
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await asyncio.gather(first, second), [1, 1])
+
+    async def test_cancelled_callers_dont_cancel_the_call(self):
+        flight: SingleFlight[int, str] = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def call() -> str:
+            _ = await release.wait()
+            return "done"
+
+        cancelled = asyncio.create_task(flight.do(1, call))
+        waiting = asyncio.create_task(flight.do(1, call))
+        await asyncio.sleep(0)
+        _ = cancelled.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await waiting, "done")
+        self.assertTrue(cancelled.cancelled())
+
+    async def test_failures_without_callers_are_logged(self):
+        flight: SingleFlight[int, str] = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def call() -> str:
+            _ = await release.wait()
+            raise RuntimeError("failed")
+
+        callers = [asyncio.create_task(flight.do(1, call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            _ = caller.cancel()
+        _ = await asyncio.gather(*callers, return_exceptions=True)
+
+        with self.assertLogs("api.util.singleflight", "WARNING") as logs:
+            release.set()
+            # lets the call fail and its done callback run
+            for _ in range(3):
+                await asyncio.sleep(0)
+        self.assertIn("test flight failed", logs.output[0])
+        self.assertIn("RuntimeError: failed", logs.output[0])
+
+        async def retry() -> str:
+            return "retried"
+
+        # the failed call isn't joined by later callers
+        self.assertEqual(await flight.do(1, retry), "retried")
@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+from api.routers.v2 import search
+from api.util import sqlite_executor
+from api.util.db import (
+    _create_async_engine,  # pyright: ignore[reportPrivateUsage]
+    settings,
+)
+from api.util.parse_query import build_search_operators
+
+
+class ExecutorDriverTest(unittest.IsolatedAsyncioTestCase):
+    async def test_searches_match_the_aiosqlite_driver(self):
+        executor_engine = _create_async_engine(settings.db_path, executor_driver=True)
+        self.addAsyncCleanup(executor_engine.dispose)
+
+        for query in ["t:Introduction", "c>=4 or y:2024", "la:German", "physics"]:
+            with self.subTest(query=query):
+                filters = build_search_operators(query)
+                expected = await search.match_filters(filters, limit=10)
+                with (
+                    mock.patch.object(search, "aengine", executor_engine),
+                    mock.patch.object(
+                        sqlite_executor, "run", wraps=sqlite_executor.run
+                    ) as run,
+                ):
+                    total, results, *_ = await search.match_filters(filters, limit=10)
+                self.assertTrue(run.called)
+                self.assertGreater(total or 0, 0)
+                self.assertEqual(total, expected[0])
+                self.assertEqual(list(results), list(expected[1]))
+
+    async def test_pool_is_sized_to_the_threads(self):
+        with mock.patch.object(sqlite_executor.settings, "sqlite_executor_threads", 3):
+            executor_engine = _create_async_engine(
+                settings.db_path, executor_driver=True
+            )
+        self.addAsyncCleanup(executor_engine.dispose)
+        pool = executor_engine.sync_engine.pool
+        self.assertEqual(pool.size(), 3)  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
@@ -0,0 +1,44 @@
+import unittest
+
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, text
+
+from api.env import Settings
+from api.util.db import engine
+from api.util.statement_metrics import fingerprint, statement_id
+
+
+class StatementMetricsTest(unittest.TestCase):
+    def test_fingerprint_strips_literals_and_parameter_lists(self):
+        self.assertEqual(
+            fingerprint(
+                "SELECT 'a''b', x_1 FROM t\n WHERE id IN (?, ?,?) AND c >= 4.5"
+            ),
+            "SELECT ?, x_1 FROM t WHERE id IN (?, ...) AND c >= ?",
+        )
+
+    def test_failed_statements_raise_their_own_error(self):
+        # other tests may have used up the fingerprints, both then count as `other`
+        labels = {
+            "db": "data",
+            "statement": statement_id(
+                "SELECT ? AS recorded", Settings().db_statement_fingerprints
+            ),
+        }
+        before = (
+            REGISTRY.get_sample_value(
+                "vvzapi_db_statement_duration_seconds_count", labels
+            )
+            or 0
+        )
+        with Session(engine) as session:
+            with self.assertRaises(OperationalError):
+                _ = session.execute(text("SELECT * FROM missing_table"))
+            session.rollback()
+            _ = session.execute(text("SELECT 1 AS recorded"))
+
+        count = REGISTRY.get_sample_value(
+            "vvzapi_db_statement_duration_seconds_count", labels
+        )
+        self.assertEqual(count, before + 1)
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from fastapi.responses import JSONResponse
+
+from api.env import Settings
+from api.routers.v2.suggest import suggest
+from api.util.generation import materialized_marker
+from api.util.parse_query import build_search_operators
+from api.util.suggest import (
+    SuggestionIndex,
+    _quote,  # pyright: ignore[reportPrivateUsage]
+    suggestion_engine,
+)
+
+
+def _touch(path: str):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+
+async def _rebuild():
+    _ = await suggestion_engine.index()
+    rebuild = suggestion_engine._rebuild  # pyright: ignore[reportPrivateUsage]
+    assert rebuild is not None
+    if not rebuild.done():
+        _ = await asyncio.wait([rebuild])
+
+
+class SuggestTest(unittest.IsolatedAsyncioTestCase):
+    async def test_suggestions_are_revalidated_against_the_generation(self):
+        await _rebuild()
+        response = await suggest("Intro")
+        self.assertIsInstance(response, JSONResponse)
+        self.assertEqual(
+            response.headers["Cache-Control"],
+            f"public, max-age={Settings().suggest_max_age}",
+        )
+        etag = response.headers["ETag"]
+
+        self.assertEqual((await suggest("Intro", if_none_match=etag)).status_code, 304)
+
+        # writes of a running scrape don't rebuild the index
+        _touch(Settings().db_path)
+        await _rebuild()
+        self.assertEqual((await suggest("Intro", if_none_match=etag)).status_code, 304)
+
+        # updating the materialized views does
+        _touch(str(materialized_marker(Settings().db_path)))
+        await _rebuild()
+        response = await suggest("Intro", if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    async def test_failed_rebuilds_are_logged(self):
+        index = await suggestion_engine.index()
+        _touch(str(materialized_marker(Settings().db_path)))
+        with (
+            mock.patch.object(SuggestionIndex, "load", side_effect=RuntimeError),
+            self.assertLogs("api.util.suggest", "ERROR"),
+        ):
+            await _rebuild()
+        # the previous index keeps answering
+        self.assertIs(await suggestion_engine.index(), index)
+
+    def test_suggested_values_are_quoted(self):
+        for value in ["Machine Learning", 'The "Lab"', "Hans' Lab"]:
+            with self.subTest(value=value):
+                quoted = _quote(value)
+                assert quoted is not None
+                self.assertEqual(
+                    [f.value for f in build_search_operators(f"t:{quoted}")], [value]
+                )
+        # the query syntax can't escape quotes, so these aren't suggested at all
+        self.assertIsNone(_quote('Hans\' "Lab"'))
@@ -0,0 +1,18 @@
+import asyncio
+import unittest
+
+from api.routers.v1.units import get_unit, unit_flight
+
+
+class GetUnitTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_leader_doesnt_fail_followers(self):
+        leader = asyncio.create_task(get_unit(1))
+        follower = asyncio.create_task(get_unit(1))
+        await asyncio.sleep(0)
+        self.assertEqual(len(unit_flight._calls), 1)  # pyright: ignore[reportPrivateUsage]
+
+        leader.cancel()
+        unit = await follower
+        assert unit is not None
+        self.assertEqual(unit.id, 1)
+        self.assertTrue(unit.title)